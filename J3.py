@@ -1,20 +1,28 @@
 # =========================
 # IMPORTS
 # =========================
-import re
 import sys
-import subprocess
-import importlib
+import time
 import streamlit as st
-import speech_recognition as sr
-import pandas as pd
-from groq import Groq
-from ydata_profiling import ProfileReport
 from dotenv import load_dotenv
 import os
-from PIL import ImageGrab
+import file_cache
+from response_cache import ResponseCache, make_key
+from memory_index import MemoryIndex
+from memory_store import MemoryStore
+from memory_writer import MemoryWriter, is_non_answer, parse_numbered
+from llm_stream import sanitize_code, stream_code
+from intent_router import router
+from template_learner import TemplateLearner
+from dependency_resolver import DependencyResolver
+from assistant_ipc import AssistantClient, start_service, stop_service
+from command_queue import input_lock
 load_dotenv()
 
+# Heavy dependencies (groq, speech_recognition, pandas, ydata_profiling,
+# PIL, cv2) are imported lazily by the mode that needs them, and long-lived
+# objects are held in st.cache_resource, so a rerun stays cheap.
+
 
 # =========================
 # STREAMLIT CONFIG
@@ -33,22 +41,48 @@ if not GROQ_API_KEY:
     st.error("❌ GROQ API key not found. Check your .env file.")
     st.stop()
 
-client = Groq(api_key=GROQ_API_KEY)
+@st.cache_resource
+def get_groq_client(api_key: str):
+    from groq import Groq
+    return Groq(api_key=api_key)
+
+client = get_groq_client(GROQ_API_KEY)
+
+# =========================
+# RESPONSE CACHE
+# =========================
+@st.cache_resource
+def get_response_cache() -> ResponseCache:
+    return ResponseCache()
+
+response_cache = get_response_cache()
 
 # =========================
 # LOAD FILES
 # =========================
-try:
-    with open("Refrence Codes for Jarvis.txt", "r", encoding="utf-8") as f:
-        data = f.read()
-except FileNotFoundError:
-    data = ""
+# Served from memory unless the file changed on disk
+data = file_cache.read_text("Refrence Codes for Jarvis.txt")
 
-try:
-    with open("JARVIS_db.txt", "r", encoding="utf-8") as f:
-        db = f.read()
-except FileNotFoundError:
-    db = ""
+# =========================
+# MEMORY
+# =========================
+@st.cache_resource
+def get_memory_store() -> MemoryStore:
+    store = MemoryStore("JARVIS_memory.db")
+    store.import_text_file("JARVIS_db.txt")  # one-time legacy import
+    # One-time cleanup of "does not contain a specific topic..." entries
+    store.remove_where(is_non_answer, once="non-answers")
+    return store
+
+# Memory entries are indexed once per server process and queried per
+# command, so prompts only carry the relevant memories. The index is
+# rebuilt only when retention removes entries (store.generation changes).
+@st.cache_resource(max_entries=1)
+def get_memory_index(generation: int) -> MemoryIndex:
+    return MemoryIndex.from_entries(memory_store.texts())
+
+memory_store = get_memory_store()
+memory_index = get_memory_index(memory_store.generation)
 
 # =========================
 # PROMPTS
@@ -62,192 +96,394 @@ Return ONLY executable Python code.
 """
 
 prompt_db = """
-Summarize the following user request in 3–4 concise sentences:
-{topic}
+Summarize each numbered user request below in 3–4 concise sentences.
+Reply with exactly one line per request, in the same order, as "<number>. <summary>".
+If a request has no real content, reply "<number>. SKIP" for it.
+{topics}
 """
 
 # =========================
 # LLM FUNCTIONS
 # =========================
-def get_code(topic: str, database: str) -> str:
-    response = client.chat.completions.create(
-        model="openai/gpt-oss-120b",
-        messages=[{
+def get_code(topic: str, database: str, bypass_cache: bool = False) -> str:
+    def compute():
+        response = client.chat.completions.create(
+            model="openai/gpt-oss-120b",
+            messages=[{
+                "role": "system",
+                "content": prompt.format(
+                    topic=topic,
+                    database=database,
+                    codes=data
+                )
+            }]
+        )
+        return response.choices[0].message.content
+
+    # Keyed on the command + prompt template + reference codes (not the
+    # memory database, which changes after every command).
+    key = make_key(topic, prompt, data)
+    return response_cache.get_or_compute(key, compute, bypass=bypass_cache)
+
+
+def get_code_stream(topic: str, database: str, on_update, bypass_cache: bool = False):
+    """Streaming variant of get_code(). Returns (raw_response, timings);
+    timings is None when the response came from the cache."""
+    key = make_key(topic, prompt, data)
+    if not bypass_cache:
+        cached = response_cache.get(key)
+        if cached is not None:
+            on_update(sanitize_code(cached))
+            return cached, None
+    else:
+        response_cache.record_bypass()
+
+    raw, _, timings = stream_code(
+        client,
+        [{
             "role": "system",
-            "content": prompt.format(
-                topic=topic,
-                database=database,
-                codes=data
-            )
-        }]
+            "content": prompt.format(topic=topic, database=database, codes=data)
+        }],
+        model="openai/gpt-oss-120b",
+        on_update=on_update,
     )
-    return response.choices[0].message.content
+    response_cache.put(key, raw, timings["total"])
+    return raw, timings
 
 
-def get_db(topic: str) -> str:
+def get_db(topics):
+    """Summarize many commands in one call. Returns (summaries, tokens used)."""
+    numbered = "\n".join(f"{i}. {t}" for i, t in enumerate(topics, 1))
     response = client.chat.completions.create(
         model="openai/gpt-oss-120b",
         messages=[{
             "role": "system",
-            "content": prompt_db.format(topic=topic)
+            "content": prompt_db.format(topics=numbered)
         }]
     )
-    return response.choices[0].message.content
+    tokens = response.usage.total_tokens if response.usage else 0
+    return parse_numbered(response.choices[0].message.content, len(topics)), tokens
 
 
-# =========================
-# SANITIZE LLM OUTPUT
-# =========================
-def sanitize_code(code: str) -> str:
-    """Clean LLM output before exec:
-    - If code is wrapped in triple-backtick fences (``` or ```python), extract inner block.
-    - Remove stray fence lines if present.
-    - Strip leading/trailing whitespace.
-    """
-    if not isinstance(code, str):
-        return ""
+# Memory summaries are produced on a background worker, batched and
+# deduplicated, so get_db() never sits between the user and code execution.
+@st.cache_resource
+def get_memory_writer() -> MemoryWriter:
+    return MemoryWriter(get_db, memory_store)
 
-    # Look for a fenced code block and extract the first one
-    m = re.search(r"```(?:python|py)?\n([\s\S]*?)\n```", code, flags=re.IGNORECASE)
-    if m:
-        return m.group(1).strip()
+memory_writer = get_memory_writer()
 
-    # Remove any remaining triple-backtick lines
-    lines = [ln for ln in code.splitlines() if not ln.strip().startswith("```")]
-    cleaned = "\n".join(lines).strip()
 
-    # Sometimes LLMs include markdown code fences with language on the same line
-    cleaned = re.sub(r"^```[a-zA-Z0-9_-]*\s*", "", cleaned)
-    cleaned = re.sub(r"\s*```$", "", cleaned)
+@st.cache_resource
+def get_template_learner() -> TemplateLearner:
+    return TemplateLearner()
 
-    return cleaned.strip()
+template_learner = get_template_learner()
 
-# =========================
-# DATA CLEANER
-# =========================
-def clean_excel_or_csv(uploaded_file):
-    if uploaded_file.name.endswith(".csv"):
-        df = pd.read_csv(uploaded_file)
-    else:
-        df = pd.read_excel(uploaded_file)
-
-    df = df.dropna(how="all")
-    df = df.drop_duplicates()
 
-    for col in df.select_dtypes(include="object").columns:
-        df[col] = df[col].str.strip()
+@st.cache_resource
+def get_dependency_resolver() -> DependencyResolver:
+    return DependencyResolver()
 
-    df.columns = (
-        df.columns.str.strip()
-        .str.lower()
-        .str.replace(" ", "_")
-    )
+dependency_resolver = get_dependency_resolver()
 
-    return df
 
 # =========================
 # AUTO PACKAGE IMPORT
 # =========================
 def auto_import_packages(code: str):
-    imports = re.findall(r"^\s*import (\w+)|^\s*from (\w+)", code, re.MULTILINE)
-    packages = {i[0] or i[1] for i in imports if i[0] or i[1]}
+    report = dependency_resolver.ensure(code)
+    if report["installed"]:
+        st.info(f"Installed: {', '.join(report['installed'])}")
+    if report["failed"] or report["skipped"]:
+        st.warning(f"Could not install: {', '.join(report['failed'] + report['skipped'])}")
 
-    for pkg in packages:
-        try:
-            importlib.import_module(pkg)
-        except ImportError:
-            subprocess.check_call([sys.executable, "-m", "pip", "install", pkg])
+# =========================
+# SKIP AD
+# =========================
+@st.cache_resource
+def get_skip_ad_watcher():
+    # One watcher per server; its detector keeps the template cache and last hit
+    try:
+        from skip_ad_detector import SkipAdWatcher
+    except ImportError:
+        return None
+    return SkipAdWatcher()
 
 # =========================
 # VOICE INPUT
 # =========================
-r = sr.Recognizer()
+@st.cache_resource
+def get_voice_capture():
+    # Calibrated on the first press only; the microphone itself is released
+    # after every press so the next one never hears stale buffered audio
+    from voice_capture import VoiceCapture
+    return VoiceCapture()
 
 def listen():
+    import speech_recognition as sr
+    capture = get_voice_capture()
     st.info("🎙️ Listening...")
     try:
-        with sr.Microphone() as source:
-            r.adjust_for_ambient_noise(source, duration=1)
-            audio = r.listen(source)
-        text = r.recognize_google(audio, language="en-IN")
+        phrase = capture.next_phrase(timeout=8)
+        text = capture.recognizer.recognize_google(phrase.audio, language="en-IN")
+        latency = capture.mark_dispatched(phrase)
         st.success(f"You said: {text}")
+        st.caption(f"⏱️ {latency * 1000:.0f} ms from end of speech")
         return text
-    except Exception:
+    except (sr.UnknownValueError, sr.WaitTimeoutError, sr.RequestError):
         st.error("Could not understand audio")
         return None
+    except OSError:
+        capture.close()   # device changed or dropped; the next press reopens it
+        st.error("Microphone error, please try again")
+        return None
+    finally:
+        capture.release()
     
     
     
     
-def rule_based_executor(user_text: str) -> bool:
-    text = user_text.lower()
-
-    # 🎵 YouTube
-    if "play" in text and "youtube" in text:
-        import pywhatkit as kit
-        song = text.replace("play", "").replace("on youtube", "").strip()
-        kit.playonyt(song)
-        return True
-
-    # 📂 Open App / File
-    if "open" in text:
-        import pyautogui, time
-        app = text.replace("open", "").strip()
-        pyautogui.press('win')
-        time.sleep(1)
-        pyautogui.typewrite(app)
-        time.sleep(1)
-        pyautogui.press('enter')
-        return True
-
-    # 💬 WhatsApp Message
-    if "send" in text and "whatsapp" in text:
-        import pyautogui, time
-        parts = text.replace("send", "").replace("on whatsapp", "").split("to")
-        message = parts[0].strip()
-        contact = parts[1].strip()
-
-        pyautogui.press('win')
-        pyautogui.typewrite('whatsapp')
-        pyautogui.press('enter')
-        time.sleep(2)
-        pyautogui.hotkey('ctrl', 'f')
-        pyautogui.typewrite(contact)
-        time.sleep(1)
-        pyautogui.press('enter')
-        pyautogui.typewrite(message)
-        pyautogui.press('enter')
-        return True
-
-    # 📞 WhatsApp Call
-    if "call" in text and "whatsapp" in text:
-        import pyautogui, time
-        contact = text.replace("call", "").replace("on whatsapp", "").strip()
-
-        pyautogui.press('win')
-        pyautogui.typewrite('whatsapp')
-        pyautogui.press('enter')
-        time.sleep(2)
-        pyautogui.hotkey('ctrl', 'f')
-        pyautogui.typewrite(contact)
-        pyautogui.press('enter')
-        time.sleep(1)
-        pyautogui.click(1747, 82)  # voice call
-        return True
-
-    return False
+# =========================
+# RULE-BASED HANDLERS
+# =========================
+# Each handler receives an IntentMatch from intent_router and returns False
+# when its slots are incomplete, so the next candidate (or the LLM) can try.
+# Handlers run on the job queue's scheduler thread, so a UI that does not
+# respond surfaces as WaitTimeout and the job is marked failed.
+def _play_on_youtube(m) -> bool:
+    song = m.slots.get("song")
+    if not song:
+        return False
+    import pywhatkit as kit
+    kit.playonyt(song)
+    return True
+
+
+def _open_app(m) -> bool:
+    app = m.slots.get("app")
+    if not app:
+        return False
+    import pyautogui
+    from ui_wait import get_backend, settle, wait_for_active_change
+    before = get_backend().active_title()
+    pyautogui.press('win')
+    wait_for_active_change(before, timeout=3)   # Start menu has focus
+    pyautogui.typewrite(app)
+    settle(timeout=3)                           # search results rendered
+    pyautogui.press('enter')
+    return True
+
+
+def _open_whatsapp_chat(contact: str):
+    """Open WhatsApp and the chat with contact; WaitTimeout if it does not respond."""
+    import pyautogui
+    from ui_wait import settle, wait_for_focus
+    pyautogui.press('win')
+    pyautogui.typewrite('whatsapp')
+    pyautogui.press('enter')
+    wait_for_focus('WhatsApp', timeout=10)
+    pyautogui.hotkey('ctrl', 'f')
+    pyautogui.typewrite(contact)
+    settle(timeout=3)                           # search results rendered
+    pyautogui.press('enter')
+
+
+def _whatsapp_message(m) -> bool:
+    message, contact = m.slots.get("message"), m.slots.get("contact")
+    if not message or not contact:
+        return False
+    import pyautogui
+    _open_whatsapp_chat(contact)
+    pyautogui.typewrite(message)
+    pyautogui.press('enter')
+    return True
+
+
+def _whatsapp_call(m) -> bool:
+    contact = m.slots.get("contact")
+    if not contact:
+        return False
+    import pyautogui
+    from ui_wait import settle
+    _open_whatsapp_chat(contact)
+    settle(timeout=3)                           # chat header with the call buttons
+    pyautogui.click(1747, 82)  # voice call
+    return True
+
+
+RULE_HANDLERS = {
+    "youtube_play": _play_on_youtube,
+    "whatsapp_message": _whatsapp_message,
+    "whatsapp_call": _whatsapp_call,
+    "open_app": _open_app,
+}
+
+
+# Slots each handler needs, so a command can be routed to its handler when
+# it is queued rather than when it runs
+RULE_SLOTS = {
+    "youtube_play": ("song",),
+    "whatsapp_message": ("message", "contact"),
+    "whatsapp_call": ("contact",),
+    "open_app": ("app",),
+}
+
+
+def plan_rule(user_text: str):
+    """Job payload for the best rule intent whose slots are complete, or None."""
+    for m in router.candidates(user_text):
+        if m.name in RULE_HANDLERS and all(m.slots.get(slot) for slot in RULE_SLOTS[m.name]):
+            return {"kind": "rule", "intent": m.name, "slots": m.slots}
+    return None
+
+# =========================
+# ASSISTANT SERVICE
+# =========================
+# One long-lived assistant.py per machine, reached over a local socket, so
+# every browser session sees and controls the same process
+ASSISTANT_TIMEOUT = 30.0
+
+@st.cache_resource
+def get_assistant_client():
+    return AssistantClient()
+
+assistant_client = get_assistant_client()
+
+
+def plan_assistant(user_text: str, fallback=None):
+    """Job payload handing a media / YouTube command to the running assistant
+    (already warm: imports, TTS engine, browser state), or None if it is not
+    running or has no matching intent. fallback runs here if it declines."""
+    health = assistant_client.ping(timeout=0.5)
+    if not health or not router.match(user_text, allowed=set(health.get("intents", ()))):
+        return None
+    return {"kind": "assistant", "fallback": fallback}
+
+# =========================
+# EXECUTION
+# =========================
+@st.cache_resource
+def get_exec_pool():
+    # Warm worker processes with pyautogui / pywhatkit / webbrowser imported
+    from exec_pool import ExecPool
+    return ExecPool()
+
+
+def prepare_command(user_text: str):
+    """Headless version of process_command() for queued jobs: route, serve a
+    template or generate code. Runs on the queue's prepare threads, in
+    parallel with the job that is currently executing."""
+    if router.match(user_text.lower(), allowed={"clean_data"}):
+        return None    # mode switches only make sense from the UI
+    payload = plan_rule(user_text)
+    forwarded = plan_assistant(user_text, payload)
+    if forwarded is not None:
+        return forwarded
+    if payload is not None:
+        return payload
+    code = template_learner.serve(user_text, response_cache.summary()["avg_miss_ms"] / 1000)
+    if code is None:
+        memory_writer.submit(user_text.lower(), on_stored=memory_index.add)
+        context = memory_index.context_for(user_text, k=5, token_budget=600)
+        code = sanitize_code(get_code(user_text, context))
+        template_learner.observe(user_text, code)
+    dependency_resolver.ensure(code)
+    return {"kind": "code", "code": code}
+
+
+def execute_job(pool, assistant, command: str, payload: dict, cancelled) -> str:
+    """Run a prepared job. Called by the queue's scheduler thread with the
+    desktop input lock held, so jobs (and assistant.py) never interleave;
+    assistant jobs run without it, the assistant takes it itself."""
+    if payload["kind"] == "assistant":
+        try:
+            reply = assistant.request("command", text=command, timeout=ASSISTANT_TIMEOUT)
+        except TimeoutError:
+            # It has the command and will still run it: never run it twice
+            return f"Handed to the assistant (no reply within {ASSISTANT_TIMEOUT:.0f} s)"
+        except ConnectionError:
+            reply = {"handled": False}      # assistant stopped since the job was queued
+        if reply["handled"]:
+            return f"Handled by the assistant in {reply['handle_ms']:.0f} ms (round trip {reply['round_trip_ms']:.1f} ms)"
+        if payload["fallback"] is None:
+            raise RuntimeError("The assistant did not handle this command")
+        with input_lock:
+            return execute_job(pool, assistant, command, payload["fallback"], cancelled)
+
+    if payload["kind"] == "rule":
+        from intent_router import IntentMatch
+        RULE_HANDLERS[payload["intent"]](IntentMatch(payload["intent"], command, payload["slots"], ()))
+        return f"Handled by rule: {payload['intent']}"
+
+    # Generated code runs on a warm worker, not in this script's globals
+    job = pool.submit(payload["code"])
+    while not job.done:
+        if cancelled.wait(0.1):
+            job.cancel()
+    result = job.result()
+    if not result.ok:
+        raise RuntimeError(result.error or f"Automation {result.status}")
+    return result.output
+
+
+# Jobs persist in nexa_jobs.db: preparation runs in parallel, execution one
+# job at a time in submission order
+@st.cache_resource
+def get_command_queue():
+    import functools
+    from command_queue import CommandQueue
+    # A separate client: a long assistant job must not hold up the UI's pings
+    return CommandQueue(
+        prepare_command,
+        functools.partial(execute_job, get_exec_pool(), AssistantClient()),
+        locked=lambda payload: payload["kind"] != "assistant",
+    )
+
+command_queue = get_command_queue()
+
+
+def enqueue(user_text: str, payload: dict):
+    job_id = command_queue.submit(user_text, payload=payload, prepared=True)
+    ahead = command_queue.summary()["depth"] - 1
+    st.info(f"📥 Job #{job_id} queued" + (f" behind {ahead} other job(s)" if ahead > 0 else ""))
+
+
+JOB_ICONS = {"queued": "🕒", "preparing": "🛠️", "ready": "📥", "running": "▶️",
+             "done": "✅", "failed": "❌", "cancelled": "⛔"}
+
+
+def show_queue(limit: int = 10):
+    s = command_queue.summary()
+    st.write(
+        f"Depth: {s['depth']} (preparing {s['queued']} | ready {s['ready']} | running {s['running']}) "
+        f"| Avg wait: {s['avg_wait_seconds']:.2f} s | Avg run: {s['avg_run_seconds']:.2f} s"
+    )
+    for job in command_queue.recent(limit):
+        line = f"{JOB_ICONS.get(job['status'], '')} #{job['id']} `{job['command']}` — {job['status']}"
+        if job["started"]:
+            line += f" | waited {job['started'] - job['created']:.1f} s"
+        if job["finished"] and job["started"]:
+            line += f" | ran {job['finished'] - job['started']:.1f} s"
+        st.write(line)
+        if job["status"] in ("queued", "preparing", "ready", "running"):
+            st.button("⛔ Cancel", key=f"cancel_job_{job['id']}", on_click=command_queue.cancel, args=(job["id"],))
+        if job["error"]:
+            st.code(job["error"], language="text")
+        elif job["output"]:
+            st.code(job["output"], language="text")
 
 # =========================
 # CORE COMMAND PROCESSOR
 # =========================
-def process_command(user_text: str):
-    global db
+def process_command(user_text: str, bypass_cache: bool = False, stream: bool = False,
+                    use_templates: bool = True):
     lower = user_text.lower()
 
     # -----------------------------
     # 1️⃣ MODE SWITCH (DATA CLEANER)
     # -----------------------------
-    if "clean" in lower and ("csv" in lower or "excel" in lower or "database" in lower):
+    if router.match(lower, allowed={"clean_data"}):
         st.session_state.mode = "clean"
         return
 
@@ -255,31 +491,86 @@ def process_command(user_text: str):
     # 2️⃣ RULE-BASED AUTOMATION (CRITICAL)
     # ------------------------------------
     # If command is handled here, STOP.
-    if rule_based_executor(user_text):
+    payload = plan_rule(user_text)
+    forwarded = plan_assistant(user_text, payload)
+    if forwarded is not None:
+        enqueue(user_text, forwarded)
         return
+    if payload is not None:
+        enqueue(user_text, payload)
+        return
+
+    # ------------------------------------
+    # 3️⃣ LEARNED TEMPLATES (NO LLM CALL)
+    # ------------------------------------
+    # Bypassing the cache also bypasses templates: both replay earlier output
+    if use_templates and not bypass_cache:
+        code = template_learner.serve(user_text, response_cache.summary()["avg_miss_ms"] / 1000)
+        if code is not None:
+            st.subheader("Generated Automation Code")
+            st.code(code, language="python")
+            st.caption("⚡ Served locally from a learned template (no LLM call)")
+            auto_import_packages(code)
+            enqueue(user_text, {"kind": "code", "code": code})
+            return
+        # A new template runs only after the user has checked its first output
+        offer = template_learner.proposal(user_text)
+        if offer is not None:
+            template, code = offer
+            st.session_state.template_offer = {"command": user_text, "template": template["command"],
+                                               "code": code, "stream": stream}
+            return
 
     # ------------------------------------
-    # 3️⃣ FALLBACK TO AI (ONLY IF NEEDED)
+    # 4️⃣ FALLBACK TO AI (ONLY IF NEEDED)
     # ------------------------------------
-    with st.spinner("Processing with NEXA..."):
-        code = get_code(user_text, db)
+    start = time.perf_counter()
+
+    # Save memory (runs concurrently with code generation)
+    memory_writer.submit(lower, on_stored=memory_index.add)
+
+    context = memory_index.context_for(user_text, k=5, token_budget=600)
+
+    if stream:
+        # Render tokens into the code panel as they arrive
+        st.subheader("Generated Automation Code")
+        panel = st.empty()
+        code, timings = get_code_stream(
+            user_text, context,
+            on_update=lambda text: panel.code(text, language="python"),
+            bypass_cache=bypass_cache,
+        )
+        code = sanitize_code(code)
+        panel.code(code, language="python")
+        if timings:
+            st.caption(
+                f"First token: {timings['ttft'] or 0:.2f} s | Code complete: {timings['code_ready']:.2f} s"
+                + (" (stopped at closing fence)" if timings["early_stop"] else "")
+            )
+    else:
+        with st.spinner("Processing with NEXA..."):
+            code = get_code(user_text, context, bypass_cache=bypass_cache)
 
-    # Sanitize LLM output (strip markdown fences or backticks)
-    code = sanitize_code(code)
+        # Sanitize LLM output (strip markdown fences or backticks)
+        code = sanitize_code(code)
 
-    # Save memory
-    db_content = get_db(lower)
-    with open("JARVIS_db.txt", "a", encoding="utf-8") as f:
-        f.write(db_content + "\n")
-        db += "\n" + db_content
+        # Show generated code
+        st.subheader("Generated Automation Code")
+        st.code(code, language="python")
 
-    # Show generated code
-    st.subheader("Generated Automation Code")
-    st.code(code, language="python")
+    # Learn a parameterized template if this script repeats with new slots
+    if template_learner.observe(user_text, code):
+        st.caption("🧩 Learned a new local template from this command")
 
-    # Auto-install imports & execute
+    # Auto-install imports & queue for execution
     auto_import_packages(code)
-    exec(code, globals())
+    time_to_exec = time.perf_counter() - start
+    mem = memory_writer.summary()
+    st.caption(
+        f"⏱️ Time to queue: {time_to_exec:.2f} s "
+        f"(memory summary off the critical path, avg {mem['avg_seconds']:.2f} s saved per command)"
+    )
+    enqueue(user_text, {"kind": "code", "code": code})
 
 # =========================
 # HERO SECTION
@@ -321,41 +612,178 @@ st.session_state.mode = None if mode == "AI Automation" else "clean"
 # =========================
 # DATA CLEANER UI
 # =========================
+@st.cache_resource
+def get_profiler():
+    from profiling import Profiler
+    return Profiler()
+
 if st.session_state.mode == "clean":
     st.subheader("🧹 Database Cleaner")
 
     uploaded_file = st.file_uploader("Upload CSV or Excel", ["csv", "xlsx"])
 
     if uploaded_file:
-        original_df = pd.read_csv(uploaded_file) if uploaded_file.name.endswith(".csv") else pd.read_excel(uploaded_file)
-        uploaded_file.seek(0)
-
-        rows_before = len(original_df)
-        empty_rows = original_df.isna().all(axis=1).sum()
-        duplicate_rows = original_df.duplicated().sum()
+        from data_cleaner import clean_file, OUTPUT_FORMATS
+
+        output_format = st.selectbox(
+            "Output format", list(OUTPUT_FORMATS),
+            help="Parquet / Feather need pyarrow; Excel is the slowest and capped at 1,048,576 rows",
+        )
+
+        optimize = st.checkbox(
+            "Optimize column types (category / Arrow strings / downcast numbers / dates)", value=False
+        )
+
+        near_dup = st.checkbox("Remove near-duplicate rows (typos, casing, spacing)", value=False)
+        near_options = {}
+        if near_dup:
+            near_options["near_duplicate_threshold"] = st.slider(
+                "Similarity threshold", 0.5, 1.0, 0.8, 0.05,
+                help="Estimated Jaccard similarity of character 3-grams; higher merges fewer rows",
+            )
+            near_columns = st.text_input("Match on columns (comma separated, empty = all)")
+            near_options["near_duplicate_columns"] = [c for c in near_columns.split(",") if c.strip()]
 
         if st.button("🧼 Clean File"):
-            cleaned_df = clean_excel_or_csv(uploaded_file)
-            rows_after = len(cleaned_df)
-
-            st.success("File cleaned successfully!")
+            try:
+                cleaned_df, stats = clean_file(uploaded_file, optimize=optimize, **near_options)
+            except KeyError as e:
+                st.error(f"Unknown column for near-duplicate matching: {e}")
+                st.stop()
+            st.session_state["cleaned"] = {"df": cleaned_df, "stats": stats, "format": output_format}
+            # Start the default EDA report right away; it runs in the background
+            st.session_state["profile_job"] = get_profiler().submit(cleaned_df, mode="minimal")
+
+    cleaned = st.session_state.get("cleaned")
+    if cleaned:
+        from data_cleaner import export_dataframe, output_filename, OUTPUT_FORMATS
+        from profiling import MODES, SAMPLE_THRESHOLD
+
+        cleaned_df, stats, fmt = cleaned["df"], cleaned["stats"], cleaned["format"]
+        st.success(f"{stats.source} cleaned successfully!")
+
+        st.subheader("📊 Cleaning Statistics")
+        for label, value in stats.rows():
+            st.write(f"{label}: {value}")
+        if stats.near_duplicate_examples:
+            with st.expander("Near-duplicate clusters (examples)"):
+                for rows in stats.near_duplicate_examples:
+                    st.write(rows)
+
+        # Serialized in memory per session, no shared file on disk
+        try:
+            data_bytes = export_dataframe(cleaned_df, fmt)
+            st.download_button(
+                "⬇️ Download Cleaned File", data_bytes,
+                output_filename("cleaned_file", fmt),
+                mime=OUTPUT_FORMATS[fmt][1],
+            )
+        except (ImportError, ValueError) as e:
+            st.error(f"Could not write {fmt}: {e}")
+
+        st.subheader("📈 EDA Report")
+        with st.expander("Report options"):
+            profile_mode = st.radio("Mode", MODES, horizontal=True)
+            profile_columns = st.multiselect("Columns (empty = all)", list(cleaned_df.columns))
+            sample_rows = st.number_input("Sample rows above", value=SAMPLE_THRESHOLD, min_value=1_000, step=10_000)
+            if st.button("📈 Generate report"):
+                st.session_state["profile_job"] = get_profiler().submit(
+                    cleaned_df, mode=profile_mode, columns=profile_columns, sample_threshold=int(sample_rows)
+                )
+
+        def show_profile_status():
+            job = st.session_state.get("profile_job")
+            if job is None:
+                return
+            if job.status == "done":
+                report = job.read()
+                if report is None:
+                    # Evicted from the disk cache meanwhile: generate it again
+                    st.session_state["profile_job"] = get_profiler().submit(cleaned_df, **job.options)
+                    st.rerun()
+                note = " (cached)" if job.cached else ""
+                st.download_button(f"⬇️ Download EDA Report{note}", report, "eda_report.html", mime="text/html")
+            elif job.status == "failed":
+                st.error(f"EDA report failed: {job.error}")
+            elif polling:
+                st.progress(job.progress, text=job.message)
+            else:
+                st.progress(job.progress, text=job.message)
+                st.button("🔄 Refresh report status")
+
+        # Poll the background job without rerunning the whole page; once it
+        # finishes, one full rerun renders the download outside the fragment
+        job = st.session_state.get("profile_job")
+        polling = job is not None and not job.done and hasattr(st, "fragment")
+        if polling:
+            @st.fragment(run_every=1.0)
+            def poll_profile_status():
+                if job.done:
+                    st.rerun()
+                show_profile_status()
+            poll_profile_status()
+        else:
+            show_profile_status()
 
-            st.subheader("📊 Cleaning Statistics")
-            st.write(f"Rows before: {rows_before}")
-            st.write(f"Rows after: {rows_after}")
-            st.write(f"Empty rows removed: {empty_rows}")
-            st.write(f"Duplicate rows removed: {duplicate_rows}")
+    with st.expander("📦 Batch cleaning (multiple files / all sheets)"):
+        from data_cleaner import OUTPUT_FORMATS
 
-            report = ProfileReport(cleaned_df, explorative=True)
-            report_path = "eda_report.html"
-            report.to_file(report_path)
+        batch_files = st.file_uploader("Upload CSV or Excel files", ["csv", "xlsx"], accept_multiple_files=True)
+        batch_format = st.selectbox("Output format for batch", list(OUTPUT_FORMATS), key="batch_format")
+        batch_optimize = st.checkbox("Optimize column types", value=False, key="batch_optimize")
 
-            cleaned_df.to_excel("cleaned_file.xlsx", index=False)
+        if batch_files and st.button("🧼 Clean all"):
+            import pandas as pd
+            from batch_cleaner import clean_batch
 
-            st.download_button("⬇️ Download Cleaned File", open("cleaned_file.xlsx", "rb"), "cleaned_file.xlsx")
-            st.download_button("⬇️ Download EDA Report", open(report_path, "rb"), "eda_report.html")
+            progress = st.progress(0.0, text="Starting workers")
+            archive, reports = clean_batch(
+                [(f.name, f.getvalue()) for f in batch_files],
+                fmt=batch_format, optimize=batch_optimize,
+                on_progress=lambda done, total: progress.progress(done / total, text=f"{done}/{total} sheets cleaned"),
+            )
+            st.dataframe(pd.DataFrame([dict(r.rows()) for r in reports], index=[r.source for r in reports]))
+            for r in reports:
+                if r.error:
+                    st.error(f"{r.source}: {r.error}")
+            st.download_button("⬇️ Download cleaned archive", archive, "cleaned_batch.zip", mime="application/zip")
+
+    with st.expander("🗂️ Large CSV (out-of-core)"):
+        st.write("Stream-clean a CSV on disk that is too large to upload or load into memory.")
+        src_path = st.text_input("CSV path on this machine")
+        dst_path = st.text_input("Output path", value=(os.path.splitext(src_path)[0] + "_cleaned.csv") if src_path else "")
+        col_c1, col_c2 = st.columns(2)
+        with col_c1:
+            chunksize = st.number_input("Rows per chunk", value=200_000, min_value=1_000, step=50_000)
+        with col_c2:
+            hash_mb = st.number_input("Duplicate-tracking memory (MB)", value=256, min_value=16, step=64)
+
+        if st.button("🚚 Clean in chunks"):
+            import pandas as pd
+            from data_cleaner import clean_csv_chunked, same_file
+
+            if not src_path or not os.path.exists(src_path):
+                st.error("CSV not found")
+            elif not dst_path:
+                st.error("Enter an output path")
+            elif same_file(src_path, dst_path):
+                st.error("Output path must differ from the input CSV")
+            else:
+                progress = st.empty()
+                try:
+                    stats = clean_csv_chunked(
+                        src_path, dst_path, chunksize=int(chunksize), max_hash_memory_mb=hash_mb,
+                        spill_dir=os.path.dirname(os.path.abspath(dst_path)),
+                        on_progress=lambda n: progress.write(f"Rows processed: {n:,}"),
+                    )
+                except (pd.errors.ParserError, pd.errors.EmptyDataError, UnicodeDecodeError, OSError) as e:
+                    st.error(f"Could not clean {src_path}: {type(e).__name__}: {e}")
+                else:
+                    st.success(f"Cleaned file written to {dst_path}")
+                    for label, value in stats.rows():
+                        st.write(f"{label}: {value}")
 
-    st.button("🔙 Exit Cleaner", on_click=lambda: st.session_state.update({"mode": None}))
+    st.button("🔙 Exit Cleaner", on_click=lambda: st.session_state.update({"mode": None, "cleaned": None}))
 
 # =========================
 # AI AUTOMATION UI
@@ -364,6 +792,11 @@ if st.session_state.mode is None:
     st.subheader("🤖 AI Automation Console")
 
     typed_command = st.text_input("Enter command", placeholder="send hi to aman on whatsapp")
+    opt1, opt2 = st.columns(2)
+    with opt1:
+        stream_output = st.checkbox("Stream LLM output", value=True)
+    with opt2:
+        bypass_cache = st.checkbox("Bypass response cache", value=False)
 
     col1, col2 = st.columns(2)
 
@@ -371,40 +804,150 @@ if st.session_state.mode is None:
         if st.button("🎙️ Speak"):
             cmd = listen()
             if cmd:
-                process_command(cmd)
+                process_command(cmd, bypass_cache=bypass_cache, stream=stream_output)
 
     with col2:
         if st.button("⚡ Run"):
             if typed_command.strip():
-                process_command(typed_command.strip())
+                process_command(typed_command.strip(), bypass_cache=bypass_cache, stream=stream_output)
             else:
                 st.warning("Please enter a command")
-    # Assistant control buttons
+
+    offer = st.session_state.get("template_offer")
+    if offer:
+        st.info(f"🧩 Learned template `{offer['template']}` matches this command. Run it without the LLM?")
+        st.code(offer["code"], language="python")
+        ok_col, llm_col = st.columns(2)
+        with ok_col:
+            if st.button("✅ Run and trust this template"):
+                del st.session_state.template_offer
+                template_learner.confirm(offer["template"])
+                auto_import_packages(offer["code"])
+                enqueue(offer["command"], {"kind": "code", "code": offer["code"]})
+        with llm_col:
+            if st.button("🤖 Ask the LLM instead"):
+                del st.session_state.template_offer
+                template_learner.decline(offer["template"])
+                process_command(offer["command"], stream=offer["stream"], use_templates=False)
+
+    with st.expander("📦 Batch"):
+        batch = st.text_area("One command per line", placeholder="open notepad\nplay lofi on youtube")
+        if st.button("📥 Queue all"):
+            ids = command_queue.submit_batch(batch.splitlines())
+            st.success(f"Queued {len(ids)} job(s): prepared in parallel, run one at a time in order")
+
+    # Poll the queue without rerunning the whole page while jobs are pending
+    with st.expander("📋 Job queue", expanded=True):
+        if command_queue.summary()["depth"] and hasattr(st, "fragment"):
+            @st.fragment(run_every=0.5)
+            def poll_queue():
+                if not command_queue.summary()["depth"]:
+                    st.rerun()
+                show_queue()
+            poll_queue()
+        else:
+            show_queue()
+
+    with st.expander("🗄️ Response cache"):
+        stats = response_cache.summary()
+        st.write(
+            f"Entries: {stats['entries']} | Hits: {stats['hits']} | Misses: {stats['misses']} "
+            f"| Hit rate: {stats['hit_rate']:.0%}"
+        )
+        st.write(
+            f"Avg hit: {stats['avg_hit_ms']:.1f} ms | Avg LLM call: {stats['avg_miss_ms']:.0f} ms "
+            f"| Time saved: {stats['saved_seconds']:.1f} s"
+        )
+        if st.button("🗑️ Clear cache"):
+            response_cache.clear()
+            st.success("Response cache cleared")
+        if typed_command.strip() and st.button("♻️ Invalidate this command"):
+            if response_cache.invalidate(make_key(typed_command.strip(), prompt, data)):
+                st.success("Cached response removed")
+            else:
+                st.info("Command was not cached")
+
+    with st.expander("🧠 Memory"):
+        mem = memory_writer.summary()
+        st.write(
+            f"Entries: {len(memory_store)} | Pending summaries: {mem['pending']} "
+            f"| Stored: {mem['stored']} | Duplicates: {mem['duplicates']} | Failed: {mem['failed']}"
+        )
+        st.write(
+            f"Skipped (already summarized): {mem['skipped']} | Low-value dropped: {mem['filtered']} "
+            f"| LLM calls / 100 commands: {mem['calls_per_100']:.1f} | Tokens / 100 commands: {mem['tokens_per_100']:.0f}"
+        )
+        if mem["pending"] and st.button("📝 Summarize pending now"):
+            with st.spinner("Summarizing..."):
+                memory_writer.flush(timeout=60)
+        if mem["last_error"]:
+            st.caption(f"Last summarization error: {mem['last_error']}")
+
+    with st.expander("🧩 Learned templates"):
+        tpl = template_learner.summary()
+        st.write(
+            f"Templates: {tpl['templates']} | LLM calls avoided: {tpl['served']} "
+            f"| Avg lookup: {tpl['avg_lookup_ms']:.2f} ms | Avg latency saved: {tpl['avg_saved_seconds']:.2f} s"
+        )
+        for t in template_learner.templates:
+            state = "" if t.get("confirmed") else " (declined)" if t.get("declined") else " (not confirmed yet)"
+            st.write(f"`{t['command']}` — used {t['hits']}×" + state)
+
+    # Assistant control buttons (idempotent: any session can start or stop
+    # the single assistant service)
     col3 = st.columns(1)[0]
     with col3:
         if st.button("🟢 Start Assistant"):
-            proc = st.session_state.get("assistant_proc")
-            if proc is None:
-                try:
-                    p = subprocess.Popen([sys.executable, "assistant.py"])
-                    st.session_state["assistant_proc"] = p
+            try:
+                with st.spinner("Starting assistant..."):
+                    state = start_service(assistant_client)
+                if state == "started":
                     st.success("Assistant started")
-                except Exception as e:
-                    st.error(f"Failed to start assistant: {e}")
-            else:
-                st.info("Assistant already running")
+                else:
+                    st.info("Assistant already running")
+            except Exception as e:
+                st.error(f"Failed to start assistant: {e}")
 
         if st.button("🔴 Stop Assistant"):
-            proc = st.session_state.get("assistant_proc")
-            if proc:
-                try:
-                    proc.terminate()
-                    st.session_state["assistant_proc"] = None
+            try:
+                if stop_service(assistant_client) == "stopped":
                     st.success("Assistant stopped")
+                else:
+                    st.info("Assistant not running")
+            except Exception as e:
+                st.error(f"Failed to stop assistant: {e}")
+
+        health = assistant_client.ping(timeout=0.5)
+        if health:
+            st.caption(
+                f"🟢 Assistant running (pid {health['pid']}, up {health['uptime'] / 60:.0f} min) "
+                f"| ping {health['round_trip_ms']:.1f} ms"
+            )
+            with st.expander("📡 Assistant status"):
+                try:
+                    status = assistant_client.request("status", timeout=2)
+                    service, pipeline = status["service"], status["pipeline"]
+                    st.write(
+                        f"Requests: {service['requests']} | Errors: {service['errors']} "
+                        f"| Command handling p50: {service.get('command_p50_ms', 0):.0f} ms "
+                        f"| p95: {service.get('command_p95_ms', 0):.0f} ms"
+                    )
+                    st.write(
+                        f"Voice: {pipeline.get('dispatched', 0)} commands heard "
+                        f"| End-to-end p50: {pipeline.get('end_to_end_p50_ms', 0):.0f} ms "
+                        f"| TTS spoken: {status['tts']['spoken']}"
+                    )
+                    client_stats = assistant_client.summary()
+                    st.caption(
+                        f"IPC round trip p50 {client_stats.get('round_trip_p50_ms', 0):.2f} ms "
+                        f"| p95 {client_stats.get('round_trip_p95_ms', 0):.2f} ms"
+                    )
+                    if pipeline.get("last_error"):
+                        st.caption(f"Last voice error: {pipeline['last_error']}")
                 except Exception as e:
-                    st.error(f"Failed to stop assistant: {e}")
-            else:
-                st.info("Assistant not running")
+                    st.warning(f"Status unavailable: {e}")
+        else:
+            st.caption("⚪ Assistant not running")
 
     # Skip Ad button capture tool
     st.markdown("---")
@@ -425,6 +968,7 @@ if st.session_state.mode is None:
         try:
             # Capture the region
             region = (int(x1), int(y1), int(x2), int(y2))
+            from PIL import ImageGrab
             img = ImageGrab.grab(bbox=region)
             img.save("skip_ad.png")
             st.success(f"✅ Saved skip_ad.png! Region: {region}")
@@ -432,56 +976,56 @@ if st.session_state.mode is None:
         except Exception as e:
             st.error(f"Failed to capture: {e}")
 
-    # Auto-detect using OpenCV template match (uses saved skip_ad.png as template)
-    try:
-        import cv2
-        import numpy as np
-        has_cv = True
-    except Exception:
-        cv2 = None
-        np = None
-        has_cv = False
-
+    # Auto-detect using skip_ad_detector (grayscale pyramid + ROI around the last hit)
     if st.button("🧭 Auto-detect Skip Now"):
         if not os.path.exists('skip_ad.png'):
             st.error('No skip_ad.png found — capture it first')
-        elif not has_cv:
+        elif get_skip_ad_watcher() is None:
             st.error('OpenCV not installed. Run: pip install opencv-python numpy')
         else:
             try:
                 import pyautogui
-                # take full screenshot
+                from PIL import ImageDraw
                 s = pyautogui.screenshot()
-                screen = cv2.cvtColor(np.array(s), cv2.COLOR_RGB2BGR)
-                tpl = cv2.imread('skip_ad.png', cv2.IMREAD_COLOR)
-                th, tw = tpl.shape[:2]
-                best_val = -1
-                best_loc = None
-                best_scale = 1.0
-                for scale in np.linspace(0.8, 1.2, 9):
-                    try:
-                        resized = cv2.resize(tpl, (int(tw*scale), int(th*scale)), interpolation=cv2.INTER_AREA)
-                    except Exception:
-                        continue
-                    if resized.shape[0] < 5 or resized.shape[1] < 5:
-                        continue
-                    res = cv2.matchTemplate(screen, resized, cv2.TM_CCOEFF_NORMED)
-                    _, max_val, _, max_loc = cv2.minMaxLoc(res)
-                    if max_val > best_val:
-                        best_val = max_val
-                        best_loc = max_loc
-                        best_scale = scale
-                if best_val >= 0.55 and best_loc is not None:
-                    x, y = best_loc
-                    h, w = int(th*best_scale), int(tw*best_scale)
-                    cv2.rectangle(screen, (x,y), (x+w, y+h), (0,255,0), 3)
-                    out = cv2.cvtColor(screen, cv2.COLOR_BGR2RGB)
-                    from PIL import Image
-                    im = Image.fromarray(out)
-                    im.save('skip_ad_found.png')
-                    st.image(im, caption=f'Auto-detect found match (score {best_val:.2f})', use_column_width=True)
-                    st.success(f'Found match at {x,y} score {best_val:.2f}. Saved skip_ad_found.png')
+                start = time.perf_counter()
+                match = get_skip_ad_watcher().detector.detect(s)
+                detect_ms = 1000 * (time.perf_counter() - start)
+                if match is not None:
+                    ImageDraw.Draw(s).rectangle(
+                        (match.x, match.y, match.x + match.w, match.y + match.h), outline=(0, 255, 0), width=3
+                    )
+                    s.save('skip_ad_found.png')
+                    st.image(s, caption=f'Auto-detect found match (score {match.score:.2f})', use_column_width=True)
+                    st.success(f'Found match at {match.x, match.y} score {match.score:.2f} in {detect_ms:.0f} ms. Saved skip_ad_found.png')
                 else:
                     st.warning('No confident match found (try recapturing template or adjust capture region)')
             except Exception as e:
-                st.error(f'Auto-detect failed: {e}')
\ No newline at end of file
+                st.error(f'Auto-detect failed: {e}')
+
+    # Watch mode: keeps looking in the background and clicks Skip when it shows up.
+    # OpenCV is only loaded once the detector has been used.
+    show_watch = os.path.exists('skip_ad.png') and (
+        st.checkbox("👀 Watch mode (auto-click Skip Ad)") or "skip_ad_detector" in sys.modules
+    )
+    watcher = get_skip_ad_watcher() if show_watch else None
+    if show_watch and watcher is None:
+        st.error('OpenCV not installed. Run: pip install opencv-python numpy')
+    elif watcher is not None:
+        col_w1, col_w2 = st.columns([2, 1])
+        with col_w1:
+            watcher.fps = st.slider("Watch frame rate (fps)", 0.5, 10.0, float(watcher.fps), 0.5)
+        with col_w2:
+            if watcher.running:
+                if st.button("⏹️ Stop watching"):
+                    watcher.stop()
+                    st.rerun()
+            elif st.button("👀 Watch & auto-skip"):
+                watcher.start()
+                st.rerun()
+        if watcher.running or watcher.stats["frames"]:
+            s = watcher.stats
+            st.caption(
+                f"{'Watching' if watcher.running else 'Stopped'} · {s['frames']} frames · "
+                f"{s['detect_ms']:.0f} ms/detect · {s['hits']} hits · {s['clicks']} clicks"
+                + (f" · last error: {s['last_error']}" if s["last_error"] else "")
+            )
@@ -6,13 +6,15 @@ Features:
 - Robust speech recognition (keyword-based)
 - OS-level media control (play/pause/mute)
 - YouTube control with SAME TAB and NEW TAB logic
-- Designed to be started/stopped from J3.py
+- Designed to be started/stopped from J3.py, which talks to it over a
+  local socket (assistant_ipc)
 """
 
-import time
 import webbrowser
+import signal
 import sys
-import re
+import threading
+import time
 
 # =========================
 # IMPORTS
@@ -21,199 +23,251 @@ try:
     import speech_recognition as sr
     import pyautogui
     import pywhatkit
-    import pygetwindow as gw
 except Exception as e:
     print("Missing packages:", e)
     sys.exit(1)
 
-try:
-    import pyttsx3
-    tts_engine = pyttsx3.init()
-except Exception:
-    tts_engine = None
+from intent_router import router
+from ui_wait import get_backend, wait_for_focus, wait_for_window
+from command_queue import input_lock
+from assistant_ipc import AssistantService
+from voice_capture import VoiceCapture
+from voice_pipeline import GoogleRecognizer, VoicePipeline
+
+from tts_worker import TTSWorker
+
+# Speaks on its own thread (the pyttsx3 engine is created there too)
+tts = TTSWorker()
 
 # =========================
 # GLOBALS
 # =========================
 r = sr.Recognizer()
 last_target = None
-last_command_time = 0
-COMMAND_COOLDOWN = 1.2  # seconds (prevents echo / double toggle)
+last_toggle = {}
+# Commands arrive from the voice dispatcher and from IPC service threads;
+# handlers share last_target / last_toggle, so they run one at a time
+command_lock = threading.Lock()
+TOGGLE_COOLDOWN = 1.2  # seconds (a repeated toggle this soon would undo itself)
 
 # =========================
 # SPEAK
 # =========================
 def say(text: str):
+    # Queued: returns immediately so the announced action is not delayed
     print("Assistant:", text)
-    if tts_engine:
-        try:
-            tts_engine.say(text)
-            tts_engine.runAndWait()
-        except Exception:
-            pass
+    tts.say(text)
 
 # =========================
 # WINDOW HELPERS
 # =========================
 def focus_youtube_window():
     try:
-        for title in gw.getAllTitles():
-            if title and "youtube" in title.lower():
-                gw.getWindowsWithTitle(title)[0].activate()
-                return True
+        title = wait_for_window("youtube", timeout=0)   # only if one is open right now
+        get_backend().activate(title)
+        wait_for_focus("youtube", timeout=2)
+        return True
     except Exception:
-        pass
-    return False
+        return False
 
 def close_youtube():
-    try:
-        for title in gw.getAllTitles():
-            if title and "youtube" in title.lower():
-                win = gw.getWindowsWithTitle(title)[0]
-                win.activate()
-                time.sleep(0.2)
-                pyautogui.hotkey("ctrl", "w")  # close tab
-                return True
-    except Exception:
-        pass
+    if focus_youtube_window():
+        pyautogui.hotkey("ctrl", "w")  # close tab
+        return True
     return False
 
 # =========================
 # COMMAND HANDLER
 # =========================
-def handle_command(text: str):
-    global last_target, last_command_time
-
-    # Cooldown (prevents TTS echo & rapid repeats)
-    now = time.time()
-    if now - last_command_time < COMMAND_COOLDOWN:
-        return
-    last_command_time = now
+def handle_command(text: str, speak_miss: bool = True) -> bool:
+    # Barge-in: a new command cuts off whatever is still being said
+    tts.interrupt()
 
     t = text.lower().strip()
     print("Parsed:", t)
 
-    # -------------------------
-    # OPEN YOUTUBE
-    # -------------------------
-    if "open youtube" in t:
-        say("Opening YouTube")
-        webbrowser.open("https://www.youtube.com")
-        last_target = "youtube"
-        return
+    # Same file lock as J3.py's job scheduler: never type over a running automation
+    with command_lock, input_lock:
+        handled = router.dispatch(t, HANDLERS)
+    if not handled and speak_miss:
+        say("Sorry, I didn't understand")
+    return handled
 
-    # -------------------------
-    # CLOSE YOUTUBE
-    # -------------------------
-    if "close youtube" in t or "exit youtube" in t:
-        say("Closing YouTube")
-        close_youtube()
-        return
+# -------------------------
+# INTENT HANDLERS
+# -------------------------
+# Dispatched by intent_router (most specific intent first). A handler
+# returns False to let the next matching intent try.
+def open_youtube(m):
+    global last_target
+    say("Opening YouTube")
+    webbrowser.open("https://www.youtube.com")
+    last_target = "youtube"
+    return True
 
-    # -------------------------
-    # PLAY NEXT SONG (NEW TAB)
-    # -------------------------
-    if (
-        "play next song" in t
-        or "open new song" in t
-        or "queue" in t
-    ):
-        song = re.sub(
-            r"play next song|open new song|queue|on youtube",
-            "",
-            t
-        ).strip()
-
-        if song:
-            say(f"Opening {song} in new tab")
-            query = song.replace(" ", "+")
-            webbrowser.open_new_tab(
-                f"https://www.youtube.com/results?search_query={query}"
-            )
-            last_target = "youtube"
-        return
+def close_youtube_intent(m):
+    say("Closing YouTube")
+    close_youtube()
+    return True
 
-    # -------------------------
-    # PLAY SONG (SAME TAB)
-    # -------------------------
-    if t.startswith("play ") and ("youtube" in t or last_target == "youtube"):
-        song = re.sub(r"play|on youtube|youtube", "", t).strip()
-        if song:
-            say(f"Playing {song}")
-            focus_youtube_window()
-            pywhatkit.playonyt(song)
-            last_target = "youtube"
-        return
+def play_next(m):
+    global last_target
+    song = m.slots.get("song")
+    if song:
+        say(f"Opening {song} in new tab")
+        query = song.replace(" ", "+")
+        webbrowser.open_new_tab(
+            f"https://www.youtube.com/results?search_query={query}"
+        )
+        last_target = "youtube"
+    return True
 
-    # -------------------------
-    # PLAY / PAUSE / RESUME
-    # -------------------------
-    if "pause" in t or "resume" in t or (t == "play" and last_target == "youtube"):
-        say("Toggling play pause")
-        pyautogui.press("playpause")   # OS media key
-        return
+def play_song(m):
+    global last_target
+    song = m.slots.get("song")
+    if m.name == "play_song" and last_target != "youtube":
+        return False
+    if not song:
+        # bare "play" resumes the current video
+        return last_target == "youtube" and toggle_play_pause(m)
+    say(f"Playing {song}")
+    focus_youtube_window()
+    pywhatkit.playonyt(song)
+    last_target = "youtube"
+    return True
 
-    # -------------------------
-    # MUTE
-    # -------------------------
-    if "mute" in t and "unmute" not in t:
-        say("Muting")
-        pyautogui.press("volumemute")
-        return
+def toggle_too_soon(key: str) -> bool:
+    # Play/pause and mute are toggles: the same key twice in quick
+    # succession (a repeated or re-recognized phrase) cancels itself out
+    now = time.monotonic()
+    if now - last_toggle.get(key, 0.0) < TOGGLE_COOLDOWN:
+        print("Ignored repeated toggle:", key)
+        return True
+    last_toggle[key] = now
+    return False
 
-    # -------------------------
-    # UNMUTE
-    # -------------------------
-    if "unmute" in t or "sound on" in t:
-        say("Unmuting")
-        pyautogui.press("volumemute")
-        return
+def toggle_play_pause(m):
+    if toggle_too_soon("playpause"):
+        return True
+    say("Toggling play pause")
+    pyautogui.press("playpause")   # OS media key
+    return True
 
-    # -------------------------
-    # VOLUME UP
-    # -------------------------
-    if "increase volume" in t or "volume up" in t:
-        say("Increasing volume")
-        for _ in range(5):
-            pyautogui.press("volumeup")
-        return
+def mute(m):
+    if toggle_too_soon("volumemute"):
+        return True
+    say("Muting")
+    pyautogui.press("volumemute")
+    return True
 
-    # -------------------------
-    # VOLUME DOWN
-    # -------------------------
-    if "decrease volume" in t or "volume down" in t:
-        say("Decreasing volume")
-        for _ in range(5):
-            pyautogui.press("volumedown")
-        return
+def unmute(m):
+    if toggle_too_soon("volumemute"):
+        return True
+    say("Unmuting")
+    pyautogui.press("volumemute")
+    return True
+
+def volume_up(m):
+    say("Increasing volume")
+    for _ in range(5):
+        pyautogui.press("volumeup")
+    return True
 
-    say("Sorry, I didn't understand")
+def volume_down(m):
+    say("Decreasing volume")
+    for _ in range(5):
+        pyautogui.press("volumedown")
+    return True
+
+HANDLERS = {
+    "open_youtube": open_youtube,
+    "close_youtube": close_youtube_intent,
+    "play_next": play_next,
+    "youtube_play": play_song,
+    "play_song": play_song,
+    "play_pause": toggle_play_pause,
+    "mute": mute,
+    "unmute": unmute,
+    "volume_up": volume_up,
+    "volume_down": volume_down,
+}
 
 # =========================
 # LISTEN LOOP
 # =========================
+def on_heard(text: str):
+    print("Heard:", text)
+    handle_command(text)
+
+def is_echo(phrase, text, capture):
+    # Only what repeats the assistant's own words is dropped: a command
+    # spoken over it still barges in
+    return tts.is_echo(text, *capture.wall_span(phrase))
+
 def listen_loop():
-    say("Assistant started")
+    stopping = threading.Event()
+
+    # One microphone stream for the whole session, calibrated once.
+    # Capture keeps listening while earlier phrases are recognized and
+    # handled; commands are still handled one at a time, in spoken order.
+    capture = VoiceCapture(sr.Microphone, r)
+    pipeline = VoicePipeline(
+        capture,
+        GoogleRecognizer(r, language="en-IN"),
+        on_heard,
+        workers=2,
+        suppress=lambda phrase, text: is_echo(phrase, text, capture),
+    )
 
-    while True:
-        try:
-            with sr.Microphone() as source:
-                r.adjust_for_ambient_noise(source, duration=0.5)
-                print("Listening...")
-                audio = r.listen(source, phrase_time_limit=6)
-
-            text = r.recognize_google(audio, language="en-IN")
-            print("Heard:", text)
-            handle_command(text)
-
-        except sr.UnknownValueError:
-            continue
-        except KeyboardInterrupt:
-            say("Assistant stopped")
-            break
-        except Exception as e:
-            print("Error:", e)
-            time.sleep(1)
+    # Local service for J3.py: typed commands reach this warm process
+    # (imports, TTS engine, microphone) instead of a new one
+    def remote_command(request):
+        start = time.perf_counter()
+        handled = handle_command(request["text"], speak_miss=False)
+        return {"handled": handled, "handle_ms": round(1000 * (time.perf_counter() - start), 1)}
+
+    def remote_say(request):
+        say(request["text"])
+
+    def status(request):
+        return {
+            "last_target": last_target,
+            "pipeline": pipeline.metrics.summary(),
+            "tts": dict(tts.stats),
+            "service": service.metrics(),
+        }
+
+    service = AssistantService(
+        {
+            "command": remote_command,
+            "say": remote_say,
+            "status": status,
+            "shutdown": lambda request: stopping.set(),
+        },
+        info={"intents": sorted(HANDLERS)},
+    )
+    try:
+        service.start()
+    except RuntimeError as e:
+        print(e)       # one assistant per machine: the running one keeps serving
+        return
+    signal.signal(signal.SIGTERM, lambda *args: stopping.set())
+
+    say("Assistant started")
+    print("Listening...")
+    pipeline.start()
+    try:
+        while not stopping.wait(0.5):
+            pass
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+        pipeline.stop()
+        print("Pipeline:", pipeline.metrics.summary())
+        capture.close()
+        say("Assistant stopped")
+        tts.wait_idle(timeout=3)
 
 # =========================
 # ENTRY POINT
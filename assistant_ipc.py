@@ -0,0 +1,332 @@
+"""
+Assistant IPC – local channel between J3.py and the long-lived assistant.py
+
+- assistant.py serves requests through multiprocessing.connection: a Unix
+  domain socket on Linux/macOS, a named pipe on Windows, authenticated with
+  a per-install key (nexa_assistant.key)
+- J3.py forwards commands to the already-warm assistant (imports, TTS engine
+  and microphone loaded) and reads status, health and latency back
+- start_service() / stop_service() are idempotent across Streamlit sessions:
+  the running assistant is found through its socket, not a Popen handle in
+  one browser session's state, and concurrent starts spawn only one process
+
+Run directly to compare an IPC round trip with spawning a process:
+    python assistant_ipc.py --requests 200
+"""
+
+import collections
+import getpass
+import os
+import secrets
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+
+from command_queue import InputLock
+
+if os.name == "nt":
+    ADDRESS = r"\\.\pipe\nexa-assistant"
+else:
+    ADDRESS = os.path.join(tempfile.gettempdir(), f"nexa-assistant-{getpass.getuser()}.sock")
+KEY_FILE = "nexa_assistant.key"
+START_LOCK_FILE = "nexa_assistant_start.lock"
+LOG_FILE = "nexa_assistant.log"
+TIMEOUT = 15.0
+START_TIMEOUT = 30.0
+
+
+class AssistantError(RuntimeError):
+    """The assistant received the request but its handler failed."""
+
+
+def load_authkey(path: str = KEY_FILE) -> bytes:
+    """Shared secret for both ends; created (owner-only) on first use."""
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        pass
+    key = secrets.token_bytes(32)
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:          # another process won the race
+        with open(path, "rb") as f:
+            return f.read()
+    with os.fdopen(fd, "wb") as f:
+        f.write(key)
+    return key
+
+
+def _percentiles(samples) -> dict:
+    ordered = sorted(samples)
+    if not ordered:
+        return {}
+    return {
+        "p50_ms": round(1000 * ordered[len(ordered) // 2], 2),
+        "p95_ms": round(1000 * ordered[int(0.95 * (len(ordered) - 1))], 2),
+    }
+
+
+# =========================
+# SERVER (assistant.py)
+# =========================
+class AssistantService:
+    def __init__(self, handlers: dict, info: dict = None, address: str = ADDRESS, authkey: bytes = None):
+        """handlers: op -> fn(request dict) -> reply dict. "ping" and
+        "metrics" are built in; info is added to every ping reply."""
+        self.handlers = dict(handlers)
+        self.handlers.setdefault("ping", lambda request: {"pid": os.getpid(), "uptime": time.time() - self.started,
+                                                          **(info or {})})
+        self.handlers.setdefault("metrics", lambda request: self.metrics())
+        self.address = address
+        self.authkey = authkey or load_authkey()
+        self.started = time.time()
+        self.stats = {"connections": 0, "requests": 0, "errors": 0, "rejected": 0}
+        self._latency = collections.defaultdict(lambda: collections.deque(maxlen=500))
+        self._lock = threading.Lock()
+        self._listener = None
+
+    def start(self):
+        """Bind the socket and serve on background threads. RuntimeError if
+        another assistant is already serving this address."""
+        if os.name != "nt" and os.path.exists(self.address):
+            if AssistantClient(self.address, self.authkey).ping(timeout=1.0):
+                raise RuntimeError(f"An assistant is already serving {self.address}")
+            os.unlink(self.address)  # left behind by a killed process
+        try:
+            self._listener = Listener(self.address, authkey=self.authkey)
+        except OSError as e:        # named pipe busy: another instance owns it
+            raise RuntimeError(f"Cannot listen on {self.address}: {e}") from e
+        threading.Thread(target=self._accept_loop, name="nexa-ipc", daemon=True).start()
+
+    def close(self):
+        if self._listener is not None:
+            self._listener.close()
+            self._listener = None
+            if os.name != "nt" and os.path.exists(self.address):
+                os.unlink(self.address)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            out = dict(self.stats)
+            out["uptime"] = time.time() - self.started
+            out["pid"] = os.getpid()
+            for op, samples in self._latency.items():
+                out.update({f"{op}_{k}": v for k, v in _percentiles(samples).items()})
+        return out
+
+    def _accept_loop(self):
+        while self._listener is not None:
+            try:
+                conn = self._listener.accept()
+            except AuthenticationError:
+                with self._lock:
+                    self.stats["rejected"] += 1
+                continue
+            except (OSError, AttributeError):
+                return                # listener closed
+            with self._lock:
+                self.stats["connections"] += 1
+            threading.Thread(target=self._serve, args=(conn,), name="nexa-ipc-conn", daemon=True).start()
+
+    def _serve(self, conn):
+        # One connection per client, kept open: a request costs one send/recv
+        with conn:
+            while True:
+                try:
+                    request = conn.recv()
+                except (EOFError, OSError):
+                    return
+                start = time.perf_counter()
+                op = request.get("op")
+                try:
+                    if op not in self.handlers:
+                        raise KeyError(f"unknown op {op!r}")
+                    reply = {"ok": True, **(self.handlers[op](request) or {})}
+                except Exception as e:
+                    reply = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+                seconds = time.perf_counter() - start
+                reply["server_ms"] = round(1000 * seconds, 2)
+                with self._lock:
+                    self.stats["requests"] += 1
+                    self.stats["errors"] += not reply["ok"]
+                    self._latency[op].append(seconds)
+                try:
+                    conn.send(reply)
+                except OSError:
+                    return
+
+
+# =========================
+# CLIENT (J3.py)
+# =========================
+class AssistantClient:
+    def __init__(self, address: str = ADDRESS, authkey: bytes = None, timeout: float = TIMEOUT):
+        self.address = address
+        self.authkey = authkey or load_authkey()
+        self.timeout = timeout
+        self.stats = {"requests": 0, "failures": 0}
+        self._round_trips = collections.deque(maxlen=500)
+        self._conn = None
+        self._lock = threading.Lock()     # one request in flight per connection
+
+    def _drop(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def request(self, op: str, timeout: float = None, **fields) -> dict:
+        """Send one request and wait for the reply. ConnectionError if no
+        assistant is serving, TimeoutError if it does not answer in time
+        (the request may still be carried out), AssistantError if its
+        handler failed. A request is sent at most once."""
+        timeout = self.timeout if timeout is None else timeout
+        with self._lock:
+            try:
+                if self._conn is not None and self._conn.poll(0):
+                    self._drop()        # peer closed (assistant restarted) or a stray reply
+                if self._conn is None:
+                    if os.name != "nt" and not os.path.exists(self.address):
+                        raise ConnectionRefusedError("no socket")
+                    self._conn = Client(self.address, authkey=self.authkey)
+                start = time.perf_counter()
+                self._conn.send({"op": op, **fields})
+            except (EOFError, OSError, AuthenticationError) as e:
+                self._drop()
+                self.stats["failures"] += 1
+                raise ConnectionError(f"Assistant not reachable: {e}") from e
+            # Sent: never resend from here on, the assistant may already be
+            # acting on it
+            try:
+                if not self._conn.poll(timeout):
+                    self._drop()    # a late reply must not answer the next request
+                    self.stats["failures"] += 1
+                    raise TimeoutError(f"Assistant did not answer '{op}' within {timeout:.1f} s")
+                reply = self._conn.recv()
+            except TimeoutError:
+                raise
+            except (EOFError, OSError) as e:
+                self._drop()
+                self.stats["failures"] += 1
+                raise ConnectionError(f"Assistant closed the connection: {e}") from e
+            round_trip = time.perf_counter() - start
+            self.stats["requests"] += 1
+            self._round_trips.append(round_trip)
+        reply["round_trip_ms"] = round(1000 * round_trip, 2)
+        if not reply.get("ok"):
+            raise AssistantError(reply.get("error", "request failed"))
+        return reply
+
+    def ping(self, timeout: float = 1.0):
+        """Ping reply (pid, uptime, ...) if an assistant is serving, else None."""
+        try:
+            return self.request("ping", timeout=timeout)
+        except (OSError, AssistantError):
+            return None
+
+    def summary(self) -> dict:
+        return {**self.stats, **{f"round_trip_{k}": v for k, v in _percentiles(self._round_trips).items()}}
+
+    def close(self):
+        with self._lock:
+            self._drop()
+
+
+# =========================
+# LIFECYCLE
+# =========================
+def start_service(client: AssistantClient = None, command=None, timeout: float = START_TIMEOUT) -> str:
+    """Start assistant.py unless one is already serving. Returns "started"
+    or "already running"."""
+    client = client or AssistantClient()
+    if client.ping():
+        return "already running"
+    # Same file lock as desktop input, on its own file: sessions clicking
+    # Start at the same time spawn one assistant between them
+    with InputLock(START_LOCK_FILE):
+        if client.ping():
+            return "already running"
+        if os.name == "nt":
+            detach = {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP | subprocess.DETACHED_PROCESS}
+        else:
+            detach = {"start_new_session": True}
+        with open(LOG_FILE, "ab") as log:
+            proc = subprocess.Popen(command or [sys.executable, "assistant.py"], stdin=subprocess.DEVNULL,
+                                    stdout=log, stderr=subprocess.STDOUT, **detach)
+        threading.Thread(target=proc.wait, name="nexa-assistant-reaper", daemon=True).start()
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if client.ping(timeout=0.5):
+                return "started"
+            if proc.poll() is not None:
+                raise RuntimeError(f"Assistant exited with code {proc.returncode}; see {LOG_FILE}")
+            time.sleep(0.1)
+        raise TimeoutError(f"Assistant did not come up within {timeout:.0f} s; see {LOG_FILE}")
+
+
+def stop_service(client: AssistantClient = None, timeout: float = 5.0) -> str:
+    """Ask the assistant to shut down (terminate it if it does not). Returns
+    "stopped" or "not running"."""
+    client = client or AssistantClient()
+    info = client.ping()
+    if not info:
+        return "not running"
+    try:
+        client.request("shutdown", timeout=timeout)
+    except (OSError, AssistantError):
+        pass
+    deadline = time.monotonic() + timeout
+    while client.ping(timeout=0.5):
+        if time.monotonic() > deadline:
+            import signal
+            os.kill(info["pid"], signal.SIGTERM)
+            break
+        time.sleep(0.1)
+    client.close()
+    return "stopped"
+
+
+# =========================
+# BENCHMARK
+# =========================
+def benchmark(requests: int = 200):
+    address = (rf"\\.\pipe\nexa-assistant-bench-{os.getpid()}" if os.name == "nt"
+               else os.path.join(tempfile.gettempdir(), f"nexa-bench-{os.getpid()}.sock"))
+    key = secrets.token_bytes(32)
+    handled = []
+    service = AssistantService({"command": lambda r: {"handled": not handled.append(r["text"])}},
+                               address=address, authkey=key)
+    service.start()
+    client = AssistantClient(address, key)
+    client.ping()                      # connect once, like J3's cached client
+    for i in range(requests):
+        client.request("command", text=f"volume up {i}")
+    s = client.summary()
+    m = service.metrics()
+    client.close()
+    service.close()
+
+    start = time.perf_counter()
+    spawns = 5
+    for _ in range(spawns):
+        subprocess.run([sys.executable, "-c", "try:\n import speech_recognition\nexcept ImportError:\n pass"])
+    cold = 1000 * (time.perf_counter() - start) / spawns
+
+    print(f"{requests} forwarded commands over {'named pipe' if os.name == 'nt' else 'Unix socket'}: "
+          f"round trip p50 {s['round_trip_p50_ms']} ms, p95 {s['round_trip_p95_ms']} ms "
+          f"(handler p50 {m['command_p50_ms']} ms), all handled: {len(handled) == requests}")
+    print(f"new assistant process per command (python + speech_recognition import): {cold:.0f} ms, "
+          "before TTS engine and microphone setup")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Assistant IPC round-trip benchmark")
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+    benchmark(args.requests)
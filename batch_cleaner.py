@@ -0,0 +1,161 @@
+"""
+Batch Cleaner – clean many files and every sheet in parallel
+
+Each uploaded CSV and each sheet of each workbook becomes one job. Jobs run
+on a process pool (one worker per CPU core by default), apply the normal
+clean_dataframe() rules, and come back as serialized output plus a
+CleaningReport. Everything is packed into one zip archive together with a
+summary CSV. A file or sheet that cannot be read or cleaned gets a
+CleaningReport with .error set; the rest of the batch still completes.
+
+Run directly for a scaling benchmark:
+    python batch_cleaner.py --files 16 --rows 200000
+"""
+
+import io
+import multiprocessing
+import os
+import re
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from data_cleaner import CleaningReport, clean_dataframe, export_dataframe, output_filename
+
+
+# =========================
+# WORKER
+# =========================
+def _clean_job(path: str, name: str, sheet, fmt: str, optimize: bool):
+    """Runs in a worker process. Returns (label, output stem, output bytes, report)."""
+    start = time.perf_counter()
+    stem = os.path.splitext(name)[0]
+    if sheet is None:
+        df = pd.read_csv(path)
+        label = name
+    else:
+        df = pd.read_excel(path, sheet_name=sheet)
+        label = f"{name} [{sheet}]"
+        stem = f"{stem}__{sheet}"
+    parse_seconds = time.perf_counter() - start
+    cleaned, report = clean_dataframe(df, optimize=optimize)
+    report.source = label
+    report.parse_seconds = parse_seconds
+    return label, _safe_stem(stem), export_dataframe(cleaned, fmt), report
+
+
+def _safe_stem(label: str) -> str:
+    return re.sub(r"[^\w.-]+", "_", label).strip("_") or "sheet"
+
+
+# =========================
+# BATCH
+# =========================
+def list_jobs(files, workdir: str):
+    """Write uploads to workdir and expand workbooks into one job per sheet.
+
+    files: iterable of (name, bytes). Returns ([(path, name, sheet_or_None)],
+    [CleaningReport for workbooks that could not be opened])."""
+    jobs, failed = [], []
+    for i, (name, payload) in enumerate(files):
+        path = os.path.join(workdir, f"{i}_{_safe_stem(name)}")
+        with open(path, "wb") as f:
+            f.write(payload)
+        if name.lower().endswith(".csv"):
+            jobs.append((path, name, None))
+        else:
+            try:
+                with pd.ExcelFile(path) as book:
+                    jobs.extend((path, name, sheet) for sheet in book.sheet_names)
+            except Exception as e:
+                failed.append(CleaningReport(source=name, error=f"{type(e).__name__}: {e}"))
+    return jobs, failed
+
+
+def clean_batch(files, fmt: str = "CSV", optimize: bool = False, workers: int = None,
+                on_progress=None):
+    """Clean all files/sheets in parallel.
+
+    Returns (zip_bytes, reports) where reports are CleaningReports in the
+    order the jobs were listed (failed ones have .error set).
+    on_progress(done, total) is called as jobs finish."""
+    with tempfile.TemporaryDirectory(prefix="nexa_batch_") as workdir:
+        jobs, failed = list_jobs(files, workdir)
+        results = [None] * len(jobs)
+        workers = workers or os.cpu_count() or 1
+        # spawn, not Linux's default fork: forking the multi-threaded Streamlit
+        # process can copy a lock held by another thread (same as exec_pool)
+        with ProcessPoolExecutor(max_workers=min(workers, max(1, len(jobs))),
+                                 mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = {pool.submit(_clean_job, *job, fmt, optimize): i for i, job in enumerate(jobs)}
+            for done, future in enumerate(as_completed(futures), 1):
+                i = futures[future]
+                try:
+                    results[i] = future.result()
+                except Exception as e:
+                    _, name, sheet = jobs[i]
+                    label = name if sheet is None else f"{name} [{sheet}]"
+                    results[i] = (label, None, None,
+                                  CleaningReport(source=label, error=f"{type(e).__name__}: {e}"))
+                if on_progress:
+                    on_progress(done, len(jobs))
+        results += [(r.source, None, None, r) for r in failed]
+
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as archive:
+        used = set()
+        for _, stem, data, _ in results:
+            if data is None:
+                continue
+            while stem in used:
+                stem += "_"
+            used.add(stem)
+            archive.writestr(output_filename(stem, fmt), data)
+        summary = pd.DataFrame([dict(r.rows()) for *_, r in results], index=[r[0] for r in results])
+        archive.writestr("cleaning_report.csv", summary.to_csv(index_label="source"))
+    return buf.getvalue(), [r for *_, r in results]
+
+
+# =========================
+# BENCHMARK
+# =========================
+def benchmark(files: int = 16, rows: int = 200_000, worker_counts=None):
+    import numpy as np
+
+    rng = np.random.default_rng(0)
+    payloads = []
+    for i in range(files):
+        ids = rng.integers(0, rows, rows)
+        df = pd.DataFrame({
+            "Customer ID": ids,
+            "Region": np.array(["north", "south", "east", "west"])[ids % 4],
+            "Status": np.array([" open", "closed ", "pending"])[ids % 3],
+            "Amount": ids * 0.5,
+        })
+        payloads.append((f"daily_{i:02d}.csv", df.to_csv(index=False).encode("utf-8")))
+    size_mb = sum(len(p) for _, p in payloads) / 1024 / 1024
+
+    cores = os.cpu_count() or 1
+    worker_counts = worker_counts or sorted({1, 2, 4, cores} & set(range(1, cores + 1)))
+    print(f"{files} files x {rows:,} rows ({size_mb:.0f} MB), {cores} cores")
+    base = None
+    for n in worker_counts:
+        start = time.perf_counter()
+        clean_batch(payloads, workers=n)
+        elapsed = time.perf_counter() - start
+        base = base or elapsed
+        print(f"  workers={n:<3} {elapsed:6.2f} s  speedup x{base / elapsed:.2f}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Batch cleaning scaling benchmark")
+    parser.add_argument("--files", type=int, default=16)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--workers", type=int, nargs="*")
+    args = parser.parse_args()
+    benchmark(args.files, args.rows, args.workers)
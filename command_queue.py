@@ -0,0 +1,413 @@
+"""
+Command Queue – persistent command jobs with a single desktop-input scheduler
+
+- Jobs are stored in SQLite (nexa_jobs.db, WAL), so the queue and its history
+  survive Streamlit reruns and server restarts
+- Preparation (routing, template lookup, LLM generation, package installs)
+  runs on a small thread pool, so later jobs are generated while an earlier
+  one is still typing
+- Execution is serialized by one scheduler thread, in submission order, while
+  holding InputLock: a file lock that assistant.py takes as well, so two
+  automations never interleave keystrokes, even across processes
+- After a restart, jobs submitted more than RESUME_WINDOW seconds earlier
+  are cancelled instead of suddenly typing on the desktop
+- Queue depth, wait time and run time for the console
+
+Run directly for an inline vs queued comparison:
+    python command_queue.py --commands 10 --prepare 1.0 --execute 0.3
+"""
+
+import contextlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+JOBS_FILE = "nexa_jobs.db"
+LOCK_FILE = "nexa_input.lock"
+PREPARE_WORKERS = 3
+HISTORY = 200             # finished jobs kept in the database
+RESUME_WINDOW = 60.0      # seconds: older unfinished jobs are not resumed after a restart
+
+ACTIVE = ("queued", "preparing", "ready", "running")
+
+
+# =========================
+# CROSS-PROCESS INPUT LOCK
+# =========================
+class InputLock:
+    """Exclusive lock on keyboard/mouse automation, shared by every process
+    that uses the same lock file (J3.py's scheduler and assistant.py)."""
+
+    def __init__(self, path: str = LOCK_FILE, poll: float = 0.02):
+        self.path = path
+        self.poll = poll
+        self._thread_lock = threading.RLock()
+        self._fd = None
+        self._depth = 0
+
+    def _try_lock(self, fd) -> bool:
+        try:
+            if os.name == "nt":
+                import msvcrt
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            return False
+
+    def acquire(self, timeout: float = None) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        if not self._thread_lock.acquire(timeout=-1 if timeout is None else timeout):
+            return False
+        if self._depth:
+            self._depth += 1      # re-entrant within the owning thread
+            return True
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT)
+        while not self._try_lock(fd):
+            if deadline is not None and time.monotonic() >= deadline:
+                os.close(fd)
+                self._thread_lock.release()
+                return False
+            time.sleep(self.poll)
+        self._fd, self._depth = fd, 1
+        return True
+
+    def release(self):
+        self._depth -= 1
+        if not self._depth:
+            fd, self._fd = self._fd, None
+            try:
+                if os.name == "nt":
+                    import msvcrt
+                    os.lseek(fd, 0, os.SEEK_SET)
+                    msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+                else:
+                    import fcntl
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+            finally:
+                os.close(fd)
+        self._thread_lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+input_lock = InputLock()
+
+
+# =========================
+# QUEUE
+# =========================
+class CommandQueue:
+    def __init__(self, prepare, execute, path: str = JOBS_FILE, prepare_workers: int = PREPARE_WORKERS,
+                 lock: InputLock = None, locked=None):
+        """prepare(command) -> JSON-able payload (None = nothing to run), may be slow;
+        execute(command, payload, cancelled: threading.Event) -> output text,
+        raises on failure. execute always runs on the scheduler thread, with
+        the input lock held unless locked(payload) is False (for jobs handed
+        to a process that takes the lock itself)."""
+        self.prepare = prepare
+        self.execute = execute
+        self.lock = lock or input_lock
+        self.locked = locked or (lambda payload: True)
+        self._db_lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript("""
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                command TEXT NOT NULL,
+                source TEXT NOT NULL,
+                status TEXT NOT NULL,
+                payload TEXT,
+                output TEXT,
+                error TEXT,
+                created REAL NOT NULL,
+                prepared REAL,
+                started REAL,
+                finished REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_status ON jobs(status);
+        """)
+        self._recover()
+        self._wake = threading.Condition()
+        self._cancel = {}                  # job id -> Event, for the running job
+        self._pool = ThreadPoolExecutor(max_workers=prepare_workers, thread_name_prefix="nexa-prepare")
+        for (job_id, command) in self._query("SELECT id, command FROM jobs WHERE status = 'queued' ORDER BY id"):
+            self._pool.submit(self._prepare, job_id, command)
+        self._stop = False
+        self._scheduler = threading.Thread(target=self._schedule, name="nexa-scheduler", daemon=True)
+        self._scheduler.start()
+
+    # -------------------------
+    # Storage
+    # -------------------------
+    def _query(self, sql, args=()):
+        with self._db_lock:
+            return self._conn.execute(sql, args).fetchall()
+
+    def _update(self, job_id: int, **fields):
+        cols = ", ".join(f"{k} = ?" for k in fields)
+        with self._db_lock, self._conn:
+            self._conn.execute(f"UPDATE jobs SET {cols} WHERE id = ?", (*fields.values(), job_id))
+        with self._wake:
+            self._wake.notify_all()
+
+    def _recover(self):
+        """After a restart: cancel stale jobs, re-prepare half-prepared ones,
+        fail interrupted runs."""
+        now = time.time()
+        with self._db_lock, self._conn:
+            # Nobody is waiting for an old session's automation any more
+            self._conn.execute(
+                "UPDATE jobs SET status = 'cancelled', error = 'Not resumed after restart', finished = ? "
+                "WHERE status IN ('queued', 'preparing', 'ready') AND created < ?", (now, now - RESUME_WINDOW)
+            )
+            self._conn.execute("UPDATE jobs SET status = 'queued' WHERE status = 'preparing'")
+            self._conn.execute(
+                "UPDATE jobs SET status = 'failed', error = 'Interrupted by restart', finished = ? "
+                "WHERE status = 'running'", (time.time(),)
+            )
+
+    def _trim(self):
+        with self._db_lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM jobs WHERE status NOT IN (?, ?, ?, ?) AND id NOT IN "
+                "(SELECT id FROM jobs ORDER BY id DESC LIMIT ?)", (*ACTIVE, HISTORY)
+            )
+
+    # -------------------------
+    # Submitting
+    # -------------------------
+    def submit(self, command: str, source: str = "ui", payload=None, prepared: bool = False) -> int:
+        """Queue a command. With prepared=True, payload is used as is and the
+        job goes straight to the scheduler."""
+        now = time.time()
+        with self._db_lock, self._conn:
+            cur = self._conn.execute(
+                "INSERT INTO jobs (command, source, status, payload, created, prepared) VALUES (?, ?, ?, ?, ?, ?)",
+                (command, source, "ready" if prepared else "queued",
+                 json.dumps(payload) if prepared else None, now, now if prepared else None),
+            )
+            job_id = cur.lastrowid
+        if not prepared:
+            self._pool.submit(self._prepare, job_id, command)
+        with self._wake:
+            self._wake.notify_all()
+        return job_id
+
+    def submit_batch(self, commands, source: str = "batch"):
+        return [self.submit(c, source) for c in commands if c.strip()]
+
+    def cancel(self, job_id: int) -> bool:
+        """Cancel a job that has not finished. A running job is asked to stop."""
+        event = self._cancel.get(job_id)
+        if event is not None:
+            event.set()
+            return True
+        with self._db_lock, self._conn:
+            cur = self._conn.execute(
+                "UPDATE jobs SET status = 'cancelled', finished = ? WHERE id = ? AND status IN ('queued', 'preparing', 'ready')",
+                (time.time(), job_id),
+            )
+        with self._wake:
+            self._wake.notify_all()
+        if cur.rowcount:
+            return True
+        event = self._cancel.get(job_id)    # claimed by the scheduler meanwhile
+        if event is not None:
+            event.set()
+            return True
+        return False
+
+    # -------------------------
+    # Workers
+    # -------------------------
+    def _prepare(self, job_id: int, command: str):
+        with self._db_lock, self._conn:
+            cur = self._conn.execute("UPDATE jobs SET status = 'preparing' WHERE id = ? AND status = 'queued'", (job_id,))
+        if not cur.rowcount:
+            return    # cancelled meanwhile
+        try:
+            payload = self.prepare(command)
+        except Exception as e:
+            self._update(job_id, status="failed", error=f"{type(e).__name__}: {e}", finished=time.time())
+            return
+        with self._db_lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'ready', payload = ?, prepared = ? WHERE id = ? AND status = 'preparing'",
+                (json.dumps(payload), time.time(), job_id),
+            )
+        with self._wake:
+            self._wake.notify_all()
+
+    def _next_job(self):
+        """The oldest unfinished job, if it is ready to run (strict FIFO)."""
+        rows = self._query(
+            "SELECT id, command, status, payload FROM jobs WHERE status IN ('queued', 'preparing', 'ready') "
+            "ORDER BY id LIMIT 1"
+        )
+        if rows and rows[0][2] == "ready":
+            return rows[0]
+        return None
+
+    def _schedule(self):
+        while not self._stop:
+            job_id = None
+            try:
+                job = self._next_job()
+                if job is None:
+                    with self._wake:
+                        self._wake.wait(0.5)
+                    continue
+                job_id = job[0]
+                self._run(*job)
+            except Exception as e:
+                # Never let one bad job (or a database hiccup) stop the scheduler
+                if job_id is not None:
+                    try:
+                        self._update(job_id, status="failed", error=f"Scheduler: {type(e).__name__}: {e}",
+                                     finished=time.time())
+                    except Exception:
+                        pass
+                time.sleep(0.5)
+            finally:
+                if job_id is not None:
+                    self._cancel.pop(job_id, None)
+
+    def _run(self, job_id: int, command: str, status: str, payload: str):
+        # Registered before the claim below: a cancel() from now on either
+        # finds the row still 'ready' or finds this event
+        cancelled = self._cancel[job_id] = threading.Event()
+        payload = json.loads(payload) if payload else None
+        output, error, status = "", None, "done"
+        with self.lock if payload is None or self.locked(payload) else contextlib.nullcontext():
+            # cancel() may have arrived while we waited for the input lock
+            # (e.g. assistant.py was typing): then nothing runs at all
+            if cancelled.is_set():
+                status = "cancelled"
+            else:
+                with self._db_lock, self._conn:
+                    claimed = self._conn.execute(
+                        "UPDATE jobs SET status = 'running', started = ? WHERE id = ? AND status = 'ready'",
+                        (time.time(), job_id),
+                    ).rowcount
+                if not claimed:
+                    return    # cancelled after _next_job() read it
+                try:
+                    if payload is not None:
+                        output = self.execute(command, payload, cancelled) or ""
+                except Exception as e:
+                    error, status = f"{type(e).__name__}: {e}", "failed"
+                if cancelled.is_set() and status == "failed":
+                    status = "cancelled"    # the worker was killed on request
+        self._update(job_id, status=status, output=output[-5000:], error=error, finished=time.time())
+        self._trim()
+
+    def shutdown(self):
+        self._stop = True
+        with self._wake:
+            self._wake.notify_all()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    # -------------------------
+    # Reporting
+    # -------------------------
+    def recent(self, limit: int = 20):
+        rows = self._query(
+            "SELECT id, command, source, status, output, error, created, prepared, started, finished "
+            "FROM jobs ORDER BY id DESC LIMIT ?", (limit,)
+        )
+        keys = ("id", "command", "source", "status", "output", "error", "created", "prepared", "started", "finished")
+        return [dict(zip(keys, r)) for r in rows]
+
+    def summary(self) -> dict:
+        depth = dict(self._query(
+            "SELECT status, COUNT(*) FROM jobs WHERE status IN (?, ?, ?, ?) GROUP BY status", ACTIVE
+        ))
+        (wait, run, n), = self._query(
+            "SELECT AVG(started - created), AVG(finished - started), COUNT(*) FROM "
+            "(SELECT * FROM jobs WHERE started IS NOT NULL AND finished IS NOT NULL ORDER BY id DESC LIMIT 50)"
+        )
+        return {
+            "depth": sum(depth.values()),
+            "queued": depth.get("queued", 0) + depth.get("preparing", 0),
+            "ready": depth.get("ready", 0),
+            "running": depth.get("running", 0),
+            "finished": n,
+            "avg_wait_seconds": wait or 0.0,
+            "avg_run_seconds": run or 0.0,
+        }
+
+    def wait_idle(self, timeout: float = None) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.summary()["depth"]:
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+
+# =========================
+# BENCHMARK
+# =========================
+def benchmark(commands: int = 10, prepare_seconds: float = 1.0, execute_seconds: float = 0.3):
+    import tempfile
+
+    def prepare(command):
+        time.sleep(prepare_seconds)      # LLM generation
+        return {"code": f"# {command}"}
+
+    active, overlaps = [0], [0]
+
+    def execute(command, payload, cancelled):
+        active[0] += 1
+        overlaps[0] = max(overlaps[0], active[0])
+        time.sleep(execute_seconds)      # keystrokes
+        active[0] -= 1
+        return "ok"
+
+    names = [f"command {i}" for i in range(commands)]
+    start = time.perf_counter()
+    for name in names:
+        execute(name, prepare(name), None)
+    inline = time.perf_counter() - start
+
+    with tempfile.TemporaryDirectory() as tmp:
+        q = CommandQueue(prepare, execute, path=os.path.join(tmp, "jobs.db"),
+                         lock=InputLock(os.path.join(tmp, "input.lock")))
+        start = time.perf_counter()
+        q.submit_batch(names)
+        q.wait_idle()
+        queued = time.perf_counter() - start
+        s = q.summary()
+        order = [r["command"] for r in reversed(q.recent(commands))]
+        q.shutdown()
+        q._conn.close()
+
+    print(f"{commands} commands, {prepare_seconds:.1f} s generation + {execute_seconds:.1f} s input each")
+    print(f"  inline (Run button) : {inline:5.2f} s, UI blocked throughout")
+    print(f"  queued              : {queued:5.2f} s, submit returns at once | avg wait {s['avg_wait_seconds']:.2f} s, "
+          f"avg run {s['avg_run_seconds']:.2f} s | max concurrent input {overlaps[0]} | "
+          f"in order: {order == names}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inline vs queued command execution")
+    parser.add_argument("--commands", type=int, default=10)
+    parser.add_argument("--prepare", type=float, default=1.0)
+    parser.add_argument("--execute", type=float, default=0.3)
+    args = parser.parse_args()
+    benchmark(args.commands, args.prepare, args.execute)
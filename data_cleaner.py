@@ -0,0 +1,514 @@
+"""
+Data Cleaner – single-parse cleaning engine for the NEXA Data Cleaner
+
+The uploaded file is parsed once. Before/after statistics are computed in
+the same pass as the cleaning, and one 64-bit row-hash vector is used both
+to count and to drop duplicate rows.
+
+Imported lazily by J3.py (Data Cleaner mode only), so pandas is not loaded
+for the automation console.
+"""
+
+import io
+import os
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+
+# =========================
+# REPORT
+# =========================
+@dataclass
+class CleaningReport:
+    source: str = ""
+    rows_before: int = 0
+    rows_after: int = 0
+    empty_rows_removed: int = 0
+    duplicate_rows_removed: int = 0
+    columns: int = 0
+    text_columns_trimmed: int = 0
+    renamed_columns: dict = field(default_factory=dict)
+    memory_before_mb: float = 0.0
+    memory_after_mb: float = 0.0
+    optimized_columns: dict = field(default_factory=dict)
+    near_duplicate_rows_removed: int = 0
+    near_duplicate_clusters: int = 0
+    near_duplicate_examples: list = field(default_factory=list)
+    parse_seconds: float = 0.0
+    clean_seconds: float = 0.0
+    error: str = None        # set when the file/sheet could not be cleaned
+
+    def rows(self):
+        """(label, value) pairs for display."""
+        if self.error:
+            return [("Error", self.error)]
+        return [
+            ("Rows before", self.rows_before),
+            ("Rows after", self.rows_after),
+            ("Empty rows removed", self.empty_rows_removed),
+            ("Duplicate rows removed", self.duplicate_rows_removed),
+            ("Near-duplicate rows removed", self.near_duplicate_rows_removed),
+            ("Near-duplicate clusters merged", self.near_duplicate_clusters),
+            ("Columns", self.columns),
+            ("Text columns trimmed", self.text_columns_trimmed),
+            ("Columns renamed", len(self.renamed_columns)),
+            ("Memory before", f"{self.memory_before_mb:.1f} MB"),
+            ("Memory after", f"{self.memory_after_mb:.1f} MB"),
+            ("Columns retyped", len(self.optimized_columns)),
+            ("Parse time", f"{self.parse_seconds:.2f} s"),
+            ("Clean time", f"{self.clean_seconds:.2f} s"),
+        ]
+
+
+# =========================
+# PARSING
+# =========================
+def read_table(uploaded_file) -> pd.DataFrame:
+    if uploaded_file.name.endswith(".csv"):
+        return pd.read_csv(uploaded_file)
+    return pd.read_excel(uploaded_file)
+
+
+def normalize_columns(columns: pd.Index) -> pd.Index:
+    """Trimmed, lower_snake_case names; names that collide ("Name" and
+    "name ") get a numeric suffix so every column stays addressable."""
+    names = (
+        columns.astype(str).str.strip()
+        .str.lower()
+        .str.replace(" ", "_")
+    )
+    seen = set(names)
+    unique = []
+    counts = {}
+    for name in names:
+        if name in counts:
+            n = counts[name]
+            while f"{name}_{n}" in seen:
+                n += 1
+            counts[name] = n + 1
+            name = f"{name}_{n}"
+            seen.add(name)
+        else:
+            counts[name] = 2
+        unique.append(name)
+    return pd.Index(unique)
+
+
+def memory_mb(df: pd.DataFrame) -> float:
+    return df.memory_usage(deep=True).sum() / 1024 / 1024
+
+
+# =========================
+# DTYPE OPTIMIZATION
+# =========================
+CATEGORY_RATIO = 0.5      # unique/non-null values at or below this -> category
+DATE_SAMPLE = 1000
+_DATE_LIKE = r"^\d{1,4}[-/.]\d{1,2}[-/.]\d{1,4}([ T]\d{1,2}:\d{2}(:\d{2})?)?$"
+
+
+def _has_pyarrow() -> bool:
+    import importlib.util
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def _looks_like_dates(col: pd.Series) -> bool:
+    sample = col.dropna()
+    sample = sample.sample(min(len(sample), DATE_SAMPLE), random_state=0) if len(sample) else sample
+    if not len(sample):
+        return False
+    return sample.astype(str).str.match(_DATE_LIKE).mean() >= 0.95
+
+
+def optimize_dtypes(df: pd.DataFrame, category_ratio: float = CATEGORY_RATIO):
+    """Shrink df in place where it is lossless. Returns {column: new dtype}.
+
+    - date-like text -> datetime64
+    - low-cardinality text -> category, other text -> Arrow strings (if pyarrow)
+    - integers / floats -> smallest dtype that holds the same values
+    """
+    changed = {}
+    arrow = _has_pyarrow()
+    for col in df.columns:
+        if not isinstance(df[col], pd.Series):
+            continue   # duplicate label: df[col] is a frame, nothing to assign back
+        s = df[col]
+        if pd.api.types.is_object_dtype(s) or pd.api.types.is_string_dtype(s):
+            non_null = s.notna().sum()
+            if not non_null:
+                continue
+            if _looks_like_dates(s):
+                parsed = pd.to_datetime(s, errors="coerce")
+                if parsed.notna().sum() == non_null:
+                    df[col] = parsed
+                    changed[col] = str(parsed.dtype)
+                    continue
+            if not s.dropna().map(type).eq(str).all():
+                continue   # mixed Python objects: leave alone
+            if s.nunique() / non_null <= category_ratio:
+                df[col] = s.astype("category")
+            elif arrow:
+                df[col] = s.astype("string[pyarrow]")
+            else:
+                continue
+            changed[col] = str(df[col].dtype)
+        elif pd.api.types.is_bool_dtype(s):
+            continue
+        elif pd.api.types.is_integer_dtype(s):
+            smaller = pd.to_numeric(s, downcast="unsigned" if len(s) and s.min() >= 0 else "integer")
+            if smaller.dtype != s.dtype:
+                df[col] = smaller
+                changed[col] = str(smaller.dtype)
+        elif pd.api.types.is_float_dtype(s) and s.dtype != np.float32:
+            smaller = s.astype(np.float32)
+            if np.array_equal(smaller.to_numpy(np.float64), s.to_numpy(np.float64), equal_nan=True):
+                df[col] = smaller
+                changed[col] = str(smaller.dtype)
+    return changed
+
+
+# =========================
+# CLEANING
+# =========================
+def clean_dataframe(df: pd.DataFrame, report: CleaningReport = None, optimize: bool = False,
+                    near_duplicate_threshold: float = None, near_duplicate_columns=None):
+    """Drop empty and duplicate rows, trim text, normalize column names and,
+    with optimize=True, shrink dtypes (see optimize_dtypes).
+
+    With near_duplicate_threshold set (0-1, estimated Jaccard similarity of
+    character shingles), rows that nearly match an earlier row on
+    near_duplicate_columns (default: all) are dropped too, keeping the first
+    row of each cluster (see near_duplicates.py).
+
+    Returns (cleaned_df, report)."""
+    report = report or CleaningReport()
+    start = time.perf_counter()
+    report.rows_before = len(df)
+    report.memory_before_mb = memory_mb(df)
+
+    empty = df.isna().all(axis=1).to_numpy()
+    row_hash = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    # Duplicates are counted among non-empty rows, matching the old
+    # dropna(how="all") -> drop_duplicates() order
+    duplicate = np.zeros(len(df), dtype=bool)
+    duplicate[~empty] = pd.Series(row_hash[~empty]).duplicated().to_numpy()
+    report.empty_rows_removed = int(empty.sum())
+    report.duplicate_rows_removed = int(duplicate.sum())
+
+    # Shallow copy: the filtered frame owns its rows, trimming then replaces
+    # whole columns without a second deep copy
+    df = df.loc[~(empty | duplicate)].copy(deep=False)
+
+    text_cols = df.select_dtypes(include=["object", "string"]).columns
+    for col in text_cols:
+        df[col] = df[col].str.strip()
+    report.text_columns_trimmed = len(text_cols)
+
+    new_columns = normalize_columns(df.columns)
+    report.renamed_columns = {old: new for old, new in zip(df.columns, new_columns) if old != new}
+    df.columns = new_columns
+
+    if near_duplicate_threshold is not None and len(df):
+        from near_duplicates import find_near_duplicates
+
+        columns = list(normalize_columns(pd.Index(near_duplicate_columns))) if near_duplicate_columns else None
+        near = find_near_duplicates(df, columns, threshold=near_duplicate_threshold)
+        df = df.loc[~near.duplicate_mask]
+        report.near_duplicate_rows_removed = int(near.duplicate_mask.sum())
+        report.near_duplicate_clusters = near.clusters
+        report.near_duplicate_examples = near.examples
+
+    if optimize:
+        report.optimized_columns = optimize_dtypes(df)
+    report.memory_after_mb = memory_mb(df)
+
+    report.rows_after = len(df)
+    report.columns = len(df.columns)
+    report.clean_seconds = time.perf_counter() - start
+    return df, report
+
+
+def clean_file(uploaded_file, optimize: bool = False, **near_duplicate_options):
+    """Parse uploaded_file once and clean it. Returns (cleaned_df, report).
+
+    near_duplicate_options are passed through to clean_dataframe()."""
+    start = time.perf_counter()
+    df = read_table(uploaded_file)
+    report = CleaningReport(source=uploaded_file.name, parse_seconds=time.perf_counter() - start)
+    return clean_dataframe(df, report, optimize=optimize, **near_duplicate_options)
+
+
+# =========================
+# OUT-OF-CORE (CHUNKED) MODE
+# =========================
+class RowHashSet:
+    """Set of 64-bit row hashes stored as sorted numpy runs (8 bytes/row).
+
+    Small runs are merged LSM-style so lookups touch O(log n) runs. When the
+    in-memory runs exceed max_memory_mb, the largest one is spilled to a
+    memory-mapped .npy file, keeping resident memory bounded."""
+
+    def __init__(self, max_memory_mb: float = 256, spill_dir: str = None):
+        self.max_bytes = int(max_memory_mb * 1024 * 1024)
+        self.spill_dir = spill_dir
+        self._mem_runs = []
+        self._disk_runs = []
+        self._tmp = None
+        self.size = 0
+
+    def _contains(self, values: np.ndarray) -> np.ndarray:
+        seen = np.zeros(len(values), dtype=bool)
+        for run in self._disk_runs + self._mem_runs:
+            pos = np.searchsorted(run, values)
+            pos[pos == len(run)] = len(run) - 1
+            seen |= run[pos] == values
+        return seen
+
+    def add_new(self, hashes: np.ndarray) -> np.ndarray:
+        """Add hashes; return a mask of rows whose hash was not seen before
+        (first occurrence within the batch wins)."""
+        uniq, first = np.unique(hashes, return_index=True)
+        fresh = ~self._contains(uniq) if self.size else np.ones(len(uniq), dtype=bool)
+        mask = np.zeros(len(hashes), dtype=bool)
+        mask[first[fresh]] = True
+
+        new = uniq[fresh]
+        if len(new):
+            self._mem_runs.append(new)
+            self.size += len(new)
+            while len(self._mem_runs) > 1 and len(self._mem_runs[-2]) <= 2 * len(self._mem_runs[-1]):
+                b = self._mem_runs.pop()
+                a = self._mem_runs.pop()
+                merged = np.concatenate([a, b])
+                merged.sort(kind="mergesort")
+                self._mem_runs.append(merged)
+            self._spill()
+        return mask
+
+    def _spill(self):
+        while sum(r.nbytes for r in self._mem_runs) > self.max_bytes and self._mem_runs:
+            if self._tmp is None:
+                self._tmp = tempfile.TemporaryDirectory(dir=self.spill_dir, prefix="nexa_hashes_")
+            largest = max(range(len(self._mem_runs)), key=lambda i: len(self._mem_runs[i]))
+            run = self._mem_runs.pop(largest)
+            path = os.path.join(self._tmp.name, f"run{len(self._disk_runs)}.npy")
+            np.save(path, run)
+            self._disk_runs.append(np.load(path, mmap_mode="r"))
+
+    def close(self):
+        self._disk_runs = []
+        if self._tmp is not None:
+            self._tmp.cleanup()
+            self._tmp = None
+
+
+def same_file(a: str, b: str) -> bool:
+    try:
+        return os.path.samefile(a, b)
+    except OSError:    # one of them does not exist yet
+        return os.path.normcase(os.path.abspath(a)) == os.path.normcase(os.path.abspath(b))
+
+
+def clean_csv_chunked(src, dst, chunksize: int = 100_000, max_hash_memory_mb: float = 256,
+                      spill_dir: str = None, on_progress=None) -> CleaningReport:
+    """Stream-clean a CSV that may not fit in memory.
+
+    Applies the same rules as clean_dataframe() chunk by chunk and appends
+    each cleaned chunk to dst (path or text file object). Duplicates across
+    chunks are found through a RowHashSet, so peak memory is roughly one
+    chunk plus max_hash_memory_mb. on_progress(rows_read) is called per chunk.
+
+    A dst path is written through a temporary file and only replaced once the
+    whole source has been read, so a parse error (pandas.errors.ParserError,
+    UnicodeDecodeError) leaves an existing dst untouched. ValueError if dst
+    is src.
+    """
+    if isinstance(src, str) and isinstance(dst, str) and same_file(src, dst):
+        raise ValueError("Output path must differ from the input CSV")
+    report = CleaningReport(source=str(src))
+    start = time.perf_counter()
+    # dtype=str keeps values verbatim and hashes stable across chunks
+    reader = pd.read_csv(src, chunksize=chunksize, dtype=str)
+    seen = RowHashSet(max_hash_memory_mb, spill_dir)
+    tmp = dst + ".tmp" if isinstance(dst, str) else None
+    out = open(tmp, "w", encoding="utf-8", newline="") if tmp else dst
+    done = False
+    try:
+        for i, chunk in enumerate(reader):
+            report.rows_before += len(chunk)
+
+            empty = chunk.isna().all(axis=1).to_numpy()
+            keep = np.zeros(len(chunk), dtype=bool)
+            if (~empty).any():
+                row_hash = pd.util.hash_pandas_object(chunk[~empty], index=False).to_numpy()
+                keep[~empty] = seen.add_new(row_hash)
+            report.empty_rows_removed += int(empty.sum())
+            report.duplicate_rows_removed += int((~empty & ~keep).sum())
+
+            chunk = chunk.loc[keep].copy(deep=False)
+            for col in chunk.columns:
+                chunk[col] = chunk[col].str.strip()
+            new_columns = normalize_columns(chunk.columns)
+            if i == 0:
+                report.renamed_columns = {o: n for o, n in zip(chunk.columns, new_columns) if o != n}
+                report.columns = len(new_columns)
+                report.text_columns_trimmed = len(new_columns)
+            chunk.columns = new_columns
+
+            chunk.to_csv(out, header=(i == 0), index=False)
+            report.rows_after += len(chunk)
+            if on_progress:
+                on_progress(report.rows_before)
+        done = True
+    finally:
+        reader.close()
+        seen.close()
+        if tmp:
+            out.close()
+            if done:
+                os.replace(tmp, dst)
+            else:
+                os.remove(tmp)
+    report.clean_seconds = time.perf_counter() - start
+    return report
+
+
+# =========================
+# EXPORT
+# =========================
+EXCEL_MAX_ROWS = 1_048_576 - 1   # minus the header row
+
+# label -> (file extension, MIME type)
+OUTPUT_FORMATS = {
+    "CSV": (".csv", "text/csv"),
+    "CSV (gzip)": (".csv.gz", "application/gzip"),
+    "Parquet": (".parquet", "application/vnd.apache.parquet"),
+    "Feather (Arrow IPC)": (".feather", "application/vnd.apache.arrow.file"),
+    "Excel": (".xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+}
+
+
+def export_dataframe(df: pd.DataFrame, fmt: str = "CSV") -> bytes:
+    """Serialize df to an in-memory buffer in one of OUTPUT_FORMATS.
+
+    Parquet and Feather need pyarrow; Excel is limited to EXCEL_MAX_ROWS."""
+    buf = io.BytesIO()
+    if fmt == "CSV":
+        df.to_csv(buf, index=False)
+    elif fmt == "CSV (gzip)":
+        df.to_csv(buf, index=False, compression={"method": "gzip", "compresslevel": 6})
+    elif fmt == "Parquet":
+        df.to_parquet(buf, index=False)
+    elif fmt == "Feather (Arrow IPC)":
+        df.reset_index(drop=True).to_feather(buf)
+    elif fmt == "Excel":
+        if len(df) > EXCEL_MAX_ROWS:
+            raise ValueError(f"Excel supports at most {EXCEL_MAX_ROWS:,} rows; choose CSV or Parquet")
+        df.to_excel(buf, index=False)
+    else:
+        raise ValueError(f"Unknown output format: {fmt}")
+    return buf.getvalue()
+
+
+def output_filename(stem: str, fmt: str) -> str:
+    return stem + OUTPUT_FORMATS[fmt][0]
+
+
+# =========================
+# BENCHMARK
+# =========================
+def _write_synthetic_csv(path: str, size_mb: float, seed: int = 0):
+    """~size_mb CSV with ~5% duplicate rows (spread across the file) and ~1% empty rows."""
+    rng = np.random.default_rng(seed)
+    target = size_mb * 1024 * 1024
+    regions = np.array(["north", "south", "east", "west", "central"])
+    statuses = np.array(["open", "closed", "pending", " Open ", "on hold"])
+    written, block, row_id = 0, 200_000, 0
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write("Customer ID,Name,Region,Status,Amount,Created At\n")
+        while written < target:
+            ids = np.arange(row_id, row_id + block)
+            dup = rng.random(block) < 0.05
+            ids[dup] = rng.integers(0, max(1, row_id + 1), dup.sum())
+            frame = pd.DataFrame({
+                "Customer ID": ids,
+                "Name": np.char.add("customer_", ids.astype(str)),
+                "Region": regions[ids % len(regions)],
+                "Status": statuses[ids % len(statuses)],
+                "Amount": (ids % 9973) * 1.25,
+                "Created At": "2025-12-21",
+            })
+            frame.loc[rng.random(block) < 0.01] = None
+            text = frame.to_csv(header=False, index=False)
+            f.write(text)
+            written += len(text)
+            row_id += block
+
+
+def benchmark(size_mb: float = 1024, chunksize: int = 200_000, max_hash_memory_mb: float = 64):
+    try:
+        import resource
+    except ImportError:
+        resource = None
+
+    with tempfile.TemporaryDirectory(prefix="nexa_bench_") as tmp:
+        src = os.path.join(tmp, "synthetic.csv")
+        dst = os.path.join(tmp, "cleaned.csv")
+        t = time.perf_counter()
+        _write_synthetic_csv(src, size_mb)
+        size = os.path.getsize(src) / 1024 / 1024
+        print(f"generated {size:,.0f} MB in {time.perf_counter() - t:.1f} s")
+
+        report = clean_csv_chunked(src, dst, chunksize, max_hash_memory_mb, spill_dir=tmp)
+        print(f"rows: {report.rows_before:,} -> {report.rows_after:,} "
+              f"(empty {report.empty_rows_removed:,}, duplicates {report.duplicate_rows_removed:,})")
+        print(f"time: {report.clean_seconds:.1f} s, throughput {size / report.clean_seconds:.1f} MB/s, "
+              f"{report.rows_before / report.clean_seconds:,.0f} rows/s")
+        if resource is not None:
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            peak_mb = peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+            print(f"peak RSS: {peak_mb:,.0f} MB (chunksize {chunksize:,}, hash budget {max_hash_memory_mb} MB)")
+
+
+def benchmark_formats(rows: int = 500_000):
+    """Write time and size of each output format on a synthetic frame."""
+    rng = np.random.default_rng(0)
+    ids = np.arange(rows)
+    df = pd.DataFrame({
+        "customer_id": ids,
+        "name": np.char.add("customer_", ids.astype(str)),
+        "region": np.array(["north", "south", "east", "west", "central"])[ids % 5],
+        "status": np.array(["open", "closed", "pending"])[ids % 3],
+        "amount": rng.random(rows) * 1000,
+        "created_at": pd.Timestamp("2025-12-21") + pd.to_timedelta(ids % 365, unit="D"),
+    })
+    print(f"{rows:,} rows x {df.shape[1]} columns")
+    for fmt in OUTPUT_FORMATS:
+        start = time.perf_counter()
+        try:
+            data = export_dataframe(df, fmt)
+        except (ImportError, ValueError) as e:
+            print(f"  {fmt:<20} skipped ({e.__class__.__name__}: {str(e).splitlines()[0]})")
+            continue
+        print(f"  {fmt:<20} {time.perf_counter() - start:7.2f} s  {len(data) / 1024 / 1024:8.1f} MB")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Data cleaner benchmarks")
+    parser.add_argument("--formats", action="store_true",
+                        help="benchmark output formats instead of out-of-core cleaning")
+    parser.add_argument("--rows", type=int, default=500_000, help="rows for --formats")
+    parser.add_argument("--size-mb", type=float, default=1024)
+    parser.add_argument("--chunksize", type=int, default=200_000)
+    parser.add_argument("--hash-memory-mb", type=float, default=64)
+    args = parser.parse_args()
+    if args.formats:
+        benchmark_formats(args.rows)
+    else:
+        benchmark(args.size_mb, args.chunksize, args.hash_memory_mb)
@@ -0,0 +1,176 @@
+"""
+Dependency Resolver – make generated code's imports available, fast
+
+Replaces J3's regex + importlib.import_module probing:
+- Imports are extracted with ast (stdlib and relative imports skipped)
+- Presence is checked with importlib.util.find_spec, nothing is imported
+- Import names are mapped to pip distribution names (cv2 -> opencv-python)
+- Everything missing is installed in ONE pip call, optionally from a local
+  wheelhouse (NEXA_WHEELHOUSE) so it works offline
+- Names that failed to install are remembered and not retried for a day
+"""
+
+import ast
+import importlib
+import importlib.util
+import json
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+
+NEGATIVE_CACHE_FILE = "nexa_pip_failures.json"
+NEGATIVE_TTL = 24 * 3600
+WHEELHOUSE = os.getenv("NEXA_WHEELHOUSE", "wheelhouse")
+
+# Import name -> pip distribution, for packages where they differ
+IMPORT_TO_DIST = {
+    "cv2": "opencv-python",
+    "PIL": "Pillow",
+    "sklearn": "scikit-learn",
+    "skimage": "scikit-image",
+    "yaml": "PyYAML",
+    "bs4": "beautifulsoup4",
+    "dotenv": "python-dotenv",
+    "speech_recognition": "SpeechRecognition",
+    "pygetwindow": "PyGetWindow",
+    "win32api": "pywin32",
+    "win32con": "pywin32",
+    "win32gui": "pywin32",
+    "docx": "python-docx",
+    "pptx": "python-pptx",
+    "fitz": "PyMuPDF",
+    "dateutil": "python-dateutil",
+    "serial": "pyserial",
+    "usb": "pyusb",
+    "Crypto": "pycryptodome",
+    "OpenSSL": "pyOpenSSL",
+    "jwt": "PyJWT",
+    "magic": "python-magic",
+    "telegram": "python-telegram-bot",
+    "googleapiclient": "google-api-python-client",
+    "ydata_profiling": "ydata-profiling",
+}
+
+_STDLIB = set(getattr(sys, "stdlib_module_names", ())) | set(sys.builtin_module_names)
+
+
+# =========================
+# EXTRACTION
+# =========================
+def extract_imports(code: str) -> set:
+    """Top-level module names imported by code (absolute imports only)."""
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        # Still useful for partially broken code; same rule as the old scanner
+        found = re.findall(r"^\s*import (\w+)|^\s*from (\w+)", code, re.MULTILINE)
+        return {a or b for a, b in found if a or b}
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name.split(".")[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            names.add(node.module.split(".")[0])
+    return names
+
+
+def is_stdlib(name: str) -> bool:
+    return name in _STDLIB
+
+
+def is_available(name: str) -> bool:
+    """Whether name can be imported, without importing it."""
+    if name in sys.modules:
+        return True
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+def distribution_for(name: str) -> str:
+    return IMPORT_TO_DIST.get(name, name)
+
+
+# =========================
+# RESOLVER
+# =========================
+class DependencyResolver:
+    def __init__(self, negative_cache_file: str = NEGATIVE_CACHE_FILE,
+                 wheelhouse: str = WHEELHOUSE, offline: bool = False):
+        self.negative_cache_file = negative_cache_file
+        self.wheelhouse = wheelhouse
+        self.offline = offline
+        # Shared by the queue's prepare threads and the UI thread: one
+        # install at a time, so a package is never pip-installed twice at once
+        self._lock = threading.Lock()
+        self._failed = self._load_failed()
+
+    def _load_failed(self) -> dict:
+        try:
+            with open(self.negative_cache_file, "r", encoding="utf-8") as f:
+                failed = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+        now = time.time()
+        return {d: t for d, t in failed.items() if now - t < NEGATIVE_TTL}
+
+    def _save_failed(self):
+        # Through a temp file: a crash mid-write never leaves corrupt JSON
+        tmp = self.negative_cache_file + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._failed, f)
+        os.replace(tmp, self.negative_cache_file)
+
+    def missing(self, code: str) -> dict:
+        """{import_name: distribution} for third-party imports not installed."""
+        return {
+            name: distribution_for(name)
+            for name in sorted(extract_imports(code))
+            if not is_stdlib(name) and not is_available(name)
+        }
+
+    def _pip(self, dists) -> bool:
+        cmd = [sys.executable, "-m", "pip", "install", "--disable-pip-version-check", "-q"]
+        if self.wheelhouse and os.path.isdir(self.wheelhouse):
+            cmd += ["--find-links", self.wheelhouse]
+            if self.offline:
+                cmd.append("--no-index")
+        return subprocess.run(cmd + list(dists)).returncode == 0
+
+    def ensure(self, code: str) -> dict:
+        """Install whatever code needs. Returns a report with the keys
+        installed, failed and skipped (known failures, not retried)."""
+        report = {"installed": [], "failed": [], "skipped": []}
+        if not self.missing(code):
+            return report
+        with self._lock:
+            # Checked again: another thread may have installed it meanwhile
+            importlib.invalidate_caches()
+            wanted = []
+            for dist in dict.fromkeys(self.missing(code).values()):
+                (report["skipped"] if dist in self._failed else wanted).append(dist)
+            if not wanted:
+                return report
+
+            if self._pip(wanted):
+                report["installed"] = wanted
+            else:
+                # Find the culprit(s) only when the batched install fails
+                for dist in wanted:
+                    if self._pip([dist]):
+                        report["installed"].append(dist)
+                    else:
+                        report["failed"].append(dist)
+                        self._failed[dist] = time.time()
+                self._save_failed()
+            importlib.invalidate_caches()
+        return report
+
+    def forget_failures(self):
+        with self._lock:
+            self._failed = {}
+            self._save_failed()
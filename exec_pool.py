@@ -0,0 +1,302 @@
+"""
+Exec Pool – run generated automation code on warm worker processes
+
+- Workers are spawned ahead of time with pyautogui, pywhatkit and webbrowser
+  already imported, so a job starts without paying for those imports
+- Code is sent over a pipe and runs in a fresh namespace in the worker,
+  never in J3.py's globals
+- stdout/stderr and the traceback of a failed job come back with the result
+- Per-job timeout and cancel(): the worker is killed and replaced
+- Workers are recycled after MAX_JOBS_PER_WORKER jobs or if they die
+
+Run directly to compare job start latency with a cold subprocess and an
+in-process exec():
+    python exec_pool.py --runs 10
+"""
+
+import contextlib
+import importlib
+import io
+import multiprocessing
+import queue
+import threading
+import time
+import traceback
+
+PRELOAD = ("pyautogui", "pywhatkit", "webbrowser")
+POOL_SIZE = 2
+MAX_JOBS_PER_WORKER = 50
+TIMEOUT = 120.0
+MAX_OUTPUT = 20_000       # characters of captured output kept per job
+READY_TIMEOUT = 60.0
+
+
+# =========================
+# WORKER PROCESS
+# =========================
+def _worker_main(conn, preload):
+    loaded = []
+    for name in preload:
+        try:
+            importlib.import_module(name)
+            loaded.append(name)
+        except Exception:
+            pass      # e.g. no display for pyautogui; the job will report it
+    conn.send(("ready", loaded))
+
+    while True:
+        try:
+            code = conn.recv()
+        except (EOFError, OSError):
+            return
+        if code is None:
+            return
+        out = io.StringIO()
+        start = time.perf_counter()
+        error = None
+        try:
+            with contextlib.redirect_stdout(out), contextlib.redirect_stderr(out):
+                exec(compile(code, "<nexa-automation>", "exec"), {"__name__": "__main__"})
+        except SystemExit:
+            pass
+        except BaseException:
+            error = traceback.format_exc(limit=-5)
+        conn.send(("done", out.getvalue()[-MAX_OUTPUT:], error, time.perf_counter() - start))
+
+
+class _Worker:
+    def __init__(self, ctx, preload):
+        self.conn, child = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child, tuple(preload)),
+                                   name="nexa-exec", daemon=True)
+        self.process.start()
+        child.close()
+        self.jobs = 0
+        self.preloaded = None
+
+    def wait_ready(self, timeout: float = READY_TIMEOUT) -> bool:
+        if self.preloaded is None:
+            if not self.conn.poll(timeout):
+                return False
+            _, self.preloaded = self.conn.recv()
+        return True
+
+    def kill(self):
+        try:
+            self.process.kill()
+            self.process.join(timeout=2)
+        finally:
+            self.conn.close()
+
+    def close(self):
+        try:
+            self.conn.send(None)
+            self.process.join(timeout=2)
+        except (OSError, ValueError):
+            pass
+        if self.process.is_alive():
+            self.kill()
+        else:
+            self.conn.close()
+
+
+# =========================
+# JOBS
+# =========================
+class ExecResult:
+    def __init__(self, status: str, output: str = "", error: str = None, seconds: float = 0.0,
+                 start_latency: float = 0.0, worker_pid: int = None):
+        self.status = status            # ok / error / timeout / cancelled / crashed
+        self.output = output
+        self.error = error
+        self.seconds = seconds          # run time inside the worker (or until killed)
+        self.start_latency = start_latency   # submit -> code running in a worker
+        self.worker_pid = worker_pid
+
+    @property
+    def ok(self) -> bool:
+        return self.status == "ok"
+
+
+class ExecJob:
+    def __init__(self, code: str, timeout: float):
+        self.code = code
+        self.timeout = timeout
+        self.status = "queued"          # queued -> running -> ok / error / timeout / cancelled / crashed
+        self.submitted = time.perf_counter()
+        self._cancel = threading.Event()
+        self._done = threading.Event()
+        self._result = None
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def result(self, timeout: float = None) -> ExecResult:
+        self._done.wait(timeout)
+        return self._result
+
+    def _finish(self, result: ExecResult):
+        self._result = result
+        self.status = result.status
+        self._done.set()
+
+
+# =========================
+# POOL
+# =========================
+class ExecPool:
+    def __init__(self, size: int = POOL_SIZE, preload=PRELOAD, max_jobs_per_worker: int = MAX_JOBS_PER_WORKER,
+                 timeout: float = TIMEOUT):
+        self.preload = tuple(preload)
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self.timeout = timeout
+        self._ctx = multiprocessing.get_context("spawn")
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._running = set()
+        self.stats = {"jobs": 0, "ok": 0, "error": 0, "timeout": 0, "cancelled": 0, "crashed": 0,
+                      "recycled": 0, "total_start_latency": 0.0}
+        for _ in range(size):
+            self._idle.put(_Worker(self._ctx, self.preload))
+
+    def submit(self, code: str, timeout: float = None) -> ExecJob:
+        """Queue code for a worker and return immediately."""
+        job = ExecJob(code, timeout or self.timeout)
+        threading.Thread(target=self._run_job, args=(job,), name="nexa-exec-job", daemon=True).start()
+        return job
+
+    def run(self, code: str, timeout: float = None) -> ExecResult:
+        return self.submit(code, timeout).result()
+
+    def cancel_all(self):
+        with self._lock:
+            for job in self._running:
+                job.cancel()
+
+    def summary(self) -> dict:
+        with self._lock:
+            s = dict(self.stats)
+        started = s.pop("total_start_latency")
+        s["avg_start_ms"] = round(1000 * started / s["jobs"], 1) if s["jobs"] else 0.0
+        s["idle_workers"] = self._idle.qsize()
+        return s
+
+    def shutdown(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+    def _run_job(self, job: ExecJob):
+        with self._lock:
+            self._running.add(job)
+        worker = self._idle.get()
+        result = None
+        replace = False
+        try:
+            if job._cancel.is_set():
+                result = ExecResult("cancelled")
+            elif not worker.wait_ready():
+                result, replace = ExecResult("crashed", error="Worker did not start"), True
+            else:
+                job.status = "running"
+                worker.conn.send(job.code)
+                start_latency = time.perf_counter() - job.submitted
+                started = time.perf_counter()
+                while result is None:
+                    if worker.conn.poll(0.05):
+                        _, output, error, seconds = worker.conn.recv()
+                        result = ExecResult("error" if error else "ok", output, error, seconds)
+                    elif job._cancel.is_set():
+                        result, replace = ExecResult("cancelled"), True
+                    elif time.perf_counter() - started > job.timeout:
+                        result, replace = ExecResult("timeout", error=f"Timed out after {job.timeout:.0f} s"), True
+                    elif not worker.process.is_alive():
+                        result, replace = ExecResult("crashed", error=f"Worker exited ({worker.process.exitcode})"), True
+                    if result is not None and not result.seconds:
+                        result.seconds = time.perf_counter() - started
+                result.start_latency = start_latency
+                result.worker_pid = worker.process.pid
+                worker.jobs += 1
+        except (EOFError, OSError) as e:
+            worker.process.join(timeout=0.5)
+            code = worker.process.exitcode
+            message = f"Worker exited ({code})" if code is not None else f"{type(e).__name__}: {e}"
+            result, replace = ExecResult("crashed", error=message), True
+        finally:
+            if replace or worker.jobs >= self.max_jobs_per_worker:
+                worker.kill() if replace else worker.close()
+                worker = _Worker(self._ctx, self.preload)
+                with self._lock:
+                    self.stats["recycled"] += 1
+            self._idle.put(worker)
+            result = result or ExecResult("crashed", error="Job runner failed")
+            with self._lock:
+                self._running.discard(job)
+                self.stats["jobs"] += 1
+                self.stats[result.status] += 1
+                self.stats["total_start_latency"] += result.start_latency
+            job._finish(result)
+
+
+# =========================
+# BENCHMARK
+# =========================
+def benchmark(runs: int = 10, preload=PRELOAD):
+    import subprocess
+    import sys
+
+    available = []
+    for name in preload:
+        try:
+            importlib.import_module(name)
+            available.append(name)
+        except Exception:
+            pass
+    imports = "".join(f"import {name}\n" for name in available)
+    code = imports + "x = sum(range(1000))\n"
+    print(f"Job: import {', '.join(available) or '(nothing)'} + trivial work "
+          f"(missing here: {', '.join(sorted(set(preload) - set(available))) or 'none'})")
+
+    # in-process exec: what J3 did (imports are cached after the first run)
+    start = time.perf_counter()
+    for _ in range(runs):
+        exec(code, {"__name__": "__main__"})
+    inproc = 1000 * (time.perf_counter() - start) / runs
+
+    # cold subprocess per job
+    start = time.perf_counter()
+    for _ in range(runs):
+        subprocess.run([sys.executable, "-c", code], check=True)
+    cold = 1000 * (time.perf_counter() - start) / runs
+
+    # warm pool
+    pool = ExecPool(size=1, preload=available)
+    pool.run("pass")    # wait for the worker to come up
+    start = time.perf_counter()
+    latencies = []
+    for _ in range(runs):
+        result = pool.run(code)
+        assert result.ok, result.error
+        latencies.append(result.start_latency)
+    warm = 1000 * (time.perf_counter() - start) / runs
+    pool.shutdown()
+
+    print(f"  in-process exec   : {inproc:8.2f} ms/job (blocks the UI thread, shares J3 globals)")
+    print(f"  cold subprocess   : {cold:8.2f} ms/job")
+    print(f"  warm worker pool  : {warm:8.2f} ms/job (code running after {1000 * sum(latencies) / runs:.2f} ms)")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Execution engine start-latency benchmark")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--preload", nargs="*", default=list(PRELOAD))
+    args = parser.parse_args()
+    benchmark(args.runs, args.preload)
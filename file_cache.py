@@ -0,0 +1,53 @@
+"""
+File Cache – process-wide text file cache for Streamlit reruns
+
+Streamlit re-executes J3.py on every widget interaction, but imported
+modules stay loaded, so this cache survives reruns:
+- Unchanged files (same mtime and size) are served from memory
+- Files that only grew (append-only logs) have just the new bytes read
+- Anything else (rewritten / truncated) is re-read in full
+"""
+
+import os
+import threading
+
+_cache = {}   # path -> {"mtime", "size", "text"}
+_lock = threading.Lock()
+stats = {"hits": 0, "appends": 0, "full_reads": 0}
+
+
+def read_text(path: str, default: str = "") -> str:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        with _lock:
+            _cache.pop(path, None)
+        return default
+
+    with _lock:
+        entry = _cache.get(path)
+        if entry and entry["mtime"] == st.st_mtime_ns and entry["size"] == st.st_size:
+            stats["hits"] += 1
+            return entry["text"]
+
+        if entry and st.st_size > entry["size"]:
+            with open(path, "rb") as f:
+                f.seek(entry["size"])
+                added = f.read(st.st_size - entry["size"])
+            text = entry["text"] + added.decode("utf-8", errors="replace")
+            stats["appends"] += 1
+        else:
+            with open(path, "rb") as f:
+                text = f.read(st.st_size).decode("utf-8", errors="replace")
+            stats["full_reads"] += 1
+
+        _cache[path] = {"mtime": st.st_mtime_ns, "size": st.st_size, "text": text}
+        return text
+
+
+def invalidate(path: str = None):
+    with _lock:
+        if path is None:
+            _cache.clear()
+        else:
+            _cache.pop(path, None)
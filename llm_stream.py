@@ -0,0 +1,229 @@
+"""
+LLM Stream – streaming code generation for the AI Automation Console
+
+- sanitize_code(): strips Markdown fences from LLM output before exec
+  (also used by J3 for non-streamed replies)
+- FenceSanitizer: incremental version of sanitize_code that notices the
+  closing ``` fence as soon as it arrives
+- stream_code(): consumes a Groq streaming completion, reports progress and
+  stops reading once the code block is complete
+- FakeGroqClient: offline stand-in for the Groq client with configurable
+  time-to-first-token and token rate, for measuring without the API
+
+Run directly for an offline benchmark:
+    python llm_stream.py
+"""
+
+import re
+import time
+from types import SimpleNamespace
+
+_OPEN_FENCE = re.compile(r"```(?:python|py)?[ \t]*\n", re.IGNORECASE)
+
+
+# =========================
+# SANITIZER
+# =========================
+def sanitize_code(code: str) -> str:
+    """Clean LLM output before exec:
+    - If code is wrapped in triple-backtick fences (``` or ```python), extract inner block.
+    - Remove stray fence lines if present.
+    - Strip leading/trailing whitespace.
+    """
+    if not isinstance(code, str):
+        return ""
+
+    # Look for a fenced code block and extract the first one
+    m = re.search(r"```(?:python|py)?\n([\s\S]*?)\n```", code, flags=re.IGNORECASE)
+    if m:
+        return m.group(1).strip()
+
+    # Remove any remaining triple-backtick lines
+    lines = [ln for ln in code.splitlines() if not ln.strip().startswith("```")]
+    cleaned = "\n".join(lines).strip()
+
+    # Sometimes LLMs include markdown code fences with language on the same line
+    cleaned = re.sub(r"^```[a-zA-Z0-9_-]*\s*", "", cleaned)
+    cleaned = re.sub(r"\s*```$", "", cleaned)
+
+    return cleaned.strip()
+
+
+# =========================
+# INCREMENTAL SANITIZER
+# =========================
+class FenceSanitizer:
+    def __init__(self):
+        self.raw = ""
+        self._code_start = None   # index in raw where the fenced code begins
+        self._scan_from = 0
+        self.done = False
+
+    def feed(self, chunk: str) -> bool:
+        """Add streamed text. Returns True once the fenced block is closed."""
+        if self.done or not chunk:
+            return self.done
+        self.raw += chunk
+        if self._code_start is None:
+            m = _OPEN_FENCE.search(self.raw)
+            if not m:
+                return False
+            self._code_start = m.end()
+            self._scan_from = self._code_start
+        # Back up a few characters in case the fence was split across chunks
+        close = self.raw.find("\n```", max(self._code_start, self._scan_from - 4))
+        if close != -1:
+            self.raw = self.raw[:close + 4]
+            self.done = True
+        else:
+            self._scan_from = len(self.raw)
+        return self.done
+
+    def preview(self) -> str:
+        """What to show while streaming: the code so far once the fence is
+        open, otherwise the raw text."""
+        if self._code_start is None:
+            return self.raw
+        body = self.raw[self._code_start:]
+        return body[:-4] if self.done else body
+
+    def code(self) -> str:
+        return sanitize_code(self.raw)
+
+
+# =========================
+# STREAMING
+# =========================
+def stream_code(client, messages, model: str = "openai/gpt-oss-120b", on_update=None):
+    """Stream a completion and return (raw_text, code, timings).
+
+    timings: ttft (first content token), code_ready (closing fence seen, or
+    stream end without one), total (stream read and closed), chunks and
+    early_stop.
+    """
+    start = time.perf_counter()
+    stream = client.chat.completions.create(model=model, messages=messages, stream=True)
+    sanitizer = FenceSanitizer()
+    timings = {"ttft": None, "code_ready": None, "total": None, "chunks": 0, "early_stop": False}
+    try:
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content or ""
+            if not delta:
+                continue
+            timings["chunks"] += 1
+            if timings["ttft"] is None:
+                timings["ttft"] = time.perf_counter() - start
+            done = sanitizer.feed(delta)
+            if done:
+                timings["code_ready"] = time.perf_counter() - start
+            if on_update:
+                on_update(sanitizer.preview())
+            if done:
+                timings["early_stop"] = True
+                break
+    finally:
+        close = getattr(stream, "close", None)
+        if close:
+            close()
+    timings["total"] = time.perf_counter() - start     # includes closing the stream
+    if timings["code_ready"] is None:
+        timings["code_ready"] = timings["total"]          # no closing fence: code ends with the stream
+    return sanitizer.raw, sanitizer.code(), timings
+
+
+# =========================
+# FAKE CLIENT (OFFLINE)
+# =========================
+SAMPLE_RESPONSE = (
+    "Here is the automation:\n"
+    "```python\n"
+    "import pyautogui\n"
+    "import time\n"
+    "pyautogui.press('win')\n"
+    "time.sleep(1)\n"
+    "pyautogui.typewrite('downloads')\n"
+    "pyautogui.press('enter')\n"
+    "```\n"
+    "This script opens the Start menu, searches for Downloads and opens it. "
+    "You can adjust the delays if your machine is slower. "
+    "Make sure no other window steals focus while it runs."
+)
+
+
+class _FakeStream:
+    def __init__(self, pieces, ttft, token_delay):
+        self._pieces = pieces
+        self._ttft = ttft
+        self._token_delay = token_delay
+        self.consumed = 0
+        self.closed = False
+
+    def __iter__(self):
+        time.sleep(self._ttft)
+        for i, piece in enumerate(self._pieces):
+            if self.closed:
+                return
+            if i:
+                time.sleep(self._token_delay)
+            self.consumed += 1
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=piece))])
+
+    def close(self):
+        self.closed = True
+
+
+class FakeGroqClient:
+    """Mimics client.chat.completions.create(...) with and without stream=True."""
+
+    def __init__(self, response: str = SAMPLE_RESPONSE, ttft: float = 0.3,
+                 token_delay: float = 0.02, chars_per_token: int = 4):
+        self.response = response
+        self.ttft = ttft
+        self.token_delay = token_delay
+        self.pieces = [response[i:i + chars_per_token]
+                       for i in range(0, len(response), chars_per_token)]
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+        self.last_stream = None
+
+    def _create(self, model=None, messages=None, stream=False, **kwargs):
+        if stream:
+            self.last_stream = _FakeStream(self.pieces, self.ttft, self.token_delay)
+            return self.last_stream
+        time.sleep(self.ttft + self.token_delay * (len(self.pieces) - 1))
+        message = SimpleNamespace(content=self.response)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+# =========================
+# BENCHMARK
+# =========================
+def benchmark(ttft: float = 0.3, token_delay: float = 0.02):
+    client = FakeGroqClient(ttft=ttft, token_delay=token_delay)
+    messages = [{"role": "system", "content": "benchmark"}]
+
+    start = time.perf_counter()
+    full = client.chat.completions.create(model="fake", messages=messages)
+    blocking_code = sanitize_code(full.choices[0].message.content)
+    blocking_s = time.perf_counter() - start
+
+    raw, code, t = stream_code(client, messages, model="fake")
+    assert code == blocking_code, "streamed code differs from blocking result"
+
+    print(f"tokens in response:      {len(client.pieces)}")
+    print(f"blocking: first render   {blocking_s:.2f} s, executable code {blocking_s:.2f} s")
+    print(f"streaming: first token   {t['ttft']:.2f} s, executable code {t['code_ready']:.2f} s, "
+          f"stream closed {t['total']:.2f} s "
+          f"({client.last_stream.consumed}/{len(client.pieces)} tokens read, "
+          f"early stop={t['early_stop']})")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Offline streaming vs blocking benchmark")
+    parser.add_argument("--ttft", type=float, default=0.3)
+    parser.add_argument("--token-delay", type=float, default=0.02)
+    args = parser.parse_args()
+    benchmark(args.ttft, args.token_delay)
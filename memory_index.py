@@ -0,0 +1,182 @@
+"""
+Memory Index – BM25 retrieval over JARVIS memory entries
+
+Instead of sending the whole memory file as {database} in every prompt,
+get_code() asks this index for the few entries relevant to the command and
+packs them under a token budget.
+
+Run directly for a benchmark:
+    python memory_index.py --entries 10000 100000
+"""
+
+import math
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+
+# =========================
+# TOKENIZING
+# =========================
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "to", "of", "in", "on", "for", "with", "is",
+    "are", "be", "this", "that", "it", "as", "by", "at", "from", "i", "you",
+    "me", "my", "your", "user", "wants", "please", "can", "will",
+}
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str):
+    return [w for w in _WORD.findall(text.lower()) if w not in STOPWORDS]
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough LLM token estimate (~4 characters per token)."""
+    return max(1, len(text) // 4)
+
+
+def split_entries(raw: str):
+    """Split the memory file into entries, one per non-empty line."""
+    return [ln.strip() for ln in raw.splitlines() if ln.strip()]
+
+
+# =========================
+# BM25 INDEX
+# =========================
+class MemoryIndex:
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.entries = []                   # doc_id -> text
+        self.doc_len = []                   # doc_id -> token count
+        self.postings = defaultdict(dict)   # term -> {doc_id: tf}
+        self.total_len = 0
+        # MemoryWriter adds entries from its worker while script and job
+        # prepare threads search
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_text(cls, raw: str) -> "MemoryIndex":
+        return cls.from_entries(split_entries(raw))
+
+    @classmethod
+    def from_entries(cls, entries) -> "MemoryIndex":
+        index = cls()
+        for entry in entries:
+            index.add(entry)
+        return index
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, text: str) -> int:
+        """Index one entry; O(len(text))."""
+        terms = tokenize(text)
+        counts = Counter(terms)
+        with self._lock:
+            doc_id = len(self.entries)
+            self.entries.append(text)
+            self.doc_len.append(len(terms))
+            self.total_len += len(terms)
+            for term, tf in counts.items():
+                self.postings[term][doc_id] = tf
+        return doc_id
+
+    def add_text(self, raw: str):
+        with self._lock:
+            for entry in split_entries(raw):
+                self.add(entry)
+
+    def search(self, query: str, k: int = 5):
+        """Return [(score, doc_id)] for the k best entries."""
+        terms = set(tokenize(query))
+        scores = defaultdict(float)
+        with self._lock:
+            n = len(self.entries)
+            if not n:
+                return []
+            avg_len = self.total_len / n or 1.0
+            for term in terms:
+                posting = self.postings.get(term)
+                if not posting:
+                    continue
+                idf = math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+                for doc_id, tf in posting.items():
+                    norm = self.k1 * (1 - self.b + self.b * self.doc_len[doc_id] / avg_len)
+                    scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+        best = sorted(scores.items(), key=lambda kv: (-kv[1], -kv[0]))[:k]
+        return [(score, doc_id) for doc_id, score in best]
+
+    def context_for(self, query: str, k: int = 5, token_budget: int = 600) -> str:
+        """Top-k relevant entries joined as prompt context, within token_budget."""
+        picked, used = [], 0
+        for _, doc_id in self.search(query, k):
+            text = self.entries[doc_id]
+            cost = estimate_tokens(text)
+            if used + cost > token_budget:
+                continue
+            picked.append(text)
+            used += cost
+        return "\n".join(picked)
+
+
+# =========================
+# BENCHMARK
+# =========================
+def _synthetic_entries(count: int):
+    import random
+    rng = random.Random(42)
+    verbs = ["open", "send", "play", "call", "search", "close", "download", "summarize"]
+    objects = ["downloads folder", "report", "song", "playlist", "spreadsheet", "invoice",
+               "presentation", "meeting notes", "vs code", "browser"]
+    people = ["aman", "devendra", "ops", "finance", "ayush", "priya", "team"]
+    apps = ["whatsapp", "youtube", "instagram", "outlook", "slack", "explorer"]
+    for i in range(count):
+        yield (f"The user wants to {rng.choice(verbs)} the {rng.choice(objects)} "
+               f"for {rng.choice(people)} using {rng.choice(apps)}. "
+               f"This was request number {i} and should be handled by automation.")
+
+
+def benchmark(sizes=(10_000, 100_000), queries=50, prefill_tps: float = 2000.0):
+    """Compare full-file prompt context against retrieved context.
+
+    End-to-end latency is local work (retrieval + prompt build) plus an
+    estimated prefill time of prompt_tokens / prefill_tps for the LLM call.
+    """
+    probe = ["send report to ops on whatsapp", "open downloads folder",
+             "play a song on youtube", "call aman"]
+    for size in sizes:
+        entries = list(_synthetic_entries(size))
+        full_text = "\n".join(entries)
+
+        start = time.perf_counter()
+        index = MemoryIndex()
+        for e in entries:
+            index.add(e)
+        build_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        contexts = [index.context_for(probe[i % len(probe)]) for i in range(queries)]
+        query_ms = 1000 * (time.perf_counter() - start) / queries
+
+        full_tokens = estimate_tokens(full_text)
+        ctx_tokens = sum(estimate_tokens(c) for c in contexts) // len(contexts)
+        print(f"--- {size:,} entries ---")
+        print(f"index build:        {build_s:.2f} s ({1e6 * build_s / size:.1f} us/entry)")
+        print(f"full prompt ctx:    {len(full_text):,} chars, ~{full_tokens:,} tokens, "
+              f"est. e2e {full_tokens / prefill_tps:.2f} s")
+        print(f"retrieved ctx:      ~{ctx_tokens:,} tokens, retrieval {query_ms:.2f} ms, "
+              f"est. e2e {query_ms / 1000 + ctx_tokens / prefill_tps:.2f} s")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark memory retrieval vs full-file prompts")
+    parser.add_argument("--entries", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--prefill-tps", type=float, default=2000.0,
+                        help="assumed LLM prompt-processing speed in tokens/s")
+    args = parser.parse_args()
+    benchmark(args.entries, args.queries, args.prefill_tps)
@@ -0,0 +1,309 @@
+"""
+Memory Store – bounded, deduplicated JARVIS memory on SQLite
+
+Replaces the ever-growing `db` string and raw appends to JARVIS_db.txt:
+- One record per summary (id, timestamp, source, text)
+- Exact duplicates rejected by normalized-text hash
+- Near-duplicates rejected by 64-bit SimHash (banded lookup, no full scan)
+- Retention policy (max entries / max age) applied in amortized O(1); the
+  age cutoff also runs on open and every AGE_CHECK_SECONDS
+- Hashes of commands already summarized, so MemoryWriter never pays for the
+  same command twice
+- One-time importer for the legacy JARVIS_db.txt, split back into the
+  (often multi-line) summaries it was appended from
+"""
+
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+
+# =========================
+# DEFAULTS
+# =========================
+STORE_FILE = "JARVIS_memory.db"
+LEGACY_FILE = "JARVIS_db.txt"
+MAX_ENTRIES = 5000
+MAX_AGE_DAYS = 180
+NEAR_DUP_DISTANCE = 3    # max differing SimHash bits for a near-duplicate
+RETENTION_SLACK = 100    # evict in batches once this far over MAX_ENTRIES
+AGE_CHECK_SECONDS = 3600  # age cutoff runs at least this often, even under the count limit
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+# =========================
+# HASHING
+# =========================
+def normalize_text(text: str) -> str:
+    return " ".join(_WORD.findall((text or "").lower()))
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha1(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+def simhash(text: str) -> int:
+    """64-bit SimHash over word unigrams and bigrams."""
+    words = normalize_text(text).split()
+    features = words + [a + " " + b for a, b in zip(words, words[1:])]
+    weights = [0] * 64
+    for feat in features:
+        h = int.from_bytes(hashlib.blake2b(feat.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(64):
+            weights[bit] += 1 if h >> bit & 1 else -1
+    value = 0
+    for bit, w in enumerate(weights):
+        if w > 0:
+            value |= 1 << bit
+    return value
+
+
+def _bands(value: int):
+    """Split a 64-bit hash into four 16-bit bands. Two hashes within
+    NEAR_DUP_DISTANCE (< 4) bits must agree on at least one band."""
+    return [(value >> (16 * i)) & 0xFFFF for i in range(4)]
+
+
+def _signed(value: int) -> int:
+    # SQLite INTEGER is signed 64-bit
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+# =========================
+# LEGACY FORMAT
+# =========================
+# A line that carries on the summary above it: list items, quotes, indented text
+_CONTINUATION = re.compile(r"^(?:\s+\S|[-*•>]\s|\d+[.)]\s)")
+
+
+def split_summaries(text: str):
+    """Split JARVIS_db.txt back into summaries. Each was appended as one
+    block of Markdown, so a line break (or blank line) only ends a summary
+    when the line before it is complete: not a heading or intro ending in
+    ":", not a Markdown hard break (two trailing spaces), and the next line
+    is not a list item or quote."""
+    summaries, current = [], []
+    open_ended = False
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        if current and not open_ended and not _CONTINUATION.match(line):
+            summaries.append("\n".join(current))
+            current = []
+        current.append(line.rstrip())
+        open_ended = line.endswith("  ") or line.rstrip().rstrip("*_").endswith(":")
+    if current:
+        summaries.append("\n".join(current))
+    return summaries
+
+
+# =========================
+# STORE
+# =========================
+class MemoryStore:
+    def __init__(self, path: str = STORE_FILE, max_entries: int = MAX_ENTRIES,
+                 max_age_days: float = MAX_AGE_DAYS, near_dup_distance: int = NEAR_DUP_DISTANCE):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self.near_dup_distance = near_dup_distance
+        # Bumped whenever entries are removed, so derived indexes know to rebuild.
+        self.generation = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript("""
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS entries (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                created REAL NOT NULL,
+                source TEXT NOT NULL,
+                text TEXT NOT NULL,
+                norm_hash TEXT NOT NULL UNIQUE,
+                simhash INTEGER NOT NULL,
+                b0 INTEGER, b1 INTEGER, b2 INTEGER, b3 INTEGER
+            );
+            CREATE INDEX IF NOT EXISTS idx_b0 ON entries(b0);
+            CREATE INDEX IF NOT EXISTS idx_b1 ON entries(b1);
+            CREATE INDEX IF NOT EXISTS idx_b2 ON entries(b2);
+            CREATE INDEX IF NOT EXISTS idx_b3 ON entries(b3);
+            CREATE INDEX IF NOT EXISTS idx_created ON entries(created);
+            CREATE TABLE IF NOT EXISTS commands (
+                norm_hash TEXT PRIMARY KEY,
+                created REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_commands_created ON commands(created);
+            CREATE TABLE IF NOT EXISTS purges (
+                name TEXT PRIMARY KEY,
+                run REAL NOT NULL,
+                count INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS imports (
+                path TEXT PRIMARY KEY,
+                imported REAL NOT NULL,
+                count INTEGER NOT NULL
+            );
+        """)
+        self._count = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        self._age_checked = 0.0
+        self._enforce_retention()
+
+    # -------------------------
+    # APPEND
+    # -------------------------
+    def _find_duplicate(self, norm_hash: str, sh: int):
+        row = self._conn.execute(
+            "SELECT id FROM entries WHERE norm_hash = ?", (norm_hash,)
+        ).fetchone()
+        if row:
+            return row[0]
+        if self.near_dup_distance <= 0:
+            return None
+        b = _bands(sh)
+        rows = self._conn.execute(
+            "SELECT id, simhash FROM entries WHERE b0 = ? OR b1 = ? OR b2 = ? OR b3 = ?", b
+        ).fetchall()
+        for entry_id, other in rows:
+            if bin((other & 0xFFFFFFFFFFFFFFFF) ^ sh).count("1") <= self.near_dup_distance:
+                return entry_id
+        return None
+
+    def append(self, text: str, source: str = "command", created: float = None):
+        """Store a summary. Returns the new id, or None if it was empty or a
+        (near-)duplicate of an existing entry."""
+        text = (text or "").strip()
+        if not normalize_text(text):
+            return None
+        norm_hash = text_hash(text)
+        sh = simhash(text)
+        with self._lock:
+            if self._find_duplicate(norm_hash, sh) is not None:
+                return None
+            cur = self._conn.execute(
+                "INSERT INTO entries (created, source, text, norm_hash, simhash, b0, b1, b2, b3) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (created or time.time(), source, text, norm_hash, _signed(sh), *_bands(sh)),
+            )
+            self._conn.commit()
+            self._count += 1
+            if (self._count > self.max_entries + RETENTION_SLACK
+                    or time.monotonic() - self._age_checked > AGE_CHECK_SECONDS):
+                self._enforce_retention()
+            return cur.lastrowid
+
+    # -------------------------
+    # RETENTION / COMPACTION
+    # -------------------------
+    def _enforce_retention(self) -> int:
+        removed = 0
+        self._age_checked = time.monotonic()
+        if self.max_age_days:
+            cutoff = time.time() - self.max_age_days * 86400
+            removed += self._conn.execute("DELETE FROM entries WHERE created < ?", (cutoff,)).rowcount
+            self._conn.execute("DELETE FROM commands WHERE created < ?", (cutoff,))
+        excess = self._count - removed - self.max_entries
+        if excess > 0:
+            removed += self._conn.execute(
+                "DELETE FROM entries WHERE id IN (SELECT id FROM entries ORDER BY id LIMIT ?)",
+                (excess,),
+            ).rowcount
+        self._conn.commit()
+        self._count -= removed
+        if removed:
+            self.generation += 1
+        return removed
+
+    def enforce_retention(self) -> int:
+        with self._lock:
+            return self._enforce_retention()
+
+    def remove_where(self, predicate, once: str = None) -> int:
+        """Delete entries whose text matches predicate(text). Returns the count.
+        With once="name", the purge runs a single time per store (recorded
+        like imports), not on every start."""
+        with self._lock:
+            if once and self._conn.execute("SELECT 1 FROM purges WHERE name = ?", (once,)).fetchone():
+                return 0
+            rows = self._conn.execute("SELECT id, text FROM entries").fetchall()
+            ids = [(entry_id,) for entry_id, text in rows if predicate(text)]
+            if ids:
+                self._conn.executemany("DELETE FROM entries WHERE id = ?", ids)
+                self._count -= len(ids)
+                self.generation += 1
+            if once:
+                self._conn.execute("INSERT INTO purges (name, run, count) VALUES (?, ?, ?)",
+                                   (once, time.time(), len(ids)))
+            self._conn.commit()
+            return len(ids)
+
+    def compact(self) -> int:
+        """Apply retention and reclaim disk space."""
+        with self._lock:
+            removed = self._enforce_retention()
+            self._conn.execute("VACUUM")
+            return removed
+
+    # -------------------------
+    # READ
+    # -------------------------
+    def __len__(self):
+        return self._count
+
+    def texts(self):
+        """Yield stored entries oldest first without loading them all at once."""
+        with self._lock:
+            rows = self._conn.execute("SELECT text FROM entries ORDER BY id").fetchall()
+        for (text,) in rows:
+            yield text
+
+    def contains(self, text: str) -> bool:
+        with self._lock:
+            return self._find_duplicate(text_hash(text), simhash(text)) is not None
+
+    # -------------------------
+    # SUMMARIZED COMMANDS
+    # -------------------------
+    def seen_command(self, command: str) -> bool:
+        """Was this command (after normalization) summarized before?"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM commands WHERE norm_hash = ?", (text_hash(command),)
+            ).fetchone() is not None
+
+    def mark_commands(self, commands):
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO commands (norm_hash, created) VALUES (?, ?)",
+                [(text_hash(c), now) for c in commands],
+            )
+            self._conn.commit()
+
+    # -------------------------
+    # LEGACY IMPORT
+    # -------------------------
+    def import_text_file(self, path: str = LEGACY_FILE) -> int:
+        """Import a legacy memory file once, one entry per summary (see
+        split_summaries). Returns the number of entries added (0 if the file
+        was already imported or is missing)."""
+        with self._lock:
+            if self._conn.execute("SELECT 1 FROM imports WHERE path = ?", (path,)).fetchone():
+                return 0
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                summaries = split_summaries(f.read())
+        except FileNotFoundError:
+            return 0
+        added = sum(1 for s in summaries if self.append(s, source="import") is not None)
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO imports (path, imported, count) VALUES (?, ?, ?)",
+                (path, time.time(), added),
+            )
+            self._conn.commit()
+        return added
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,348 @@
+"""
+Memory Writer – batched background memory summarization for process_command
+
+Summaries are only needed for future prompts, so they are produced off the
+command path, and many commands share one LLM call:
+- Commands are buffered and summarized BATCH_SIZE at a time (or after
+  MAX_DELAY seconds) in a single numbered-list request
+- Commands already summarized (normalized-text hash) or already present in
+  memory are skipped before they cost anything
+- Low-value summaries ("The input does not contain a specific topic...",
+  "I'm an AI...") are dropped instead of stored
+- One worker thread => summaries are stored in submission order
+- A batch reply that cannot be parsed (numbering out of range or out of
+  order, or mostly unanswered) is summarized again one command per call
+- Failures are recorded in stats and never reach the command path
+- Buffered commands are flushed (bounded wait) when the process exits
+- LLM calls and tokens per 100 commands are tracked for the Memory panel
+
+Run directly for a per-command vs batched comparison on 100 commands:
+    python memory_writer.py
+"""
+
+import atexit
+import re
+import threading
+import time
+
+from memory_store import normalize_text
+
+BATCH_SIZE = 10
+MAX_DELAY = 30.0         # seconds a command may wait for its batch to fill
+MIN_WORDS = 4
+EXIT_FLUSH_TIMEOUT = 10.0  # seconds the process may wait at exit for pending summaries
+
+# Non-answers: the model saying there was nothing to summarize
+LOW_VALUE = re.compile(
+    r"\b(?:input|request|text|message|phrase) does(?: not|n[’']t) (?:contain|include|specify) "
+    r"(?:a |any )?(?:specific |clear )?(?:topic|request|task)"
+    r"|^\s*(?:i[’']m|i am) (?:an ai|a language model)\b"
+    r"|^\s*as an ai\b"
+    r"|\bno (?:specific |clear )?(?:topic|request) (?:was |is )?(?:provided|given)"
+    r"|\bis incomplete and lacks (?:sufficient )?context",
+    re.IGNORECASE | re.MULTILINE,
+)
+
+_UNICODE_WORD = re.compile(r"\w+")
+# "1. x", "1) x", "1: x", "1 - x", "**1.** x", "(1) x", "- 1. x" ...
+_NUMBERED = re.compile(r"^\s*(?:[-*•]\s+)?[*_#(\[]*\s*(\d+)\s*(?:[*_)\].:]|\s[-–—])[*_)\].:\s–—-]*(.*\S)?\s*$")
+MIN_PARSED = 0.5         # fraction of a batch that must get an answer
+
+
+def is_non_answer(text: str) -> bool:
+    return bool(LOW_VALUE.search(text or ""))
+
+
+def is_low_value(summary: str) -> bool:
+    """New summaries: non-answers, or too short to be the 3–4 sentences asked for."""
+    # Any script counts as words: summaries are not always in English
+    return len(_UNICODE_WORD.findall(summary or "")) < MIN_WORDS or is_non_answer(summary)
+
+
+def parse_numbered(text: str, count: int):
+    """Split a "1. ...\\n2. ..." reply into count summaries. An item the
+    model marked SKIP is "" (answered, nothing to store); a missing item is
+    None (unanswered, worth retrying). Continuation lines join their item.
+    ValueError if a number is out of range or out of order: the reply
+    cannot be mapped back onto the commands safely."""
+    items = [None] * count
+    current = None
+    for line in (text or "").splitlines():
+        m = _NUMBERED.match(line)
+        if m:
+            number = int(m.group(1))
+            if not 1 <= number <= count or (current is not None and number - 1 <= current):
+                raise ValueError(f"item {number} out of range or order in a reply for {count} commands")
+            current = number - 1
+            items[current] = m.group(2) or ""
+        elif current is not None and line.strip():
+            items[current] += " " + line.strip()
+    return [None if item is None else "" if item.strip(" *_.").upper() == "SKIP" else item.strip()
+            for item in items]
+
+
+class MemoryWriter:
+    def __init__(self, summarize_batch, store, batch_size: int = BATCH_SIZE, max_delay: float = MAX_DELAY):
+        """summarize_batch(commands) -> (summaries, tokens): one summary (or
+        None) per command, from a single LLM call. store must provide
+        append(text), contains(text), seen_command(text) and mark_commands(texts)."""
+        self.summarize_batch = summarize_batch
+        self.store = store
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self._buffer = []                  # (command, on_stored)
+        self._in_flight = set()            # normalized commands of the batch being summarized
+        self._oldest = None                # when the buffered batch started
+        self._flushing = 0                 # flush() requests not yet served
+        self._busy = False
+        self._stop = False
+        self._cv = threading.Condition()
+        self._lock = threading.Lock()
+        self.stats = {
+            "submitted": 0,
+            "skipped": 0,          # already summarized / already in memory
+            "summarized": 0,
+            "stored": 0,
+            "duplicates": 0,
+            "filtered": 0,         # low-value summaries dropped
+            "failed": 0,
+            "fallbacks": 0,        # unparseable batches redone one command per call
+            "pending": 0,
+            "llm_calls": 0,
+            "tokens": 0,
+            "last_seconds": 0.0,
+            "total_seconds": 0.0,
+            "last_error": None,
+        }
+        self._thread = threading.Thread(target=self._run, name="nexa-memory", daemon=True)
+        self._thread.start()
+        atexit.register(self.flush, EXIT_FLUSH_TIMEOUT)
+
+    # -------------------------
+    # Producer side
+    # -------------------------
+    def submit(self, command: str, on_stored=None) -> bool:
+        """Buffer command for summarization; returns False if it was skipped.
+
+        on_stored(summary) is called from the worker after a new entry is stored.
+        """
+        with self._lock:
+            self.stats["submitted"] += 1
+        norm = normalize_text(command)
+        # Check and buffer in one critical section: the same command
+        # submitted from two threads is summarized (and paid for) once
+        with self._cv:
+            if (not norm or norm in self._in_flight
+                    or any(normalize_text(c) == norm for c, _ in self._buffer)
+                    or self.store.seen_command(command) or self.store.contains(command)):
+                with self._lock:
+                    self.stats["skipped"] += 1
+                return False
+            if not self._buffer:
+                self._oldest = time.monotonic()
+            self._buffer.append((command, on_stored))
+            with self._lock:
+                self.stats["pending"] += 1
+            self._cv.notify()
+        return True
+
+    def flush(self, timeout: float = None) -> bool:
+        """Summarize everything buffered now and wait until it is stored."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cv:
+            self._flushing += 1
+            self._cv.notify()
+            while self._buffer or self._busy:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cv.wait(0.05 if remaining is None else min(0.05, remaining))
+        return True
+
+    def shutdown(self, wait: bool = True):
+        if wait:
+            self.flush()
+        with self._cv:
+            self._stop = True
+            self._cv.notify()
+
+    def summary(self) -> dict:
+        with self._lock:
+            s = dict(self.stats)
+        s["avg_seconds"] = s["total_seconds"] / s["summarized"] if s["summarized"] else 0.0
+        s["calls_per_100"] = 100 * s["llm_calls"] / s["submitted"] if s["submitted"] else 0.0
+        s["tokens_per_100"] = 100 * s["tokens"] / s["submitted"] if s["submitted"] else 0.0
+        return s
+
+    # -------------------------
+    # Worker thread
+    # -------------------------
+    def _run(self):
+        while True:
+            with self._cv:
+                while not self._stop:
+                    if self._buffer and (self._flushing or len(self._buffer) >= self.batch_size
+                                         or time.monotonic() - self._oldest >= self.max_delay):
+                        break
+                    if not self._buffer:
+                        self._flushing = 0
+                    timeout = None if not self._buffer else self._oldest + self.max_delay - time.monotonic()
+                    self._cv.wait(timeout)
+                if self._stop:
+                    return
+                batch, self._buffer = self._buffer[:self.batch_size], self._buffer[self.batch_size:]
+                self._oldest = time.monotonic() if self._buffer else None
+                self._in_flight = {normalize_text(c) for c, _ in batch}
+                self._busy = True
+            try:
+                self._process(batch)
+            finally:
+                with self._cv:
+                    self._in_flight = set()
+                    self._busy = False
+                    self._cv.notify_all()
+
+    def _summarize(self, commands):
+        """One summary (or None) per command. A reply that cannot be parsed,
+        or answers fewer than MIN_PARSED of the batch, is retried one command
+        per call; for a single command it raises ValueError."""
+        try:
+            summaries, tokens = self.summarize_batch(commands)
+            with self._lock:
+                self.stats["llm_calls"] += 1
+                self.stats["tokens"] += tokens
+        except ValueError:
+            if len(commands) == 1:
+                raise
+            summaries = []
+        answered = sum(summary is not None for summary in summaries)
+        if answered >= MIN_PARSED * len(commands):
+            return summaries
+        if len(commands) == 1:
+            raise ValueError("the summary could not be parsed")
+        with self._lock:
+            self.stats["fallbacks"] += 1
+        summaries = []
+        for command in commands:
+            try:
+                summaries += self._summarize([command])
+            except ValueError:
+                summaries.append(None)
+        return summaries
+
+    def _process(self, batch):
+        commands = [c for c, _ in batch]
+        start = time.perf_counter()
+        counts = {"stored": 0, "duplicates": 0, "filtered": 0, "failed": 0}
+        error = None
+        try:
+            summaries = self._summarize(commands)
+            answered = [c for c, summary in zip(commands, summaries) if summary is not None]
+            for (command, on_stored), summary in zip(batch, summaries):
+                if summary is None:
+                    counts["failed"] += 1      # not marked: summarized again if it comes back
+                    continue
+                if is_low_value(summary):
+                    counts["filtered"] += 1
+                    continue
+                if self.store.append(summary) is None:
+                    counts["duplicates"] += 1
+                    continue
+                counts["stored"] += 1
+                if on_stored is not None:
+                    on_stored(summary)
+            self.store.mark_commands(answered)
+        except Exception as e:
+            counts["failed"] = len(batch) - counts["stored"] - counts["duplicates"] - counts["filtered"]
+            error = f"{type(e).__name__}: {e}"
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            for key, n in counts.items():
+                self.stats[key] += n
+            self.stats["summarized"] += len(batch)
+            self.stats["pending"] -= len(batch)
+            self.stats["last_seconds"] = elapsed
+            self.stats["total_seconds"] += elapsed
+            if error:
+                self.stats["last_error"] = error
+
+
+# =========================
+# BENCHMARK
+# =========================
+PER_COMMAND_PROMPT = "Summarize the following user request in 3–4 concise sentences:\n{topic}"
+BATCH_PROMPT = ("Summarize each numbered user request in 3–4 concise sentences. Reply with one line "
+                "per request, \"<number>. <summary>\", or \"<number>. SKIP\" if it has no real content.\n{topics}")
+
+
+def _synthetic_commands(n: int = 100, seed: int = 7):
+    """A realistic session: favourite commands repeat, a few are noise."""
+    import random
+    rng = random.Random(seed)
+    contacts = ["aman", "riya", "mom", "rahul"]
+    songs = ["lofi beats", "arijit singh", "believer", "kesariya"]
+    apps = ["notepad", "calculator", "chrome", "vs code"]
+    pool = ([f"send good morning to {c} on whatsapp" for c in contacts]
+            + [f"play {s} on youtube" for s in songs]
+            + [f"open {a}" for a in apps]
+            + [f"create a folder named project {i} on the desktop" for i in range(30)])
+    noise = ["hi", "test", "hello?", "ok", "um"]
+    return [rng.choice(noise) if rng.random() < 0.1 else rng.choice(pool) for _ in range(n)]
+
+
+def _fake_summary(command: str) -> str:
+    if len(command.split()) < 2:
+        return "The input does not contain a specific topic or request to summarize."
+    return (f"The user asked NEXA to {command}. This is a desktop automation request. "
+            f"It should be executed with the matching rule or generated code.")
+
+
+def benchmark(n: int = 100):
+    import os
+    import tempfile
+    from memory_index import estimate_tokens
+    from memory_store import MemoryStore
+
+    commands = _synthetic_commands(n)
+    with tempfile.TemporaryDirectory() as tmp:
+        # Before: one get_db() call per command, everything stored
+        store = MemoryStore(os.path.join(tmp, "before.db"))
+        calls = tokens = 0
+        for command in commands:
+            summary = _fake_summary(command)
+            calls += 1
+            tokens += estimate_tokens(PER_COMMAND_PROMPT.format(topic=command)) + estimate_tokens(summary)
+            store.append(summary)
+        junk_before = sum(1 for t in store.texts() if is_low_value(t))
+        before = (calls, tokens, len(store), junk_before)
+        store.close()
+
+        # After: buffered, deduplicated, batched, filtered
+        store = MemoryStore(os.path.join(tmp, "after.db"))
+
+        def summarize_batch(batch):
+            numbered = "\n".join(f"{i}. {c}" for i, c in enumerate(batch, 1))
+            reply = "\n".join(f"{i}. {_fake_summary(c)}" for i, c in enumerate(batch, 1))
+            return (parse_numbered(reply, len(batch)),
+                    estimate_tokens(BATCH_PROMPT.format(topics=numbered)) + estimate_tokens(reply))
+
+        writer = MemoryWriter(summarize_batch, store)
+        for command in commands:
+            writer.submit(command)
+        writer.flush()
+        s = writer.summary()
+        junk_after = sum(1 for t in store.texts() if is_low_value(t))
+        after = (s["llm_calls"], s["tokens"], len(store), junk_after)
+        writer.shutdown()
+        store.close()
+
+    scale = 100 / n
+    print(f"{n} commands ({len(set(commands))} distinct)")
+    for label, (calls, tokens, stored, junk) in (("per-command get_db", before), ("batched writer", after)):
+        print(f"  {label:<19}: {calls * scale:5.1f} LLM calls / 100 commands, {tokens * scale:6.0f} tokens / 100, "
+              f"{stored} entries stored ({junk} low-value)")
+    print(f"  skipped {s['skipped']} repeats, filtered {s['filtered']} low-value summaries")
+
+
+if __name__ == "__main__":
+    benchmark()
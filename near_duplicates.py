@@ -0,0 +1,209 @@
+"""
+Near Duplicates – MinHash + LSH near-duplicate row detection
+
+Rows that differ only by casing, whitespace or small typos are grouped
+without comparing every pair:
+1. Selected columns are joined and normalized (lowercase, single spaces)
+2. Character 3-gram shingles are hashed with numpy over the whole block
+3. Each row gets a MinHash signature (num_perm 32-bit minima)
+4. Signatures are split into LSH bands; rows sharing a band bucket become
+   candidates and are kept only if their estimated Jaccard similarity
+   reaches the threshold
+5. Accepted pairs are merged with union-find into clusters
+
+Work is done in row blocks, so cost is roughly linear in rows.
+
+Run directly for a benchmark:
+    python near_duplicates.py --rows 100000 1000000
+"""
+
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+NUM_PERM = 64
+SHINGLE = 3
+BLOCK_ROWS = 200_000
+_MASK32 = np.uint64(0xFFFFFFFF)
+
+
+@dataclass
+class NearDuplicateResult:
+    labels: np.ndarray                 # cluster representative (row position) per row
+    clusters: int = 0                  # clusters with more than one row
+    rows_in_clusters: int = 0
+    candidate_pairs: int = 0
+    examples: list = field(default_factory=list)   # [[row texts], ...] for display
+
+    @property
+    def duplicate_mask(self) -> np.ndarray:
+        """True for every row except the first of its cluster."""
+        return self.labels != np.arange(len(self.labels))
+
+
+# =========================
+# SIGNATURES
+# =========================
+def _normalized_text(df: pd.DataFrame, columns) -> pd.Series:
+    text = df[columns].astype(str).where(df[columns].notna(), "")
+    joined = text.iloc[:, 0].str.cat(text.iloc[:, 1:], sep=" ") if len(columns) > 1 else text.iloc[:, 0]
+    return joined.str.lower().str.replace(r"\s+", " ", regex=True).str.strip()
+
+
+def _permutations(num_perm: int, seed: int = 1):
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, 2**63 - 1, num_perm, dtype=np.uint64) | np.uint64(1)
+    b = rng.integers(0, 2**63 - 1, num_perm, dtype=np.uint64)
+    return a, b
+
+
+def minhash_signatures(texts, num_perm: int = NUM_PERM, shingle: int = SHINGLE,
+                       block_rows: int = BLOCK_ROWS) -> np.ndarray:
+    """(n_rows, num_perm) uint32 MinHash signatures. Rows with no shingles
+    get all-0xFFFFFFFF signatures."""
+    texts = list(texts)
+    n = len(texts)
+    sig = np.full((n, num_perm), 0xFFFFFFFF, dtype=np.uint32)
+    a, b = _permutations(num_perm)
+    for lo in range(0, n, block_rows):
+        block = [t.encode("utf-8") for t in texts[lo:lo + block_rows]]
+        lengths = np.fromiter((len(t) for t in block), dtype=np.int64, count=len(block))
+        buf = np.frombuffer(b"".join(block), dtype=np.uint8).astype(np.uint64)
+        grams = np.maximum(lengths - shingle + 1, 0)
+        if not grams.sum():
+            continue
+        starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        # position of every shingle in buf, row by row
+        gram_offsets = np.arange(grams.sum()) - np.repeat(np.cumsum(grams) - grams, grams)
+        pos = np.repeat(starts, grams) + gram_offsets
+        h = np.zeros(len(pos), dtype=np.uint64)
+        for k in range(shingle):
+            h = h * np.uint64(257) + buf[pos + k]
+        has = grams > 0
+        first = np.concatenate(([0], np.cumsum(grams)[:-1]))[has]
+        for p in range(num_perm):
+            hp = ((a[p] * h + b[p]) >> np.uint64(32)) & _MASK32   # multiply-shift hash
+            sig[lo + np.flatnonzero(has), p] = np.minimum.reduceat(hp, first).astype(np.uint32)
+    return sig
+
+
+def choose_bands(num_perm: int, threshold: float):
+    """(bands, rows_per_band) whose LSH S-curve midpoint is closest to threshold."""
+    options = [(num_perm // r, r) for r in range(1, num_perm + 1) if num_perm % r == 0]
+    return min(options, key=lambda br: abs((1 / br[0]) ** (1 / br[1]) - threshold))
+
+
+# =========================
+# CLUSTERING
+# =========================
+def _find(parent, i):
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def cluster_signatures(sig: np.ndarray, threshold: float = 0.8):
+    """Union-find clusters of rows whose estimated Jaccard >= threshold.
+
+    Returns (labels, candidate_pairs) with labels[i] = smallest row in i's cluster."""
+    n, num_perm = sig.shape
+    bands, rows = choose_bands(num_perm, threshold)
+    valid = sig[:, 0] != 0xFFFFFFFF
+    parent = np.arange(n)
+    candidates = 0
+    for band in range(bands):
+        part = sig[:, band * rows:(band + 1) * rows].astype(np.uint64)
+        key = np.zeros(n, dtype=np.uint64)
+        for col in range(rows):
+            key = key * np.uint64(0x100000001B3) ^ part[:, col]
+        idx = np.flatnonzero(valid)
+        idx = idx[np.argsort(key[idx], kind="stable")]
+        k = key[idx]
+        # compare each bucket member against the bucket's first row (a star)
+        new_bucket = np.concatenate(([True], k[1:] != k[:-1]))
+        heads = idx[np.maximum.accumulate(np.where(new_bucket, np.arange(len(idx)), 0))]
+        members = idx[~new_bucket]
+        heads = heads[~new_bucket]
+        if not len(members):
+            continue
+        candidates += len(members)
+        similar = (sig[heads] == sig[members]).mean(axis=1) >= threshold
+        for h, m in zip(heads[similar].tolist(), members[similar].tolist()):
+            rh, rm = _find(parent, h), _find(parent, m)
+            if rh != rm:
+                parent[max(rh, rm)] = min(rh, rm)
+    # roots are always the smallest index, so pointer jumping flattens the forest
+    while True:
+        flat = parent[parent]
+        if np.array_equal(flat, parent):
+            return parent, candidates
+        parent = flat
+
+
+def find_near_duplicates(df: pd.DataFrame, columns=None, threshold: float = 0.8,
+                         num_perm: int = NUM_PERM, max_examples: int = 5) -> NearDuplicateResult:
+    """Detect near-duplicate rows of df over columns (default: all columns)."""
+    columns = list(columns) if columns else list(df.columns)
+    texts = _normalized_text(df, columns)
+    sig = minhash_signatures(texts.tolist(), num_perm)
+    labels, candidates = cluster_signatures(sig, threshold)
+
+    result = NearDuplicateResult(labels=labels, candidate_pairs=candidates)
+    if len(labels):
+        sizes = np.bincount(labels, minlength=len(labels))
+        multi = np.flatnonzero(sizes > 1)
+        result.clusters = len(multi)
+        result.rows_in_clusters = int(sizes[multi].sum())
+        for rep in multi[:max_examples]:
+            result.examples.append(texts.iloc[np.flatnonzero(labels == rep)[:5]].tolist())
+    return result
+
+
+# =========================
+# BENCHMARK
+# =========================
+def _synthetic_crm(rows: int, dup_rate: float = 0.1, seed: int = 0):
+    """Random contact rows plus dup_rate re-typed copies. Returns (df, injected)."""
+    rng = np.random.default_rng(seed)
+    letters = np.array(list("abcdefghijklmnopqrstuvwxyz"))
+
+    def words(length):
+        return pd.Series(["".join(w) for w in letters[rng.integers(0, 26, (rows, length))]])
+
+    cities = np.array(["Mumbai", "Delhi", "Pune", "Bengaluru", "Chennai", "Kolkata"])
+    df = pd.DataFrame({
+        "name": words(6).str.title() + " " + words(8).str.title(),
+        "email": words(10) + "@example.com",
+        "phone": pd.Series(rng.integers(6_000_000_000, 9_999_999_999, rows)).astype(str),
+        "city": cities[rng.integers(0, 6, rows)],
+    })
+    # near-duplicates: re-cased, extra spaces, a space in the email
+    n_dup = int(rows * dup_rate)
+    dups = df.iloc[rng.choice(rows, n_dup, replace=False)].copy()
+    dups["name"] = dups["name"].str.upper().str.replace(" ", "  ", n=1)
+    dups["email"] = dups["email"].str.replace("@", " @", n=1)
+    return pd.concat([df, dups], ignore_index=True), n_dup
+
+
+def benchmark(sizes=(100_000, 1_000_000), threshold: float = 0.8):
+    for rows in sizes:
+        df, injected = _synthetic_crm(rows)
+        start = time.perf_counter()
+        result = find_near_duplicates(df, threshold=threshold)
+        elapsed = time.perf_counter() - start
+        print(f"{len(df):>10,} rows | {elapsed:7.2f} s | {len(df) / elapsed:>10,.0f} rows/s | "
+              f"removable {int(result.duplicate_mask.sum()):,} of {injected:,} injected | "
+              f"clusters {result.clusters:,} | candidate pairs {result.candidate_pairs:,}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="MinHash/LSH near-duplicate benchmark")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--threshold", type=float, default=0.8)
+    args = parser.parse_args()
+    benchmark(args.rows, args.threshold)
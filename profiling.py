@@ -0,0 +1,159 @@
+"""
+Profiling – background, cached EDA reports for the Data Cleaner
+
+- Modes: "minimal" (fast) or "explorative" (full ydata-profiling report)
+- Frames above a row threshold are profiled on a random sample
+- Optional column subset
+- Reports are cached on disk by a content hash of the profiled frame, so
+  cleaning the same file again returns the report instantly
+- Generation runs on a background worker; ProfileJob exposes progress
+- Cache trimming never evicts a report still tracked as recent; if one
+  goes missing anyway, read() marks the job "expired" so the UI resubmits
+
+Imported lazily by J3.py (Data Cleaner mode only).
+"""
+
+import glob
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+CACHE_DIR = "eda_cache"
+MAX_CACHED_REPORTS = 20
+MAX_TRACKED_JOBS = 50
+LIVE_SECONDS = 3600       # finished reports this recent are kept past MAX_CACHED_REPORTS
+SAMPLE_THRESHOLD = 100_000
+MODES = ("minimal", "explorative")
+
+
+def frame_hash(df: pd.DataFrame) -> str:
+    h = hashlib.sha1()
+    h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    h.update("\0".join(f"{c}:{t}" for c, t in df.dtypes.astype(str).items()).encode("utf-8"))
+    return h.hexdigest()
+
+
+# =========================
+# JOB
+# =========================
+class ProfileJob:
+    def __init__(self, key: str, path: str, rows: int, sampled: bool, options: dict = None):
+        self.key = key
+        self.path = path
+        self.rows = rows
+        self.sampled = sampled
+        self.options = options or {}   # submit() arguments, to generate it again
+        self.status = "queued"     # queued -> running -> done / failed / expired
+        self.progress = 0.0
+        self.message = "Waiting for worker"
+        self.error = None
+        self.cached = False
+        self.started = time.time()
+        self.finished = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("done", "failed", "expired")
+
+    def _update(self, progress: float, message: str, status: str = "running"):
+        self.progress = progress
+        self.message = message
+        self.status = status
+
+    def read(self):
+        """The report bytes, or None if it has left the disk cache (the job
+        is then "expired" and submit() generates it again)."""
+        try:
+            with open(self.path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            self._update(self.progress, "Report expired from the cache", "expired")
+            return None
+
+
+# =========================
+# PROFILER
+# =========================
+class Profiler:
+    def __init__(self, cache_dir: str = CACHE_DIR, max_workers: int = 1):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="nexa-eda")
+        self._jobs = {}     # key -> running/finished ProfileJob
+        self._lock = threading.Lock()
+
+    def submit(self, df: pd.DataFrame, mode: str = "minimal", columns=None,
+               sample_threshold: int = SAMPLE_THRESHOLD) -> ProfileJob:
+        """Queue a report (or return the cached / in-flight one)."""
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {MODES}")
+        if columns:
+            df = df[list(columns)]
+        sampled = len(df) > sample_threshold
+        if sampled:
+            df = df.sample(sample_threshold, random_state=0)
+
+        key = f"{frame_hash(df)[:20]}_{mode}"
+        path = os.path.join(self.cache_dir, key + ".html")
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and job.status != "failed" and (not job.done or os.path.exists(path)):
+                return job
+            job = ProfileJob(key, path, len(df), sampled,
+                             {"mode": mode, "columns": columns, "sample_threshold": sample_threshold})
+            self._jobs[key] = job
+            while len(self._jobs) > MAX_TRACKED_JOBS:
+                del self._jobs[next(iter(self._jobs))]
+            if os.path.exists(path):
+                os.utime(path)   # keep recently used reports in the cache
+                job.cached = True
+                job.finished = time.time()
+                job._update(1.0, "Loaded from cache", "done")
+                return job
+        self._executor.submit(self._run, job, df, mode)
+        return job
+
+    def _run(self, job: ProfileJob, df: pd.DataFrame, mode: str):
+        try:
+            job._update(0.1, "Loading profiler")
+            from ydata_profiling import ProfileReport
+
+            job._update(0.2, f"Computing statistics on {job.rows:,} rows"
+                             + (" (sampled)" if job.sampled else ""))
+            report = ProfileReport(
+                df,
+                minimal=(mode == "minimal"),
+                explorative=(mode == "explorative"),
+                progress_bar=False,
+            )
+            report.get_description()
+
+            job._update(0.8, "Rendering HTML")
+            tmp = job.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(report.to_html())
+            os.replace(tmp, job.path)
+            self._trim_cache()
+            job._update(1.0, "Report ready", "done")
+        except Exception as e:
+            job.error = f"{type(e).__name__}: {e}"
+            job._update(job.progress, "Report failed", "failed")
+        job.finished = time.time()
+
+    def _trim_cache(self):
+        now = time.time()
+        with self._lock:
+            live = {os.path.abspath(job.path) for job in self._jobs.values()
+                    if not job.done or (job.status == "done" and now - (job.finished or now) < LIVE_SECONDS)}
+        reports = sorted(glob.glob(os.path.join(self.cache_dir, "*.html")), key=os.path.getmtime)
+        for path in reports[:-MAX_CACHED_REPORTS]:
+            if os.path.abspath(path) in live:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                pass
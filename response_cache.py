@@ -0,0 +1,169 @@
+"""
+Response Cache – persistent LLM response cache for get_code()
+
+Features:
+- In-memory LRU with TTL expiry and a size cap
+- Persisted to a JSON file so entries survive Streamlit restarts
+- Keys built from the normalized command text + a hash of the prompt context
+- Hit / miss / latency statistics for the UI
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+# =========================
+# DEFAULTS
+# =========================
+CACHE_FILE = "nexa_response_cache.json"
+MAX_ENTRIES = 500
+TTL_SECONDS = 7 * 24 * 3600  # one week
+
+
+# =========================
+# KEY HELPERS
+# =========================
+def normalize_command(text: str) -> str:
+    """Lowercase, collapse whitespace and drop trailing punctuation so that
+    "Open Downloads folder." and "open downloads  folder" share a key."""
+    t = (text or "").lower().strip()
+    t = re.sub(r"\s+", " ", t)
+    return t.strip(" .!?,;:")
+
+
+def context_hash(*parts: str) -> str:
+    h = hashlib.sha256()
+    for part in parts:
+        h.update((part or "").encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()[:16]
+
+
+def make_key(command: str, *context: str) -> str:
+    return f"{context_hash(*context)}:{normalize_command(command)}"
+
+
+# =========================
+# CACHE
+# =========================
+class ResponseCache:
+    def __init__(self, path: str = CACHE_FILE, max_entries: int = MAX_ENTRIES,
+                 ttl_seconds: float = TTL_SECONDS):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # key -> {"value", "created", "latency"}
+        self._lock = threading.Lock()
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "bypassed": 0,
+            "evictions": 0,
+            "hit_seconds": 0.0,
+            "miss_seconds": 0.0,
+            "saved_seconds": 0.0,
+        }
+        self._load()
+
+    # -------------------------
+    # PERSISTENCE
+    # -------------------------
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                raw = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return
+        now = time.time()
+        for key, entry in raw.get("entries", []):
+            if now - entry.get("created", 0) < self.ttl_seconds:
+                self._entries[key] = entry
+        self._trim()
+
+    def _save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"entries": list(self._entries.items())}, f)
+        os.replace(tmp, self.path)
+
+    def _trim(self):
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    # -------------------------
+    # LOOKUP / STORE
+    # -------------------------
+    def get(self, key: str):
+        start = time.perf_counter()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry["created"] >= self.ttl_seconds:
+                del self._entries[key]
+                self.stats["evictions"] += 1
+                entry = None
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            self.stats["hit_seconds"] += time.perf_counter() - start
+            self.stats["saved_seconds"] += entry.get("latency", 0.0)
+            return entry["value"]
+
+    def put(self, key: str, value: str, latency: float = 0.0):
+        with self._lock:
+            self._entries[key] = {"value": value, "created": time.time(), "latency": latency}
+            self._entries.move_to_end(key)
+            self.stats["miss_seconds"] += latency
+            self._trim()
+            self._save()
+
+    def get_or_compute(self, key: str, compute, bypass: bool = False):
+        """Return the cached value for key, calling compute() on a miss.
+
+        With bypass=True the cache is skipped for the lookup but the fresh
+        result still replaces the stored entry."""
+        if bypass:
+            self.record_bypass()
+        else:
+            cached = self.get(key)
+            if cached is not None:
+                return cached
+        start = time.perf_counter()
+        value = compute()
+        self.put(key, value, time.perf_counter() - start)
+        return value
+
+    def record_bypass(self):
+        with self._lock:
+            self.stats["bypassed"] += 1
+
+    def invalidate(self, key: str) -> bool:
+        with self._lock:
+            removed = self._entries.pop(key, None) is not None
+            if removed:
+                self._save()
+            return removed
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._save()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def summary(self) -> dict:
+        s = dict(self.stats)
+        lookups = s["hits"] + s["misses"]
+        s["entries"] = len(self._entries)
+        s["hit_rate"] = s["hits"] / lookups if lookups else 0.0
+        s["avg_hit_ms"] = 1000 * s["hit_seconds"] / s["hits"] if s["hits"] else 0.0
+        computed = s["misses"] + s["bypassed"]
+        s["avg_miss_ms"] = 1000 * s["miss_seconds"] / computed if computed else 0.0
+        return s
@@ -0,0 +1,333 @@
+"""
+Skip Ad Detector – fast "Skip Ad" button matching and a watch mode
+
+- Grayscale matching (one channel instead of three)
+- Coarse-to-fine: every template scale is matched on a downscaled screen,
+  then only the best candidates are refined at full resolution
+- Resized templates of skip_ad.png are cached (reloaded when the file changes)
+- The region around the last hit is searched first, at the last scale
+- SkipAdWatcher: background thread that grabs the screen within a frame-rate
+  budget and clicks the button when it appears
+
+Imported lazily by J3.py (needs opencv-python and numpy).
+
+Run directly for a benchmark on synthetic screenshots:
+    python skip_ad_detector.py --frames 20
+"""
+
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from command_queue import input_lock
+
+TEMPLATE_PATH = "skip_ad.png"
+SCALES = tuple(np.linspace(0.8, 1.2, 9))
+THRESHOLD = 0.55
+COARSE_SLACK = 0.15        # coarse scores are noisier; refine anything this close
+REFINE_CANDIDATES = 3
+MIN_COARSE_SIDE = 12       # px; picks the largest pyramid factor that keeps this
+
+
+class Match:
+    def __init__(self, x: int, y: int, w: int, h: int, score: float, scale: float, stage: str):
+        self.x, self.y, self.w, self.h = x, y, w, h
+        self.score = score
+        self.scale = scale
+        self.stage = stage          # "roi" or "pyramid"
+
+    @property
+    def center(self):
+        return self.x + self.w // 2, self.y + self.h // 2
+
+    def __repr__(self):
+        return f"Match(({self.x}, {self.y}) {self.w}x{self.h}, score={self.score:.2f}, scale={self.scale:.2f}, {self.stage})"
+
+
+def to_gray(image) -> np.ndarray:
+    """PIL image or RGB/RGBA/gray array -> uint8 grayscale array."""
+    arr = np.asarray(image)
+    if arr.ndim == 2:
+        return arr
+    code = cv2.COLOR_RGBA2GRAY if arr.shape[2] == 4 else cv2.COLOR_RGB2GRAY
+    return cv2.cvtColor(arr, code)
+
+
+def grab_screen() -> np.ndarray:
+    import pyautogui
+    return to_gray(pyautogui.screenshot())
+
+
+# =========================
+# DETECTOR
+# =========================
+class SkipAdDetector:
+    def __init__(self, template_path: str = TEMPLATE_PATH, scales=SCALES, threshold: float = THRESHOLD,
+                 roi_margin: float = 1.5):
+        self.template_path = template_path
+        self.scales = tuple(scales)
+        self.threshold = threshold
+        self.roi_margin = roi_margin
+        self.last = None               # last Match, for the ROI pass
+        self._templates = None         # [(scale, full-res template, coarse template)]
+        self._factor = 1
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    # -------------------------
+    # Templates
+    # -------------------------
+    def _load(self):
+        mtime = os.path.getmtime(self.template_path)
+        if self._templates is not None and mtime == self._mtime:
+            return
+        tpl = cv2.imread(self.template_path, cv2.IMREAD_GRAYSCALE)
+        if tpl is None:
+            raise FileNotFoundError(self.template_path)
+        self.set_template(tpl)
+        self._mtime = mtime
+
+    def set_template(self, tpl: np.ndarray):
+        """Use a grayscale array as the template (instead of template_path)."""
+        th, tw = tpl.shape[:2]
+        smallest = min(th, tw) * min(self.scales)
+        self._factor = next((f for f in (4, 2) if smallest / f >= MIN_COARSE_SIDE), 1)
+        templates = []
+        for scale in self.scales:
+            w, h = max(1, round(tw * scale)), max(1, round(th * scale))
+            if min(w, h) < 5:
+                continue
+            full = cv2.resize(tpl, (w, h), interpolation=cv2.INTER_AREA)
+            coarse = cv2.resize(full, (max(1, w // self._factor), max(1, h // self._factor)),
+                                interpolation=cv2.INTER_AREA)
+            templates.append((scale, full, coarse))
+        self._templates = templates
+        self._mtime = None
+        self.last = None
+
+    # -------------------------
+    # Matching
+    # -------------------------
+    @staticmethod
+    def _best(image, tpl):
+        if image.shape[0] < tpl.shape[0] or image.shape[1] < tpl.shape[1]:
+            return -1.0, (0, 0)
+        _, score, _, loc = cv2.minMaxLoc(cv2.matchTemplate(image, tpl, cv2.TM_CCOEFF_NORMED))
+        return score, loc
+
+    def _match_window(self, screen, x0, y0, x1, y1, tpl):
+        h, w = screen.shape[:2]
+        x0, y0, x1, y1 = max(0, x0), max(0, y0), min(w, x1), min(h, y1)
+        score, (x, y) = self._best(screen[y0:y1, x0:x1], tpl)
+        return score, x0 + x, y0 + y
+
+    def _roi_pass(self, screen):
+        last = self.last
+        entry = next((t for t in self._templates if t[0] == last.scale), None)
+        if entry is None:
+            return None
+        _, full, _ = entry
+        th, tw = full.shape
+        mx, my = int(tw * self.roi_margin), int(th * self.roi_margin)
+        score, x, y = self._match_window(screen, last.x - mx, last.y - my, last.x + tw + mx, last.y + th + my, full)
+        if score >= self.threshold:
+            return Match(x, y, tw, th, score, last.scale, "roi")
+        return None
+
+    def _pyramid_pass(self, screen):
+        f = self._factor
+        small = cv2.resize(screen, (screen.shape[1] // f, screen.shape[0] // f), interpolation=cv2.INTER_AREA) if f > 1 else screen
+        candidates = []
+        for i, (scale, _, coarse) in enumerate(self._templates):
+            score, (x, y) = self._best(small, coarse)
+            if score >= self.threshold - COARSE_SLACK:
+                candidates.append((score, i, x * f, y * f))
+        candidates.sort(reverse=True)
+
+        best = None
+        for _, i, x, y in candidates[:REFINE_CANDIDATES]:
+            # refine at this scale and its neighbours, in a window of a few coarse pixels
+            for j in range(max(0, i - 1), min(len(self._templates), i + 2)):
+                scale, full, _ = self._templates[j]
+                th, tw = full.shape
+                pad = 2 * f
+                score, rx, ry = self._match_window(screen, x - pad, y - pad, x + tw + pad, y + th + pad, full)
+                if best is None or score > best.score:
+                    best = Match(rx, ry, tw, th, score, scale, "pyramid")
+        return best if best is not None and best.score >= self.threshold else None
+
+    def detect(self, screen) -> Match:
+        """Find the Skip Ad button in a screenshot (PIL image or array). None if absent."""
+        with self._lock:
+            if self._templates is None or self._mtime is not None:
+                self._load()
+            screen = to_gray(screen)
+            match = self._roi_pass(screen) if self.last is not None else None
+            if match is None:
+                match = self._pyramid_pass(screen)
+            self.last = match or self.last
+            return match
+
+
+def detect_exhaustive(screen_rgb, template_bgr, scales=SCALES, threshold: float = THRESHOLD):
+    """The previous J3 auto-detect: full-resolution BGR, every scale, whole screen."""
+    screen = cv2.cvtColor(np.asarray(screen_rgb), cv2.COLOR_RGB2BGR)
+    th, tw = template_bgr.shape[:2]
+    best = None
+    for scale in scales:
+        tpl = cv2.resize(template_bgr, (int(tw * scale), int(th * scale)), interpolation=cv2.INTER_AREA)
+        _, score, _, (x, y) = cv2.minMaxLoc(cv2.matchTemplate(screen, tpl, cv2.TM_CCOEFF_NORMED))
+        if best is None or score > best.score:
+            best = Match(x, y, tpl.shape[1], tpl.shape[0], score, scale, "exhaustive")
+    return best if best.score >= threshold else None
+
+
+# =========================
+# WATCH MODE
+# =========================
+class SkipAdWatcher:
+    def __init__(self, detector: SkipAdDetector = None, fps: float = 2.0, click: bool = True,
+                 click_cooldown: float = 2.0, grab=grab_screen, clicker=None):
+        self.detector = detector or SkipAdDetector()
+        self.fps = fps
+        self.click = click
+        self.click_cooldown = click_cooldown
+        self.grab = grab
+        self.clicker = clicker
+        self.stats = {"frames": 0, "hits": 0, "clicks": 0, "clicks_deferred": 0, "detect_ms": 0.0,
+                      "last_hit": None, "last_error": None}
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if not self.running:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="nexa-skip-ad", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+
+    def _click(self, x, y) -> bool:
+        """Click unless an automation holds the input lock (then the next
+        frame tries again). Returns True if it clicked."""
+        if not input_lock.acquire(timeout=0):
+            return False
+        try:
+            if self.clicker:
+                self.clicker(x, y)
+            else:
+                import pyautogui
+                pyautogui.click(x, y)
+        finally:
+            input_lock.release()
+        return True
+
+    def _run(self):
+        next_click = 0.0
+        while not self._stop.is_set():
+            started = time.perf_counter()
+            try:
+                match = self.detector.detect(self.grab())
+                elapsed = time.perf_counter() - started
+                s = self.stats
+                s["frames"] += 1
+                s["detect_ms"] += (1000 * elapsed - s["detect_ms"]) / min(s["frames"], 20)   # moving average
+                if match is not None:
+                    s["hits"] += 1
+                    s["last_hit"] = match
+                    if self.click and time.monotonic() >= next_click:
+                        if self._click(*match.center):
+                            s["clicks"] += 1
+                            next_click = time.monotonic() + self.click_cooldown
+                        else:
+                            s["clicks_deferred"] += 1
+            except Exception as e:
+                self.stats["last_error"] = f"{type(e).__name__}: {e}"
+            # frame-rate budget: sleep whatever is left of this frame's slot
+            self._stop.wait(max(0.0, 1 / self.fps - (time.perf_counter() - started)))
+
+
+# =========================
+# BENCHMARK
+# =========================
+def _synthetic_template() -> np.ndarray:
+    tpl = np.full((50, 80, 3), 30, dtype=np.uint8)
+    cv2.rectangle(tpl, (1, 1), (78, 48), (220, 220, 220), 2)
+    cv2.putText(tpl, "Skip", (8, 32), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+    cv2.arrowedLine(tpl, (60, 25), (72, 25), (255, 255, 255), 2, tipLength=0.5)
+    return tpl
+
+
+def _synthetic_screen(rng, template, scale: float, at, size=(1080, 1920)):
+    h, w = size
+    screen = np.zeros((h, w, 3), dtype=np.uint8)
+    screen[:] = np.linspace(40, 90, w, dtype=np.uint8)[None, :, None]     # video-ish gradient
+    for _ in range(40):                                                    # page clutter
+        x, y = rng.integers(0, w - 200), rng.integers(0, h - 60)
+        colour = tuple(int(c) for c in rng.integers(0, 255, 3))
+        cv2.rectangle(screen, (x, y), (x + rng.integers(40, 200), y + rng.integers(10, 60)), colour, -1)
+        cv2.putText(screen, "Subscribe", (x, y + 25), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (250, 250, 250), 1)
+    screen = np.clip(screen + rng.normal(0, 6, screen.shape), 0, 255).astype(np.uint8)
+    if at is not None:
+        tpl = cv2.resize(template, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        x, y = at
+        screen[y:y + tpl.shape[0], x:x + tpl.shape[1]] = cv2.cvtColor(tpl, cv2.COLOR_BGR2RGB)
+    return screen
+
+
+def benchmark(frames: int = 20, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    template = _synthetic_template()
+    # ad button stays in place across frames (same ad), a few frames have no ad
+    pos, scale = (1650, 880), 1.1
+    screens = [_synthetic_screen(rng, template, scale, None if i % 5 == 4 else pos) for i in range(frames)]
+
+    start = time.perf_counter()
+    old = [detect_exhaustive(s, template) for s in screens]
+    old_ms = 1000 * (time.perf_counter() - start) / frames
+
+    detector = SkipAdDetector()
+    detector.set_template(cv2.cvtColor(template, cv2.COLOR_BGR2GRAY))
+    cold_start = time.perf_counter()
+    first = detector.detect(screens[0])
+    cold_ms = 1000 * (time.perf_counter() - cold_start)
+    start = time.perf_counter()
+    new = [detector.detect(s) for s in screens[1:]]
+    new_ms = 1000 * (time.perf_counter() - start) / (frames - 1)
+    new = [first] + new
+
+    def correct(matches):
+        ok = 0
+        for i, m in enumerate(matches):
+            present = i % 5 != 4
+            ok += (m is not None and abs(m.x - pos[0]) <= 3 and abs(m.y - pos[1]) <= 3) if present else (m is None)
+        return ok
+
+    print(f"{frames} synthetic 1920x1080 screenshots, button at {pos} scale {scale}")
+    print(f"  exhaustive BGR, 9 scales : {old_ms:7.1f} ms/frame, {correct(old)}/{frames} correct")
+    print(f"  pyramid (first frame)    : {cold_ms:7.1f} ms")
+    print(f"  with ROI tracking        : {new_ms:7.1f} ms/frame, {correct(new)}/{frames} correct")
+    stages = {}
+    for m in new:
+        if m is not None:
+            stages[m.stage] = stages.get(m.stage, 0) + 1
+    print(f"  hits by stage            : {stages}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Skip Ad detector benchmark")
+    parser.add_argument("--frames", type=int, default=20)
+    args = parser.parse_args()
+    benchmark(args.frames)
@@ -0,0 +1,80 @@
+"""
+Startup / rerun benchmark for J3.py
+
+Measures, in fresh interpreters, what the eager imports at the top of the
+old J3.py cost versus what each mode imports now, plus the per-rerun cost
+of re-reading the prompt files with and without file_cache.
+
+    python startup_benchmark.py
+"""
+
+import subprocess
+import sys
+import time
+
+import file_cache
+
+# Imported at the top of J3.py before lazy loading
+EAGER = ["streamlit", "speech_recognition", "pandas", "groq", "ydata_profiling", "PIL.ImageGrab"]
+
+# What each mode needs now
+MODES = {
+    "AI Automation (first run)": ["streamlit", "groq"],
+    "Data Cleaner (first run)": ["streamlit", "pandas", "ydata_profiling"],
+    "Any mode (rerun)": [],   # everything already cached in the process
+}
+
+FILES = ["Refrence Codes for JARVIS.txt", "JARVIS_db.txt"]
+
+
+def import_seconds(modules) -> float:
+    """Wall time to import modules in a fresh interpreter (None if missing)."""
+    if not modules:
+        return 0.0
+    code = "import time, importlib; t = time.perf_counter()\n"
+    code += "".join(f"importlib.import_module({m!r})\n" for m in modules)
+    code += "print(time.perf_counter() - t)"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    if result.returncode != 0:
+        return None
+    return float(result.stdout.strip())
+
+
+def file_read_ms(reruns: int = 200):
+    start = time.perf_counter()
+    for _ in range(reruns):
+        for path in FILES:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    f.read()
+            except FileNotFoundError:
+                pass
+    uncached = 1000 * (time.perf_counter() - start) / reruns
+
+    file_cache.invalidate()
+    start = time.perf_counter()
+    for _ in range(reruns):
+        for path in FILES:
+            file_cache.read_text(path)
+    cached = 1000 * (time.perf_counter() - start) / reruns
+    return uncached, cached
+
+
+def main():
+    print("Per-module import time (fresh interpreter):")
+    for m in EAGER:
+        t = import_seconds([m])
+        print(f"  {m:<20} {'not installed' if t is None else f'{t:.2f} s'}")
+
+    eager = import_seconds(EAGER)
+    print(f"\nOld J3.py top-level imports: {'n/a (missing packages)' if eager is None else f'{eager:.2f} s'}")
+    for mode, modules in MODES.items():
+        t = import_seconds(modules)
+        print(f"{mode:<28} {'n/a (missing packages)' if t is None else f'{t:.2f} s'}")
+
+    uncached, cached = file_read_ms()
+    print(f"\nPrompt files per rerun: {uncached:.3f} ms uncached, {cached:.3f} ms with file_cache")
+
+
+if __name__ == "__main__":
+    main()
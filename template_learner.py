@@ -0,0 +1,281 @@
+"""
+Template Learner – turn repeated LLM automations into local intents
+
+When the LLM generates the same script for commands that only differ in a
+contact, song or app name (like the {Contact Name} / {Song Name} slots in
+the reference codes), those string literals are abstracted into slots:
+
+    "send hi to aman on whatsapp"   -> typewrite('aman') ... typewrite('hi')
+    "send yo to priya on whatsapp"  -> typewrite('priya') ... typewrite('yo')
+    => template "send {0} to {1} on whatsapp"
+
+Once a template has been seen MIN_SUPPORT times with different slot values
+it is proposed; after the user confirms it once, matching commands are
+rendered locally with no LLM call. Slot values keep the case they were
+typed in. A template the user turns down is remembered and not proposed
+again.
+"""
+
+import ast
+import atexit
+import io
+import json
+import os
+import re
+import threading
+import time
+import tokenize
+
+TEMPLATE_FILE = "nexa_templates.json"
+MIN_SUPPORT = 3          # distinct observations before a template is proposed
+SAVE_INTERVAL = 5.0      # seconds between writes for hit / observation counts
+MAX_TEMPLATES = 500
+MAX_CANDIDATES = 2000
+_SLOT = "__NEXA_SLOT_{}__"
+
+
+def collapse_command(text: str) -> str:
+    return " ".join((text or "").split()).strip(" .!?")
+
+
+def normalize_command(text: str) -> str:
+    return collapse_command(text).lower()
+
+
+# =========================
+# ABSTRACTION
+# =========================
+def _string_literals(code: str):
+    """Yield (start_offset, end_offset, value) for plain string literals."""
+    line_starts = [0]
+    for line in code.splitlines(keepends=True):
+        line_starts.append(line_starts[-1] + len(line))
+    try:
+        tokens = list(tokenize.generate_tokens(io.StringIO(code).readline))
+    except (tokenize.TokenError, IndentationError, SyntaxError):
+        return
+    for tok in tokens:
+        if tok.type != tokenize.STRING or re.match(r"^[a-zA-Z]*[fF]", tok.string):
+            continue
+        try:
+            value = ast.literal_eval(tok.string)
+        except (ValueError, SyntaxError):
+            continue
+        if isinstance(value, str) and value.strip():
+            start = line_starts[tok.start[0] - 1] + tok.start[1]
+            end = line_starts[tok.end[0] - 1] + tok.end[1]
+            yield start, end, value
+
+
+def abstract(command: str, code: str):
+    """Replace code literals that also appear (as whole words) in the command
+    with numbered slots. Returns (command_skeleton, code_skeleton, values) or
+    None if nothing could be abstracted."""
+    cmd = normalize_command(command)
+    literals = list(_string_literals(code))
+    values, spans = [], []
+    # Longest values first so "aman sharma" wins over "aman"
+    for value in sorted({v.strip().lower() for _, _, v in literals}, key=len, reverse=True):
+        m = re.search(r"(?<!\w)" + re.escape(value) + r"(?!\w)", cmd)
+        if not m or any(m.start() < e and s < m.end() for s, e in spans):
+            continue
+        spans.append((m.start(), m.end()))
+        values.append(value)
+    if not values:
+        return None
+
+    # Slot numbers follow their order in the command
+    order = sorted(range(len(values)), key=lambda i: spans[i][0])
+    values = [values[i] for i in order]
+    spans = [spans[i] for i in order]
+
+    cmd_skel, last = "", 0
+    for idx, (s, e) in enumerate(spans):
+        cmd_skel += cmd[last:s] + "{" + str(idx) + "}"
+        last = e
+    cmd_skel += cmd[last:]
+
+    code_skel, last = "", 0
+    for s, e, value in literals:
+        v = value.strip().lower()
+        code_skel += code[last:s]
+        code_skel += _SLOT.format(values.index(v)) if v in values else code[s:e]
+        last = e
+    code_skel += code[last:]
+    return cmd_skel, code_skel, values
+
+
+# =========================
+# LEARNER
+# =========================
+class TemplateLearner:
+    def __init__(self, path: str = TEMPLATE_FILE, min_support: int = MIN_SUPPORT):
+        self.path = path
+        self.min_support = min_support
+        self._lock = threading.RLock()    # _save() takes it too; callers may already hold it
+        self.candidates = {}   # "cmd_skel\0code_skel" -> {"observations": [values, ...]}
+        self.templates = []    # [{"command", "code", "slots", "hits", "confirmed", "declined"}]
+        self._compiled = []
+        self.stats = {"served": 0, "lookups": 0, "lookup_seconds": 0.0, "saved_seconds": 0.0}
+        self._saved_at = 0.0
+        self._dirty = False
+        self._load()
+        atexit.register(self.flush)
+
+    # -------------------------
+    # PERSISTENCE
+    # -------------------------
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                raw = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return
+        self.candidates = raw.get("candidates", {})
+        self.templates = raw.get("templates", [])
+        self.stats.update(raw.get("stats", {}))
+        self._compiled = [self._compile(t) for t in self.templates]
+
+    def _save(self, force: bool = False):
+        """Write the file; counter-only changes are batched SAVE_INTERVAL apart.
+        Serialized and written through a temp file, so concurrent sessions
+        never interleave writes and a crash never leaves a truncated file."""
+        with self._lock:
+            self._dirty = True
+            if not force and time.monotonic() - self._saved_at < SAVE_INTERVAL:
+                return
+            self._dirty = False
+            self._saved_at = time.monotonic()
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"candidates": self.candidates, "templates": self.templates,
+                           "stats": self.stats}, f)
+            os.replace(tmp, self.path)
+
+    @staticmethod
+    def _compile(template):
+        parts = re.split(r"\{(\d+)\}", template["command"])
+        pattern = ""
+        for i, part in enumerate(parts):
+            pattern += re.escape(part) if i % 2 == 0 else f"(?P<s{part}>.+?)"
+        return re.compile(pattern + r"$", re.IGNORECASE)
+
+    # -------------------------
+    # LEARN
+    # -------------------------
+    def observe(self, command: str, code: str) -> bool:
+        """Record an LLM-generated script. Returns True if a new template was
+        promoted."""
+        result = abstract(command, code)
+        if result is None:
+            return False
+        cmd_skel, code_skel, values = result
+        key = cmd_skel + "\0" + code_skel
+        with self._lock:
+            entry = self.candidates.setdefault(key, {"observations": []})
+            while len(self.candidates) > MAX_CANDIDATES:
+                del self.candidates[next(iter(self.candidates))]
+            if values not in entry["observations"]:
+                entry["observations"].append(values)
+            promoted = False
+            if len(entry["observations"]) >= self.min_support and len(self.templates) < MAX_TEMPLATES:
+                template = self._promote(cmd_skel, code_skel, entry["observations"])
+                if template and template["command"] not in {t["command"] for t in self.templates}:
+                    self.templates.append(template)
+                    self._compiled.append(self._compile(template))
+                    promoted = True
+            self._save(force=promoted)
+            return promoted
+
+    @staticmethod
+    def _promote(cmd_skel, code_skel, observations):
+        """Keep only slots whose value varied; inline the constant ones."""
+        varying = [i for i in range(len(observations[0]))
+                   if len({obs[i] for obs in observations}) > 1]
+        if not varying:
+            return None
+        renumber = {old: new for new, old in enumerate(varying)}
+        command, code = cmd_skel, code_skel
+        for i, value in enumerate(observations[0]):
+            if i in renumber:
+                command = command.replace("{" + str(i) + "}", "{" + str(renumber[i]) + "}")
+                code = code.replace(_SLOT.format(i), "\0" + str(renumber[i]) + "\0")
+            else:
+                command = command.replace("{" + str(i) + "}", value)
+                code = code.replace(_SLOT.format(i), repr(value))
+        code = re.sub(r"\0(\d+)\0", lambda m: _SLOT.format(m.group(1)), code)
+        return {"command": command, "code": code, "slots": len(varying), "hits": 0, "confirmed": False}
+
+    # -------------------------
+    # SERVE
+    # -------------------------
+    def match(self, command: str):
+        """Return (template, locally rendered code) for command, or None."""
+        cmd = collapse_command(command)     # case kept: slots are typed as given
+        for template, pattern in zip(self.templates, self._compiled):
+            m = pattern.match(cmd)
+            if not m:
+                continue
+            code = template["code"]
+            for i in range(template["slots"]):
+                code = code.replace(_SLOT.format(i), repr(m.group(f"s{i}")))
+            return template, code
+        return None
+
+    def serve(self, command: str, llm_seconds_estimate: float = 0.0):
+        """match() plus bookkeeping: returns code from a confirmed template or None."""
+        start = time.perf_counter()
+        found = self.match(command)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.stats["lookups"] += 1
+            self.stats["lookup_seconds"] += elapsed
+            if found is None or not found[0].get("confirmed"):
+                return None
+            template, code = found
+            template["hits"] += 1
+            self.stats["served"] += 1
+            self.stats["saved_seconds"] += max(0.0, llm_seconds_estimate - elapsed)
+            self._save()
+        return code
+
+    def proposal(self, command: str):
+        """(template, code) if an unconfirmed, not declined template matches,
+        else None."""
+        found = self.match(command)
+        if found is None or found[0].get("confirmed") or found[0].get("declined"):
+            return None
+        return found
+
+    def confirm(self, template_command: str) -> bool:
+        """Trust a proposed template: later matches are served without asking."""
+        with self._lock:
+            for template in self.templates:
+                if template["command"] == template_command:
+                    template["confirmed"] = True
+                    template["declined"] = False
+                    self._save(force=True)
+                    return True
+        return False
+
+    def decline(self, template_command: str) -> bool:
+        """The user chose the LLM over a proposed template: stop proposing it."""
+        with self._lock:
+            for template in self.templates:
+                if template["command"] == template_command:
+                    template["declined"] = True
+                    self._save(force=True)
+                    return True
+        return False
+
+    def flush(self):
+        with self._lock:
+            if self._dirty:
+                self._save(force=True)
+
+    def summary(self) -> dict:
+        s = dict(self.stats)
+        s["templates"] = len(self.templates)
+        s["avg_lookup_ms"] = 1000 * s["lookup_seconds"] / s["lookups"] if s["lookups"] else 0.0
+        s["avg_saved_seconds"] = s["saved_seconds"] / s["served"] if s["served"] else 0.0
+        return s
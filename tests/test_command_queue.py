@@ -0,0 +1,149 @@
+import json
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from command_queue import CommandQueue, InputLock
+
+
+@pytest.fixture
+def make_queue(tmp_path):
+    queues = []
+
+    def make(prepare, execute, **kwargs):
+        q = CommandQueue(prepare, execute, path=str(tmp_path / "jobs.db"),
+                         lock=InputLock(str(tmp_path / "input.lock")), **kwargs)
+        queues.append(q)
+        return q
+
+    yield make
+    for q in queues:
+        q.shutdown()
+
+
+def statuses(q):
+    return {job["command"]: job["status"] for job in q.recent()}
+
+
+def test_jobs_run_in_submission_order(make_queue):
+    ran = []
+
+    def prepare(command):
+        time.sleep({"slow": 0.3, "medium": 0.15}.get(command, 0.0))    # later jobs prepare first
+        return {"command": command}
+
+    q = make_queue(prepare, lambda command, payload, cancelled: ran.append(command) or "ok")
+    q.submit_batch(["slow", "medium", "fast", ""])
+    assert q.wait_idle(5)
+    assert ran == ["slow", "medium", "fast"]
+    assert set(statuses(q).values()) == {"done"}
+
+
+def test_prepare_and_execute_failures_are_recorded(make_queue):
+    def prepare(command):
+        if command == "bad prepare":
+            raise ValueError("no plan")
+        return {}
+
+    def execute(command, payload, cancelled):
+        if command == "bad run":
+            raise RuntimeError("boom")
+        return "ok"
+
+    q = make_queue(prepare, execute)
+    q.submit_batch(["bad prepare", "bad run", "good"])
+    assert q.wait_idle(5)
+    jobs = {job["command"]: job for job in q.recent()}
+    assert jobs["bad prepare"]["status"] == "failed" and "no plan" in jobs["bad prepare"]["error"]
+    assert jobs["bad run"]["status"] == "failed" and "boom" in jobs["bad run"]["error"]
+    assert jobs["good"]["status"] == "done"
+
+
+def test_cancel_queued_and_running_jobs(make_queue):
+    started = threading.Event()
+    ran = []
+
+    def execute(command, payload, cancelled):
+        ran.append(command)
+        if command == "long":
+            started.set()
+            cancelled.wait(5)
+        return "stopped" if cancelled.is_set() else "ok"
+
+    q = make_queue(lambda command: {}, execute)
+    long_id, waiting_id = q.submit_batch(["long", "waiting"])
+    assert started.wait(5)
+    assert q.cancel(waiting_id)
+    assert q.cancel(long_id)
+    assert q.wait_idle(5)
+    assert ran == ["long"]
+    assert statuses(q)["waiting"] == "cancelled"
+    assert not q.cancel(waiting_id)      # already finished
+
+
+def test_cancel_while_waiting_for_the_input_lock(make_queue, tmp_path):
+    ran = []
+    other = InputLock(str(tmp_path / "input.lock"))    # e.g. assistant.py typing
+    assert other.acquire(timeout=1)
+    q = make_queue(lambda command: {}, lambda command, payload, cancelled: ran.append(command))
+    job_id = q.submit("type something")
+    time.sleep(0.3)
+    q.cancel(job_id)
+    other.release()
+    assert q.wait_idle(5)
+    assert ran == []
+    assert statuses(q)["type something"] == "cancelled"
+
+
+def test_scheduler_survives_a_corrupt_job(make_queue):
+    q = make_queue(lambda command: {}, lambda command, payload, cancelled: "ok")
+    with q._conn:
+        q._conn.execute("INSERT INTO jobs (command, source, status, payload, created) "
+                        "VALUES ('corrupt', 'ui', 'ready', '{not json', ?)", (time.time(),))
+    q.submit("after", payload={}, prepared=True)
+    assert q.wait_idle(5)
+    assert statuses(q) == {"corrupt": "failed", "after": "done"}
+
+
+def test_restart_recovers_unfinished_jobs(make_queue, tmp_path):
+    path = tmp_path / "jobs.db"
+    now = time.time()
+    conn = sqlite3.connect(str(path))
+    conn.executescript("""
+        CREATE TABLE jobs (id INTEGER PRIMARY KEY AUTOINCREMENT, command TEXT NOT NULL,
+            source TEXT NOT NULL, status TEXT NOT NULL, payload TEXT, output TEXT, error TEXT,
+            created REAL NOT NULL, prepared REAL, started REAL, finished REAL);
+    """)
+    conn.executemany("INSERT INTO jobs (command, source, status, payload, created) VALUES (?, 'ui', ?, ?, ?)", [
+        ("was running", "running", json.dumps({}), now),
+        ("was preparing", "preparing", None, now),
+        ("was queued", "queued", None, now),
+        ("was ready", "ready", json.dumps({}), now),
+        ("stale ready", "ready", json.dumps({}), now - 3600),
+        ("stale queued", "queued", None, now - 3600),
+    ])
+    conn.commit()
+    conn.close()
+
+    ran = []
+    q = make_queue(lambda command: {}, lambda command, payload, cancelled: ran.append(command) or "ok")
+    assert q.wait_idle(5)
+    jobs = {job["command"]: job for job in q.recent()}
+    assert jobs["was running"]["status"] == "failed"
+    assert jobs["was running"]["error"] == "Interrupted by restart"
+    assert ran == ["was preparing", "was queued", "was ready"]
+    assert jobs["stale ready"]["status"] == jobs["stale queued"]["status"] == "cancelled"
+
+
+def test_job_cancelled_after_being_picked_does_not_run(make_queue):
+    ran = []
+    q = make_queue(lambda command: {}, lambda command, payload, cancelled: ran.append(command) or "ok")
+    # _next_job() read the row as 'ready', then cancel() won before _run() claimed it
+    with q._conn:
+        job_id = q._conn.execute("INSERT INTO jobs (command, source, status, payload, created) "
+                                 "VALUES ('late cancel', 'ui', 'cancelled', '{}', ?)", (time.time(),)).lastrowid
+    q._run(job_id, "late cancel", "ready", "{}")
+    assert ran == []
+    assert statuses(q)["late cancel"] == "cancelled"
@@ -0,0 +1,46 @@
+import json
+import threading
+import time
+
+from dependency_resolver import DependencyResolver, extract_imports
+
+CODE = "import os\nimport nexa_missing_pkg\nfrom nexa_other_pkg.sub import x\n"
+
+
+def test_only_third_party_imports_are_missing(tmp_path):
+    resolver = DependencyResolver(str(tmp_path / "failures.json"))
+    assert {"os", "nexa_missing_pkg", "nexa_other_pkg"} <= set(extract_imports(CODE))
+    assert set(resolver.missing(CODE)) == {"nexa_missing_pkg", "nexa_other_pkg"}
+
+
+def test_concurrent_ensure_installs_once(tmp_path, monkeypatch):
+    resolver = DependencyResolver(str(tmp_path / "failures.json"))
+    calls = []
+    installed = set()
+
+    def pip(dists):
+        calls.append(list(dists))
+        time.sleep(0.1)
+        installed.update(dists)
+        return True
+
+    monkeypatch.setattr(resolver, "_pip", pip)
+    # After the first install the packages count as present
+    monkeypatch.setattr(resolver, "missing", lambda code: {n: n for n in ("a", "b") if n not in installed})
+    threads = [threading.Thread(target=resolver.ensure, args=(CODE,)) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert calls == [["a", "b"]]
+
+
+def test_failures_are_remembered_in_valid_json(tmp_path, monkeypatch):
+    path = tmp_path / "failures.json"
+    resolver = DependencyResolver(str(path))
+    monkeypatch.setattr(resolver, "_pip", lambda dists: False)
+    report = resolver.ensure(CODE)
+    assert sorted(report["failed"]) == ["nexa_missing_pkg", "nexa_other_pkg"]
+    assert set(json.loads(path.read_text())) == {"nexa_missing_pkg", "nexa_other_pkg"}
+    assert not (tmp_path / "failures.json.tmp").exists()
+    assert sorted(DependencyResolver(str(path)).ensure(CODE)["skipped"]) == ["nexa_missing_pkg", "nexa_other_pkg"]
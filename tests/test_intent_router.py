@@ -0,0 +1,44 @@
+from intent_router import IntentRouter, router
+
+
+def names(text):
+    return [m.name for m in router.candidates(text)]
+
+
+def test_most_specific_intent_first():
+    assert names("play lofi beats on youtube") == ["youtube_play", "play_song"]
+    assert names("open youtube") == ["open_youtube", "open_app"]
+    assert names("play next song believer")[0] == "play_next"
+
+
+def test_slots_are_extracted_from_normalized_text():
+    first = next(router.candidates("Play  Lofi Beats on YouTube"))
+    assert first.slots == {"song": "lofi beats"}
+    message = next(router.candidates("send good morning to aman on whatsapp"))
+    assert message.name == "whatsapp_message"
+    assert message.slots == {"message": "good morning", "contact": "aman"}
+
+
+def test_phrases_match_on_word_boundaries_only():
+    assert names("muted") == []
+    assert names("unmute") == ["unmute"]
+    assert names("hello there") == []
+
+
+def test_every_group_must_match():
+    custom = IntentRouter([{"name": "report", "all_of": [("send",), ("report",)]}])
+    assert [m.name for m in custom.candidates("send the report")] == ["report"]
+    assert list(custom.candidates("send a message")) == []
+
+
+def test_dispatch_falls_through_declined_handlers():
+    calls = []
+
+    def decline(m):
+        calls.append(m.name)
+        return False
+
+    handlers = {"youtube_play": decline, "play_song": lambda m: calls.append(m.name) or True}
+    assert router.dispatch("play believer on youtube", handlers)
+    assert calls == ["youtube_play", "play_song"]
+    assert not router.dispatch("hello there", handlers)
@@ -0,0 +1,97 @@
+import time
+
+import pytest
+
+import memory_store
+from memory_store import MemoryStore, split_summaries
+
+
+@pytest.fixture
+def store(tmp_path):
+    s = MemoryStore(str(tmp_path / "memory.db"))
+    yield s
+    s.close()
+
+
+def test_exact_and_near_duplicates_are_rejected(store):
+    text = "The user wants to send a good morning message to Aman on WhatsApp every day."
+    assert store.append(text) is not None
+    assert store.append(text) is None
+    assert store.append(text.upper() + "!!") is None                   # same normalized text
+    assert store.append(text.replace("The user", "User")) is None      # near duplicate
+    assert store.append("The user wants to play lofi beats on YouTube while working.") is not None
+    assert len(store) == 2
+    assert store.contains(text)
+
+
+def test_empty_text_is_not_stored(store):
+    assert store.append("  ...  ") is None
+    assert len(store) == 0
+
+
+def test_retention_evicts_oldest_over_the_limit(tmp_path, monkeypatch):
+    monkeypatch.setattr(memory_store, "RETENTION_SLACK", 0)
+    s = MemoryStore(str(tmp_path / "memory.db"), max_entries=3)
+    for i in range(5):
+        s.append(f"summary number {i} about a completely different topic {i * 7919}")
+    assert len(s) == 3
+    assert [t.split()[2] for t in s.texts()] == ["2", "3", "4"]
+    assert s.generation > 0
+    s.close()
+
+
+def test_age_cutoff_runs_under_the_count_limit(tmp_path):
+    path = str(tmp_path / "memory.db")
+    s = MemoryStore(path, max_age_days=1)
+    s.append("an old summary about opening notepad", created=time.time() - 3 * 86400)
+    s.append("a recent summary about opening the calculator")
+    s.close()
+    s = MemoryStore(path, max_age_days=1)       # checked when the store opens
+    assert list(s.texts()) == ["a recent summary about opening the calculator"]
+    s.close()
+
+
+def test_commands_are_remembered(store):
+    assert not store.seen_command("Open Notepad")
+    store.mark_commands(["open notepad"])
+    assert store.seen_command("  open   NOTEPAD ")
+
+
+def test_remove_where_once(store):
+    store.append("The input does not contain a specific topic to summarize at all.")
+    store.append("The user wants to open notepad to write a shopping list.")
+    assert store.remove_where(lambda t: "does not contain" in t, once="purge") == 1
+    store.append("The input does not contain a specific topic, again, for this one.")
+    assert store.remove_where(lambda t: "does not contain" in t, once="purge") == 0
+    assert len(store) == 2
+
+
+def test_split_summaries_keeps_multiline_entries_together():
+    legacy = (
+        "Hi.\n"
+        "To message **Aman** on WhatsApp, follow these steps:\n"
+        "\n"
+        "1. Open WhatsApp.  \n"
+        "2. Press **Send**.  \n"
+        "\n"
+        "If his number is not saved, use a wa.me link.\n"
+        "**Summary**  \n"
+        "- first point.  \n"
+        "- second point.\n"
+        "The user wants to call Devendra.\n"
+    )
+    parts = split_summaries(legacy)
+    assert len(parts) == 4
+    assert parts[0] == "Hi."
+    assert parts[1].startswith("To message") and parts[1].endswith("wa.me link.")
+    assert parts[2].startswith("**Summary**") and "second point" in parts[2]
+    assert parts[3] == "The user wants to call Devendra."
+
+
+def test_import_text_file_runs_once(store, tmp_path):
+    legacy = tmp_path / "JARVIS_db.txt"
+    legacy.write_text("The user wants to open notepad.\nThe user wants to play music on YouTube.\n",
+                      encoding="utf-8")
+    assert store.import_text_file(str(legacy)) == 2
+    assert store.import_text_file(str(legacy)) == 0
+    assert store.import_text_file(str(tmp_path / "missing.txt")) == 0
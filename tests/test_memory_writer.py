@@ -0,0 +1,120 @@
+import threading
+
+import pytest
+
+from memory_store import MemoryStore
+from memory_writer import MemoryWriter, is_low_value, is_non_answer, parse_numbered
+
+
+@pytest.fixture
+def store(tmp_path):
+    s = MemoryStore(str(tmp_path / "memory.db"))
+    yield s
+    s.close()
+
+
+@pytest.mark.parametrize("reply", [
+    "1. first summary\n2. second summary",
+    "1) first summary\n2) second summary",
+    "1: first summary\n2: second summary",
+    "1 - first summary\n2 - second summary",
+    "**1.** first summary\n**2.** second summary",
+    "(1) first summary\n(2) second summary",
+    "- 1. first summary\n- 2. second summary",
+])
+def test_parse_numbered_styles(reply):
+    assert parse_numbered(reply, 2) == ["first summary", "second summary"]
+
+
+def test_parse_numbered_skip_missing_and_continuation():
+    reply = "Here you go:\n1. SKIP\n3. starts here\n   and continues"
+    assert parse_numbered(reply, 3) == ["", None, "starts here and continues"]
+
+
+@pytest.mark.parametrize("reply", [
+    "1. one\n4. four",              # past the batch
+    "2. two\n1. one",               # out of order
+    "1. one\n1. one again",         # repeated
+])
+def test_parse_numbered_rejects_unmappable_numbering(reply):
+    with pytest.raises(ValueError):
+        parse_numbered(reply, 2)
+
+
+def test_parse_numbered_empty_reply():
+    assert parse_numbered("", 2) == [None, None]
+    assert parse_numbered(None, 1) == [None]
+
+
+@pytest.mark.parametrize("text", [
+    "The input does not contain a specific topic to summarize.",
+    "I’m an AI language model and don’t have access to personal data.",
+    "As an AI, I cannot browse the web for you today.",
+    "The phrase “send a” is incomplete and lacks sufficient context to summarize.",
+])
+def test_non_answers_are_low_value(text):
+    assert is_non_answer(text)
+    assert is_low_value(text)
+
+
+def test_short_summaries_are_low_value():
+    assert is_low_value("Hi.")
+    assert is_low_value("")
+    assert not is_low_value("The user wants to open notepad.")
+
+
+def test_real_summaries_are_kept():
+    # Mentions of "provide" or "AI" inside a real summary are not non-answers
+    assert not is_low_value("Please provide the report to Aman on WhatsApp by Friday evening.")
+    assert not is_low_value("The user asked how an AI model can summarize long documents.")
+    assert not is_low_value("उपयोगकर्ता अमन को व्हाट्सएप पर सुप्रभात भेजना चाहता है")
+
+
+SUMMARIES = {
+    "open notepad and write a shopping list": "The user wants to write a shopping list in notepad.",
+    "play lofi beats on youtube while i work": "The user wants lofi beats playing on YouTube while working.",
+}
+
+
+def test_unparseable_batch_falls_back_to_single_commands(store):
+    calls = []
+
+    def summarize_batch(commands):
+        calls.append(list(commands))
+        if len(commands) > 1:
+            raise ValueError("item 3 out of range or order in a reply for 2 commands")
+        return [SUMMARIES[commands[0]]], 10
+
+    writer = MemoryWriter(summarize_batch, store, batch_size=2, max_delay=0.05)
+    for command in SUMMARIES:
+        assert writer.submit(command)
+    assert writer.flush(timeout=5)
+    assert [len(c) for c in calls] == [2, 1, 1]
+    assert writer.stats["fallbacks"] == 1
+    assert writer.stats["stored"] == 2
+    assert len(store) == 2
+
+
+def test_concurrent_submits_are_summarized_once(store):
+    summarized = []
+
+    def summarize_batch(commands):
+        summarized.extend(commands)
+        return [SUMMARIES[c] for c in commands], 10
+
+    writer = MemoryWriter(summarize_batch, store, batch_size=8, max_delay=0.05)
+    command = next(iter(SUMMARIES))
+    barrier = threading.Barrier(8)
+
+    def submit():
+        barrier.wait()
+        writer.submit(command)
+
+    threads = [threading.Thread(target=submit) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert writer.flush(timeout=5)
+    assert summarized == [command]
+    assert writer.stats["skipped"] == 7
@@ -0,0 +1,49 @@
+import json
+
+import pytest
+
+from template_learner import TemplateLearner, abstract
+
+WHATSAPP = ("import pyautogui\npyautogui.hotkey('win')\npyautogui.typewrite('whatsapp')\n"
+            "pyautogui.typewrite({contact!r})\npyautogui.typewrite({message!r})\n")
+
+
+def _observe(learner, message, contact):
+    return learner.observe(f"send {message} to {contact} on whatsapp",
+                           WHATSAPP.format(contact=contact, message=message))
+
+
+@pytest.fixture
+def learner(tmp_path):
+    learner = TemplateLearner(str(tmp_path / "templates.json"))
+    for message, contact in [("hi", "aman"), ("yo", "priya"), ("hello", "rahul")]:
+        _observe(learner, message, contact)
+    return learner
+
+
+def test_abstract_slots_follow_command_order():
+    cmd_skel, _, values = abstract("send hi to aman on whatsapp", WHATSAPP.format(contact="aman", message="hi"))
+    assert cmd_skel == "send {0} to {1} on {2}"
+    assert values == ["hi", "aman", "whatsapp"]
+
+
+def test_template_is_proposed_then_served_after_confirm(learner):
+    assert [t["command"] for t in learner.templates] == ["send {0} to {1} on whatsapp"]
+    assert learner.serve("send good night to Neha on whatsapp") is None
+    template, code = learner.proposal("send good night to Neha on whatsapp")
+    assert "'Neha'" in code and "'good night'" in code
+    assert learner.confirm(template["command"])
+    assert learner.serve("send bye to Neha on whatsapp") is not None
+    assert learner.proposal("send bye to Neha on whatsapp") is None
+
+
+def test_declined_template_is_not_proposed_again(learner, tmp_path):
+    template, _ = learner.proposal("send bye to neha on whatsapp")
+    assert learner.decline(template["command"])
+    assert learner.proposal("send bye to neha on whatsapp") is None
+    assert learner.serve("send bye to neha on whatsapp") is None
+    # persisted: a restart does not ask again
+    with open(tmp_path / "templates.json", encoding="utf-8") as f:
+        assert json.load(f)["templates"][0]["declined"]
+    assert TemplateLearner(str(tmp_path / "templates.json")).proposal("send bye to neha on whatsapp") is None
+    assert not list(tmp_path.glob("*.tmp"))
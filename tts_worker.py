@@ -0,0 +1,222 @@
+"""
+TTS Worker – non-blocking speech output for the voice assistant
+
+- say() queues a message and returns at once, so the action it announces
+  runs immediately
+- The pyttsx3 engine is created and driven only by the worker thread
+- Identical pending messages are coalesced, the queue keeps only the newest
+  few, and messages older than STALE_SECONDS when their turn comes are dropped
+- interrupt() clears the queue and stops the current utterance (barge-in)
+- speaking / was_speaking() tell the capture side when the assistant's own
+  voice could be on the microphone, and is_echo() whether a recognized
+  phrase is that voice (its words are what was being said) rather than a
+  command spoken over it
+
+Run directly to compare blocking and queued say() with a fake engine:
+    python tts_worker.py
+"""
+
+import collections
+import re
+import threading
+import time
+
+MAX_PENDING = 3
+STALE_SECONDS = 4.0
+ECHO_TAIL = 0.3          # room reverb after the last word
+ECHO_MATCH = 0.6         # share of a phrase's words found in the speech => echo
+
+_WORD = re.compile(r"\w+")
+
+
+def _default_engine():
+    import pyttsx3
+    return pyttsx3.init()
+
+
+class TTSWorker:
+    def __init__(self, engine_factory=_default_engine, max_pending: int = MAX_PENDING,
+                 stale_seconds: float = STALE_SECONDS, echo_tail: float = ECHO_TAIL):
+        self.engine_factory = engine_factory
+        self.max_pending = max_pending
+        self.stale_seconds = stale_seconds
+        self.echo_tail = echo_tail
+        self.speaking = threading.Event()
+        self.stats = {"queued": 0, "spoken": 0, "coalesced": 0, "dropped_stale": 0,
+                      "dropped_overflow": 0, "interrupted": 0}
+        self._pending = collections.deque()     # (queued_at, text)
+        self._cv = threading.Condition()
+        self._interrupt = threading.Event()
+        self._spans = collections.deque(maxlen=20)   # (start, end, text) of recent speech
+        self._engine = None
+        self._speech_started = 0.0
+        self._speech_text = ""
+        self._stop = False
+        self._thread = threading.Thread(target=self._run, name="nexa-tts", daemon=True)
+        self._thread.start()
+
+    # -------------------------
+    # Producer side
+    # -------------------------
+    def say(self, text: str):
+        with self._cv:
+            if any(pending == text for _, pending in self._pending):
+                self.stats["coalesced"] += 1
+                return
+            self._pending.append((time.monotonic(), text))
+            self.stats["queued"] += 1
+            while len(self._pending) > self.max_pending:
+                self._pending.popleft()
+                self.stats["dropped_overflow"] += 1
+            self._cv.notify()
+
+    def interrupt(self):
+        """Barge-in: forget pending messages and cut the current one short."""
+        with self._cv:
+            self._pending.clear()
+        if self.speaking.is_set():
+            self._interrupt.set()
+            self.stats["interrupted"] += 1
+
+    def spoken_during(self, start: float, end: float) -> list:
+        """Texts being spoken at some point in [start, end] (time.perf_counter() seconds)."""
+        texts = [text for s, e, text in list(self._spans) if s <= end and start <= e + self.echo_tail]
+        if self.speaking.is_set() and end >= self._speech_started:
+            texts.append(self._speech_text)
+        return texts
+
+    def was_speaking(self, start: float, end: float) -> bool:
+        return bool(self.spoken_during(start, end))
+
+    def is_echo(self, text: str, start: float, end: float, match: float = ECHO_MATCH) -> bool:
+        """Is text, heard over [start, end], the assistant's own speech? Only
+        when most of its words are in what was being said: a command
+        spoken over the assistant still gets through."""
+        words = _WORD.findall((text or "").lower())
+        if not words:
+            return False
+        for spoken in self.spoken_during(start, end):
+            said = set(_WORD.findall(spoken.lower()))
+            if sum(w in said for w in words) >= match * len(words):
+                return True
+        return False
+
+    def wait_idle(self, timeout: float = None) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cv:
+            while self._pending or self.speaking.is_set():
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cv.wait(0.05 if remaining is None else min(0.05, remaining))
+        return True
+
+    def shutdown(self):
+        with self._cv:
+            self._stop = True
+            self._pending.clear()
+            self._cv.notify()
+        self._interrupt.set()
+        self._thread.join(timeout=2)
+
+    # -------------------------
+    # Worker thread
+    # -------------------------
+    def _run(self):
+        try:
+            self._engine = self.engine_factory()
+            self._engine.connect("started-word", self._on_word)
+        except Exception as e:
+            print("TTS unavailable:", e)
+            self._engine = None
+
+        while True:
+            with self._cv:
+                while not self._pending and not self._stop:
+                    self._cv.wait()
+                if self._stop:
+                    return
+                queued_at, text = self._pending.popleft()
+                if time.monotonic() - queued_at > self.stale_seconds:
+                    self.stats["dropped_stale"] += 1
+                    continue
+                self._interrupt.clear()
+                self._speech_started = time.perf_counter()
+                self._speech_text = text
+                self.speaking.set()
+            try:
+                if self._engine is not None:
+                    self._engine.say(text)
+                    self._engine.runAndWait()
+                self.stats["spoken"] += 1
+            except Exception:
+                pass
+            finally:
+                self._spans.append((self._speech_started, time.perf_counter(), text))
+                with self._cv:
+                    self.speaking.clear()
+                    self._cv.notify_all()
+
+    def _on_word(self, name, location, length):
+        # Runs inside runAndWait on the worker thread, the only place where
+        # engine.stop() reliably cuts speech short on every driver
+        if self._interrupt.is_set():
+            self._engine.stop()
+
+
+# =========================
+# BENCHMARK
+# =========================
+class _FakeEngine:
+    """pyttsx3 stand-in: speaks at `words_per_second`, honours stop()."""
+
+    def __init__(self, words_per_second: float = 3.0):
+        self.words_per_second = words_per_second
+        self._callbacks = []
+        self._text = ""
+        self._stopped = False
+
+    def connect(self, topic, callback):
+        self._callbacks.append(callback)
+
+    def say(self, text):
+        self._text = text
+
+    def stop(self):
+        self._stopped = True
+
+    def runAndWait(self):
+        self._stopped = False
+        for i, word in enumerate(self._text.split()):
+            for cb in self._callbacks:
+                cb(None, i, len(word))
+            if self._stopped:
+                return
+            time.sleep(1 / self.words_per_second)
+
+
+def benchmark(commands: int = 10):
+    messages = [f"Increasing volume step {i}" for i in range(commands)]
+
+    engine = _FakeEngine()
+    start = time.perf_counter()
+    for text in messages:
+        engine.say(text)
+        engine.runAndWait()      # old say(): the action waits for this
+    blocking = (time.perf_counter() - start) / commands
+
+    tts = TTSWorker(_FakeEngine)
+    start = time.perf_counter()
+    for text in messages:
+        tts.say(text)
+    queued = (time.perf_counter() - start) / commands
+    time.sleep(0.2)
+    tts.interrupt()              # a new command arrives mid-sentence
+    tts.wait_idle(5)
+    print(f"say() before the action: blocking {1000 * blocking:.0f} ms, queued {1000 * queued:.3f} ms")
+    print("worker stats:", tts.stats)
+    tts.shutdown()
+
+
+if __name__ == "__main__":
+    benchmark()
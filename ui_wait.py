@@ -0,0 +1,335 @@
+"""
+UI Wait – wait for the desktop instead of sleeping a fixed time
+
+- wait_for_window: a window whose title contains some text exists
+- wait_for_focus: that window is the active one (optionally activating it)
+- wait_for_active_change: focus moved away from the current window
+  (Start menu opened, dialog popped up, ...)
+- wait_for_region_change / wait_for_stable: a screen region changed, or
+  stopped changing (search results finished rendering)
+- settle: best-effort wait_for_stable on the active window that gives up
+  quietly (a playing video elsewhere on screen never settles)
+- wait_for_template: an image (e.g. a button) is visible on screen
+
+Every wait polls with exponential backoff, returns as soon as the condition
+holds and raises WaitTimeout (a TimeoutError) after `timeout` seconds.
+The desktop is reached through a backend: PyAutoGuiBackend by default,
+FakeDesktop for tests and benchmarks.
+
+Used by J3.py's rule handlers, assistant.py and the reference snippets the
+LLM copies, e.g.:
+    from ui_wait import wait_for_focus
+    pyautogui.press('enter')
+    wait_for_focus('WhatsApp')
+
+Run directly for a fixed-sleep vs event-driven comparison:
+    python ui_wait.py
+"""
+
+import threading
+import time
+
+import numpy as np
+
+TIMEOUT = 10.0
+FIRST_POLL = 0.02
+MAX_POLL = 0.25
+BACKOFF = 1.5
+
+stats = {"waits": 0, "timeouts": 0, "waited_seconds": 0.0}
+
+
+class WaitTimeout(TimeoutError):
+    pass
+
+
+# =========================
+# BACKENDS
+# =========================
+class PyAutoGuiBackend:
+    """Real desktop through pygetwindow / pyautogui (imported on first use)."""
+
+    def titles(self):
+        import pygetwindow as gw
+        return [t for t in gw.getAllTitles() if t]
+
+    def active_title(self) -> str:
+        import pygetwindow as gw
+        win = gw.getActiveWindow()
+        return (win.title if win is not None else "") or ""
+
+    def active_region(self):
+        """(left, top, width, height) of the active window, or None."""
+        import pygetwindow as gw
+        win = gw.getActiveWindow()
+        if win is None or win.width <= 0 or win.height <= 0:
+            return None
+        # maximized windows report a few pixels off-screen
+        left, top = max(0, win.left), max(0, win.top)
+        return (left, top, win.width - (left - win.left), win.height - (top - win.top))
+
+    def activate(self, title: str):
+        import pygetwindow as gw
+        wins = gw.getWindowsWithTitle(title)
+        if wins:
+            try:
+                wins[0].activate()
+            except Exception:
+                # pygetwindow raises on Windows even when activation worked;
+                # the focus wait that follows is what decides
+                pass
+
+    def screenshot(self, region=None) -> np.ndarray:
+        """Grayscale array of region (left, top, width, height) or the full screen."""
+        import pyautogui
+        img = pyautogui.screenshot(region=region)
+        return np.asarray(img.convert("L"))
+
+
+class FakeDesktop:
+    """Scripted desktop for tests: windows, focus and screen pixels change on
+    a timeline, e.g. FakeDesktop().at(0.2, "open", "WhatsApp")."""
+
+    def __init__(self, size=(108, 192), focus_delay: float = 0.05):
+        self.start = time.monotonic()
+        self.windows = []
+        self.active = ""
+        self.screen = np.zeros(size, dtype=np.uint8)
+        self.focus_delay = focus_delay
+        self._events = []          # (due, action, args)
+        self._lock = threading.Lock()
+
+    def at(self, seconds: float, action: str, *args):
+        """Schedule "open"/"close"/"focus" <title> or "paint" <(y, x, h, w), value>."""
+        with self._lock:
+            self._events.append((self.start + seconds, action, args))
+            self._events.sort(key=lambda e: e[0])
+        return self
+
+    def _apply(self):
+        now = time.monotonic()
+        with self._lock:
+            while self._events and self._events[0][0] <= now:
+                _, action, args = self._events.pop(0)
+                if action == "open":
+                    self.windows.append(args[0])
+                    self.active = args[0]
+                elif action == "close":
+                    self.windows = [w for w in self.windows if w != args[0]]
+                    if self.active == args[0]:
+                        self.active = self.windows[-1] if self.windows else ""
+                elif action == "focus":
+                    if args[0] in self.windows:
+                        self.active = args[0]
+                elif action == "paint":
+                    (y, x, h, w), value = args
+                    self.screen[y:y + h, x:x + w] = value
+
+    def titles(self):
+        self._apply()
+        return list(self.windows)
+
+    def active_title(self) -> str:
+        self._apply()
+        return self.active
+
+    def active_region(self):
+        return None     # windows have no geometry here: the whole screen
+
+    def activate(self, title: str):
+        self.at(time.monotonic() - self.start + self.focus_delay, "focus", title)
+
+    def screenshot(self, region=None) -> np.ndarray:
+        self._apply()
+        if region is None:
+            return self.screen.copy()
+        left, top, width, height = region
+        return self.screen[top:top + height, left:left + width].copy()
+
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        _backend = PyAutoGuiBackend()
+    return _backend
+
+
+def set_backend(backend):
+    """Swap the desktop backend (FakeDesktop in tests). Returns the previous one."""
+    global _backend
+    previous, _backend = _backend, backend
+    return previous
+
+
+# =========================
+# WAITS
+# =========================
+def wait_until(condition, timeout: float = TIMEOUT, description: str = "condition"):
+    """Poll condition() with backoff until it returns something other than
+    None/False; return that."""
+    start = time.monotonic()
+    delay = FIRST_POLL
+    stats["waits"] += 1
+    try:
+        while True:
+            result = condition()
+            if result is not None and result is not False:
+                return result
+            remaining = timeout - (time.monotonic() - start)
+            if remaining <= 0:
+                stats["timeouts"] += 1
+                raise WaitTimeout(f"Timed out after {timeout:.1f} s waiting for {description}")
+            time.sleep(min(delay, remaining))
+            delay = min(delay * BACKOFF, MAX_POLL)
+    finally:
+        stats["waited_seconds"] += time.monotonic() - start
+
+
+def _matching(titles, text: str):
+    text = text.lower()
+    return next((t for t in titles if text in t.lower()), None)
+
+
+def wait_for_window(title: str, timeout: float = TIMEOUT, backend=None) -> str:
+    """Wait for a window whose title contains `title` (case-insensitive); return its full title."""
+    backend = backend or get_backend()
+    return wait_until(lambda: _matching(backend.titles(), title), timeout, f"window '{title}'")
+
+
+def wait_for_focus(title: str, timeout: float = TIMEOUT, activate: bool = False, backend=None) -> str:
+    """Wait until the active window's title contains `title`. With activate=True
+    the window is first waited for and brought to the front."""
+    backend = backend or get_backend()
+    start = time.monotonic()
+    if activate:
+        full = wait_for_window(title, timeout, backend)
+        backend.activate(full)
+    remaining = max(0.0, timeout - (time.monotonic() - start))
+    return wait_until(lambda: _matching([backend.active_title()], title), remaining, f"focus on '{title}'")
+
+
+def wait_for_active_change(previous: str = None, timeout: float = TIMEOUT, backend=None) -> str:
+    """Wait until the active window is no longer `previous` (default: the current one)."""
+    backend = backend or get_backend()
+    previous = backend.active_title() if previous is None else previous
+    return wait_until(lambda: (lambda t: t if t != previous else None)(backend.active_title()),
+                      timeout, "focus to change")
+
+
+def _difference(a: np.ndarray, b: np.ndarray) -> float:
+    if a.shape != b.shape:
+        return 255.0
+    return float(np.abs(a.astype(np.int16) - b.astype(np.int16)).mean())
+
+
+def wait_for_region_change(region=None, timeout: float = TIMEOUT, threshold: float = 2.0,
+                           baseline: np.ndarray = None, backend=None) -> np.ndarray:
+    """Wait until region (left, top, width, height; None = full screen) differs
+    from baseline (default: how it looks now) by more than `threshold` grey
+    levels on average. Returns the new pixels."""
+    backend = backend or get_backend()
+    baseline = backend.screenshot(region) if baseline is None else baseline
+
+    def changed():
+        now = backend.screenshot(region)
+        return now if _difference(now, baseline) > threshold else None
+
+    return wait_until(changed, timeout, f"region {region} to change")
+
+
+def wait_for_stable(region=None, timeout: float = TIMEOUT, quiet: float = 0.15,
+                    threshold: float = 1.0, backend=None) -> np.ndarray:
+    """Wait until region has stopped changing for `quiet` seconds (animations
+    finished, results rendered). Returns the settled pixels."""
+    backend = backend or get_backend()
+    last = {"pixels": backend.screenshot(region), "since": time.monotonic()}
+
+    def settled():
+        now = backend.screenshot(region)
+        if _difference(now, last["pixels"]) > threshold:
+            last["pixels"], last["since"] = now, time.monotonic()
+            return None
+        return now if time.monotonic() - last["since"] >= quiet else None
+
+    return wait_until(settled, timeout, f"region {region} to settle")
+
+
+def settle(region="active", timeout: float = 3.0, quiet: float = 0.15, threshold: float = 1.0,
+           backend=None) -> bool:
+    """Best-effort wait_for_stable for "let the UI finish drawing" pauses.
+    region="active" watches only the active window, so a video playing
+    elsewhere does not keep it busy. Returns False instead of raising when
+    the region never settles; the caller carries on."""
+    backend = backend or get_backend()
+    if region == "active":
+        try:
+            region = backend.active_region()
+        except Exception:
+            region = None
+    try:
+        wait_for_stable(region, timeout, quiet, threshold, backend)
+        return True
+    except WaitTimeout:
+        return False
+
+
+def wait_for_template(template_path: str, region=None, timeout: float = TIMEOUT,
+                      threshold: float = 0.8, backend=None):
+    """Wait until the image in template_path is visible. Returns the match
+    (screen coordinates; .center is clickable)."""
+    from skip_ad_detector import SkipAdDetector   # generic coarse-to-fine matcher
+
+    backend = backend or get_backend()
+    detector = SkipAdDetector(template_path, threshold=threshold)
+    left, top = (region[0], region[1]) if region else (0, 0)
+
+    def found():
+        match = detector.detect(backend.screenshot(region))
+        if match is not None:
+            match.x += left
+            match.y += top
+        return match
+
+    return wait_until(found, timeout, f"'{template_path}' on screen")
+
+
+# =========================
+# BENCHMARK
+# =========================
+def _whatsapp_fixed(desktop, typed):
+    # the old handler: press win, type, enter, sleep(2), search, sleep(1), send
+    time.sleep(2)
+    typed.append(("search", desktop.active_title()))
+    time.sleep(1)
+    typed.append(("send", desktop.active_title()))
+
+
+def _whatsapp_waits(desktop, typed):
+    wait_for_focus("WhatsApp", backend=desktop)
+    typed.append(("search", desktop.active_title()))
+    wait_for_stable(backend=desktop)
+    typed.append(("send", desktop.active_title()))
+
+
+def benchmark():
+    for label, ready in (("fast machine", 0.2), ("slow machine", 2.6)):
+        for name, flow in (("fixed sleeps", _whatsapp_fixed), ("ui_wait", _whatsapp_waits)):
+            desktop = FakeDesktop()
+            desktop.at(ready, "open", "WhatsApp")
+            desktop.at(ready + 0.15, "paint", (10, 10, 40, 80), 200)   # search results render
+            typed = []
+            start = time.monotonic()
+            try:
+                flow(desktop, typed)
+                ok = all(title == "WhatsApp" for _, title in typed)
+            except WaitTimeout:
+                ok = False
+            print(f"{label:<13} ({ready:.1f} s to open) {name:<12} {time.monotonic() - start:5.2f} s  "
+                  f"{'typed into WhatsApp' if ok else 'typed into the wrong window'}")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,290 @@
+"""
+Voice Capture – one persistent audio stream for the voice assistant
+
+- The microphone (or any speech_recognition AudioSource) is opened once
+- Ambient noise is calibrated once, then the energy threshold follows the
+  noise floor measured on silent chunks only (the recognizer's own dynamic
+  threshold also adapts during speech and drifts up mid-phrase)
+- Phrases are segmented from the live stream, so speech that starts while
+  the previous command is being handled is not lost to a device reopen
+- Each Phrase carries its position in the stream; mark_dispatched() records
+  end-of-speech -> dispatch latency
+- Push-to-talk callers release() the device between presses: nothing is
+  buffered while nobody listens, and reopening skips calibration
+
+Works offline with sr.AudioFile, e.g. for a recorded session:
+    python voice_capture.py --wav session.wav
+    python voice_capture.py --synthetic 5
+"""
+
+import math
+import threading
+import time
+
+import speech_recognition as sr
+
+CALIBRATE_SECONDS = 0.5
+PAUSE_THRESHOLD = 0.6        # seconds of silence that end a phrase (library default 0.8)
+PHRASE_TIME_LIMIT = 6
+NOISE_DAMPING = 0.15         # per second; weight left on the old noise floor
+MIN_ENERGY_THRESHOLD = 50
+
+
+class _CountingStream:
+    """Wraps source.stream to track how many seconds of audio were read."""
+
+    def __init__(self, stream, source, on_chunk=None):
+        self._stream = stream
+        self._bytes_per_second = source.SAMPLE_RATE * source.SAMPLE_WIDTH
+        self._on_chunk = on_chunk
+        self.bytes_read = 0
+        self.exhausted = False
+
+    @property
+    def position(self) -> float:
+        return self.bytes_read / self._bytes_per_second
+
+    def read(self, size):
+        data = self._stream.read(size)
+        self.bytes_read += len(data)
+        if not data:
+            self.exhausted = True
+        elif self._on_chunk:
+            self._on_chunk(data)
+        return data
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+class Phrase:
+    def __init__(self, audio, start: float, end: float, returned_at: float):
+        self.audio = audio
+        self.start = start              # seconds into the stream
+        self.end = end                  # end of speech (trailing silence excluded)
+        self.returned_at = returned_at  # perf_counter() when segmentation finished
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+
+# =========================
+# CAPTURE
+# =========================
+class VoiceCapture:
+    def __init__(self, source_factory=None, recognizer: sr.Recognizer = None,
+                 calibrate_seconds: float = CALIBRATE_SECONDS,
+                 pause_threshold: float = PAUSE_THRESHOLD,
+                 phrase_time_limit: float = PHRASE_TIME_LIMIT):
+        self.source_factory = source_factory or sr.Microphone
+        self.recognizer = recognizer or sr.Recognizer()
+        self.recognizer.pause_threshold = pause_threshold
+        self.recognizer.non_speaking_duration = min(self.recognizer.non_speaking_duration, pause_threshold)
+        self.recognizer.dynamic_energy_threshold = False   # see _track_noise
+        self.calibrate_seconds = calibrate_seconds
+        self.phrase_time_limit = phrase_time_limit
+        self.source = None
+        self._stream = None
+        self._noise = None
+        self._calibrated = False
+        self._lock = threading.Lock()
+        self.stats = {"phrases": 0, "dispatched": 0, "opens": 0,
+                      "total_latency": 0.0, "last_latency": None}
+
+    # -------------------------
+    # Stream lifecycle
+    # -------------------------
+    def open(self):
+        """Open the source and calibrate once. No-op if already open."""
+        if self.source is not None:
+            return self
+        source = self.source_factory()
+        source.__enter__()
+        self._stream = source.stream = _CountingStream(source.stream, source, self._track_noise)
+        self.source = source
+        self._noise = None
+        if self.calibrate_seconds and not self._calibrated:
+            self.recognizer.adjust_for_ambient_noise(source, duration=self.calibrate_seconds)
+        self._calibrated = True
+        self._noise = self.recognizer.energy_threshold / self.recognizer.dynamic_energy_ratio
+        self.stats["opens"] += 1
+        return self
+
+    def _track_noise(self, chunk: bytes):
+        """Adapt the threshold to the noise floor, learning only from chunks
+        that are below it (never from speech)."""
+        if self._noise is None:
+            return     # still calibrating
+        r = self.recognizer
+        energy = sr.audioop.rms(chunk, self.source.SAMPLE_WIDTH)
+        if energy >= r.energy_threshold:
+            return
+        damping = NOISE_DAMPING ** (len(chunk) / self._stream._bytes_per_second)
+        self._noise = self._noise * damping + energy * (1 - damping)
+        r.energy_threshold = max(MIN_ENERGY_THRESHOLD, self._noise * r.dynamic_energy_ratio)
+
+    def close(self):
+        """Release the device; the next phrase reopens (and recalibrates)."""
+        self._calibrated = False
+        self.release()
+
+    def release(self):
+        """Release the device but keep the calibration: the next phrase
+        reopens it without the calibration delay or any audio captured
+        in between. Waits for a phrase another thread is listening for."""
+        with self._lock:
+            if self.source is None:
+                return
+            source, self.source = self.source, None
+            source.stream = self._stream._stream
+            try:
+                source.__exit__(None, None, None)
+            except Exception:
+                pass
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def exhausted(self) -> bool:
+        """True once a finite source (AudioFile) has been read to the end."""
+        return self._stream is not None and self._stream.exhausted
+
+    # -------------------------
+    # Phrases
+    # -------------------------
+    def next_phrase(self, timeout: float = None):
+        """Block until the next phrase. Returns a Phrase, or None when a finite
+        source ends. Raises sr.WaitTimeoutError if timeout passes in silence."""
+        with self._lock:
+            self.open()
+            if self._stream.exhausted:
+                return None
+            audio = self.recognizer.listen(self.source, timeout=timeout,
+                                           phrase_time_limit=self.phrase_time_limit)
+            returned_at = time.perf_counter()
+            r, chunk = self.recognizer, self.source.CHUNK / self.source.SAMPLE_RATE
+            padding = math.ceil(r.non_speaking_duration / chunk) * chunk    # kept on both sides
+            end = self._stream.position
+            if not self._stream.exhausted:
+                # the phrase ended after one chunk more than pause_threshold of silence
+                end -= (math.ceil(r.pause_threshold / chunk) + 1) * chunk
+            seconds = len(audio.frame_data) / (audio.sample_rate * audio.sample_width)
+            if self._stream.exhausted and seconds <= padding:
+                return None     # only the tail of the file, no speech
+            self.stats["phrases"] += 1
+            start = end - max(0.0, seconds - 2 * padding)
+            return Phrase(audio, max(0.0, start), end, returned_at)
+
+    def phrases(self, timeout: float = None):
+        """Yield phrases until a finite source ends (forever for a microphone)."""
+        while True:
+            phrase = self.next_phrase(timeout)
+            if phrase is None:
+                return
+            yield phrase
+
+    def _endpointing(self) -> float:
+        """Seconds of silence the recognizer waits for before ending a phrase."""
+        if self.source is None:
+            return 0.0
+        chunk = self.source.CHUNK / self.source.SAMPLE_RATE
+        return (math.ceil(self.recognizer.pause_threshold / chunk) + 1) * chunk
+
+    def wall_span(self, phrase: Phrase):
+        """(start, end) of the speech in time.perf_counter() seconds, for
+        comparing against when the assistant itself was talking."""
+        end = phrase.returned_at - self._endpointing()
+        return end - phrase.duration, end
+
+    def mark_dispatched(self, phrase: Phrase) -> float:
+        """Record that phrase's command is being dispatched now. Returns the
+        end-of-speech -> dispatch latency in seconds (silence detection +
+        recognition + parsing)."""
+        latency = self._endpointing() + (time.perf_counter() - phrase.returned_at)
+        self.stats["dispatched"] += 1
+        self.stats["total_latency"] += latency
+        self.stats["last_latency"] = latency
+        return latency
+
+    def summary(self) -> dict:
+        s = self.stats
+        return {
+            "phrases": s["phrases"],
+            "dispatched": s["dispatched"],
+            "stream_opens": s["opens"],
+            "energy_threshold": round(self.recognizer.energy_threshold, 1),
+            "avg_latency_ms": round(1000 * s["total_latency"] / s["dispatched"], 1) if s["dispatched"] else None,
+            "last_latency_ms": round(1000 * s["last_latency"], 1) if s["last_latency"] is not None else None,
+        }
+
+
+# =========================
+# OFFLINE CHECK
+# =========================
+def _synthetic_wav(path: str, phrases: int = 5, rate: int = 16000, seed: int = 0):
+    """Noise floor with `phrases` 0.6-1.5 s voiced bursts separated by 1.5 s gaps.
+    Returns [(start, end)] of the bursts in seconds."""
+    import math
+    import random
+    import struct
+    import wave
+
+    rng = random.Random(seed)
+    samples, spans, t = [], [], 1.0
+    samples.extend(rng.gauss(0, 60) for _ in range(rate))   # 1 s of room noise to calibrate on
+    for _ in range(phrases):
+        length = rng.uniform(0.6, 1.5)
+        spans.append((t, t + length))
+        n = int(length * rate)
+        samples.extend(3000 * math.sin(2 * math.pi * 220 * i / rate) + rng.gauss(0, 60) for i in range(n))
+        samples.extend(rng.gauss(0, 60) for _ in range(int(1.5 * rate)))
+        t += length + 1.5
+    with wave.open(path, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(b"".join(struct.pack("<h", max(-32768, min(32767, int(s)))) for s in samples))
+    return spans
+
+
+def run_file(path: str, recognize: bool = False, expected=None):
+    capture = VoiceCapture(lambda: sr.AudioFile(path))
+    with capture:
+        for i, phrase in enumerate(capture.phrases()):
+            text = ""
+            if recognize:
+                try:
+                    text = capture.recognizer.recognize_google(phrase.audio, language="en-IN")
+                except (sr.UnknownValueError, sr.RequestError) as e:
+                    text = f"<{type(e).__name__}>"
+            latency = capture.mark_dispatched(phrase)
+            line = f"  phrase {i + 1}: {phrase.start:6.2f}-{phrase.end:6.2f} s  dispatch latency {1000 * latency:6.1f} ms"
+            if expected and i < len(expected):
+                line += f"  (true {expected[i][0]:.2f}-{expected[i][1]:.2f} s)"
+            print(line + (f"  {text!r}" if text else ""))
+    print(capture.summary())
+
+
+if __name__ == "__main__":
+    import argparse
+    import os
+    import tempfile
+
+    parser = argparse.ArgumentParser(description="Segment phrases from a WAV file with one calibration")
+    parser.add_argument("--wav", help="recorded session (WAV/AIFF/FLAC)")
+    parser.add_argument("--synthetic", type=int, default=5, help="phrases in a generated test signal")
+    parser.add_argument("--recognize", action="store_true", help="also run recognize_google on each phrase")
+    args = parser.parse_args()
+
+    if args.wav:
+        run_file(args.wav, args.recognize)
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            wav = os.path.join(tmp, "synthetic.wav")
+            spans = _synthetic_wav(wav, args.synthetic)
+            run_file(wav, expected=spans)
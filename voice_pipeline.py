@@ -0,0 +1,374 @@
+"""
+Voice Pipeline – capture, recognition and dispatch running concurrently
+
+- Capture thread: reads phrases from a VoiceCapture into a bounded queue
+- Recognition workers: a small thread pool turning audio into text with a
+  pluggable backend (GoogleRecognizer, StubRecognizer, or any callable)
+- Dispatcher: one thread that hands results to the command handler strictly
+  in the order they were spoken
+- Echo suppression: an optional suppress(phrase, text) check drops
+  recognized phrases that are the assistant's own speech before dispatch
+- Backpressure: when the queue is full the policy decides whether the
+  oldest phrase, the newest phrase, or nobody (capture blocks) gives way
+- Per-stage latency and throughput metrics
+
+Run directly for a sequential vs pipelined benchmark:
+    python voice_pipeline.py --phrases 20 --interval 0.4 --recognize 0.8
+"""
+
+import heapq
+import queue
+import threading
+import time
+
+DROP_OLDEST = "drop_oldest"
+DROP_NEWEST = "drop_newest"
+BLOCK = "block"
+POLICIES = (DROP_OLDEST, DROP_NEWEST, BLOCK)
+
+
+# =========================
+# RECOGNIZER BACKENDS
+# =========================
+class GoogleRecognizer:
+    """recognize_google wrapper. Returns None when nothing intelligible was said."""
+
+    def __init__(self, recognizer=None, language: str = "en-IN"):
+        import speech_recognition as sr
+        self._sr = sr
+        self.recognizer = recognizer or sr.Recognizer()
+        self.language = language
+
+    def __call__(self, audio):
+        try:
+            return self.recognizer.recognize_google(audio, language=self.language)
+        except self._sr.UnknownValueError:
+            return None
+
+
+class StubRecognizer:
+    """Offline backend for tests: returns texts in order (or text_for(audio))
+    after a fixed delay that stands in for network + decoding time."""
+
+    def __init__(self, texts=None, delay: float = 0.0, text_for=None):
+        self._texts = list(texts or [])
+        self._text_for = text_for
+        self.delay = delay
+        self._lock = threading.Lock()
+
+    def __call__(self, audio):
+        time.sleep(self.delay)
+        if self._text_for:
+            return self._text_for(audio)
+        with self._lock:
+            return self._texts.pop(0) if self._texts else None
+
+
+# =========================
+# METRICS
+# =========================
+STAGES = ("queue_wait", "recognize", "reorder_wait", "dispatch", "end_to_end")
+
+
+class PipelineMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = {"captured": 0, "dropped": 0, "recognized": 0, "unrecognized": 0,
+                       "suppressed": 0, "errors": 0, "dispatched": 0}
+        self.samples = {stage: [] for stage in STAGES}
+        self.started = time.perf_counter()
+        self.last_error = None
+
+    def count(self, key: str, n: int = 1):
+        with self._lock:
+            self.counts[key] += n
+
+    def record(self, stage: str, seconds: float):
+        with self._lock:
+            samples = self.samples[stage]
+            samples.append(seconds)
+            if len(samples) > 1000:
+                del samples[:500]
+
+    def summary(self) -> dict:
+        with self._lock:
+            elapsed = time.perf_counter() - self.started
+            out = dict(self.counts)
+            out["throughput_per_min"] = round(60 * out["dispatched"] / elapsed, 1) if elapsed else 0.0
+            for stage, samples in self.samples.items():
+                if samples:
+                    ordered = sorted(samples)
+                    out[f"{stage}_p50_ms"] = round(1000 * ordered[len(ordered) // 2], 1)
+                    out[f"{stage}_p95_ms"] = round(1000 * ordered[int(0.95 * (len(ordered) - 1))], 1)
+            out["last_error"] = self.last_error
+            return out
+
+
+# =========================
+# PIPELINE
+# =========================
+class _Item:
+    __slots__ = ("seq", "phrase", "queued_at", "recognized_at", "text")
+
+    def __init__(self, seq, phrase):
+        self.seq = seq
+        self.phrase = phrase
+        self.queued_at = time.perf_counter()
+        self.recognized_at = None
+        self.text = None
+
+
+class VoicePipeline:
+    def __init__(self, capture, recognize, dispatch, workers: int = 2, queue_size: int = 4,
+                 policy: str = DROP_OLDEST, capture_timeout: float = 1.0, suppress=None):
+        """capture: VoiceCapture (or anything with next_phrase(timeout) and
+        mark_dispatched(phrase)); recognize(audio) -> text or None;
+        dispatch(text) is called from a single thread, in spoken order;
+        suppress(phrase, text) -> True discards a recognized phrase (e.g. TTS echo)."""
+        if policy not in POLICIES:
+            raise ValueError(f"policy must be one of {POLICIES}")
+        self.capture = capture
+        self.recognize = recognize
+        self.dispatch = dispatch
+        self.workers = workers
+        self.policy = policy
+        self.capture_timeout = capture_timeout
+        self.suppress = suppress
+        self.metrics = PipelineMetrics()
+        self._audio = queue.Queue(maxsize=queue_size)
+        self._results = []                    # heap of (seq, id, item or None if dropped)
+        self._results_cv = threading.Condition()
+        self._next_seq = 0
+        self._captured = 0
+        self._capture_done = False
+        self._stop = threading.Event()
+        self._threads = []
+
+    # -------------------------
+    # Lifecycle
+    # -------------------------
+    def start(self):
+        self.metrics = PipelineMetrics()
+        self._threads = [threading.Thread(target=self._capture_loop, name="nexa-capture", daemon=True)]
+        self._threads += [threading.Thread(target=self._recognize_loop, name=f"nexa-recognize-{i}", daemon=True)
+                          for i in range(self.workers)]
+        self._threads.append(threading.Thread(target=self._dispatch_loop, name="nexa-dispatch", daemon=True))
+        for t in self._threads:
+            t.start()
+        return self
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        with self._results_cv:
+            self._results_cv.notify_all()
+        self.join(timeout)
+
+    def join(self, timeout: float = None):
+        """Wait for the pipeline to drain (finite sources) or stop."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for t in self._threads:
+            t.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+
+    def run_forever(self):
+        self.start()
+        try:
+            while any(t.is_alive() for t in self._threads):
+                time.sleep(0.5)
+        finally:
+            self.stop()
+
+    # -------------------------
+    # Stages
+    # -------------------------
+    def _capture_loop(self):
+        seq = 0
+        try:
+            while not self._stop.is_set():
+                try:
+                    phrase = self.capture.next_phrase(timeout=self.capture_timeout)
+                except Exception as e:
+                    if type(e).__name__ == "WaitTimeoutError":
+                        continue      # silence: check for stop and listen again
+                    self.metrics.last_error = f"capture: {type(e).__name__}: {e}"
+                    self.metrics.count("errors")
+                    if hasattr(self.capture, "close"):
+                        self.capture.close()    # device error: reopen on the next phrase
+                    time.sleep(1)
+                    continue
+                if phrase is None:
+                    break             # finite source ended
+                self.metrics.count("captured")
+                self._enqueue(_Item(seq, phrase))
+                seq += 1
+        finally:
+            self._captured = seq
+            self._capture_done = True
+            for _ in range(self.workers):
+                self._audio.put(None)   # workers exit after draining
+            with self._results_cv:
+                self._results_cv.notify_all()
+
+    def _enqueue(self, item: _Item):
+        if self.policy == BLOCK:
+            while not self._stop.is_set():
+                try:
+                    self._audio.put(item, timeout=0.2)
+                    return
+                except queue.Full:
+                    continue
+            return
+        try:
+            self._audio.put_nowait(item)
+            return
+        except queue.Full:
+            pass
+        if self.policy == DROP_NEWEST:
+            self._drop(item)
+            return
+        try:
+            self._drop(self._audio.get_nowait())
+        except queue.Empty:
+            pass
+        self._audio.put_nowait(item)
+
+    def _drop(self, item: _Item):
+        self.metrics.count("dropped")
+        self._publish(item.seq, None)
+
+    def _recognize_loop(self):
+        while True:
+            item = self._audio.get()
+            if item is None:
+                return
+            started = time.perf_counter()
+            self.metrics.record("queue_wait", started - item.queued_at)
+            try:
+                item.text = self.recognize(item.phrase.audio)
+                self.metrics.count("recognized" if item.text else "unrecognized")
+            except Exception as e:
+                self.metrics.last_error = f"recognize: {type(e).__name__}: {e}"
+                self.metrics.count("errors")
+            item.recognized_at = time.perf_counter()
+            self.metrics.record("recognize", item.recognized_at - started)
+            self._publish(item.seq, item)
+
+    def _publish(self, seq: int, item):
+        with self._results_cv:
+            heapq.heappush(self._results, (seq, id(item), item))
+            self._results_cv.notify_all()
+
+    def _dispatch_loop(self):
+        while True:
+            with self._results_cv:
+                while not (self._results and self._results[0][0] == self._next_seq):
+                    drained = self._capture_done and self._next_seq >= self._captured
+                    if drained or (self._stop.is_set() and not self._results):
+                        return
+                    self._results_cv.wait(0.5)
+                _, _, item = heapq.heappop(self._results)
+                self._next_seq += 1
+            if item is None or not item.text:
+                continue
+            if self.suppress and self.suppress(item.phrase, item.text):
+                self.metrics.count("suppressed")
+                continue
+            self.metrics.record("reorder_wait", time.perf_counter() - item.recognized_at)
+            started = time.perf_counter()
+            self.metrics.record("end_to_end", self.capture.mark_dispatched(item.phrase))
+            try:
+                self.dispatch(item.text)
+            except Exception as e:
+                self.metrics.last_error = f"dispatch: {type(e).__name__}: {e}"
+                self.metrics.count("errors")
+            self.metrics.record("dispatch", time.perf_counter() - started)
+            self.metrics.count("dispatched")
+
+
+# =========================
+# BENCHMARK
+# =========================
+class _PacedCapture:
+    """Phrases that finish being spoken every `interval` seconds. A phrase that
+    is not read within `buffer_seconds` of ending is lost, like audio that
+    overflows the device buffer while the old loop was busy."""
+
+    def __init__(self, phrases: int, interval: float, buffer_seconds: float = 1.0):
+        self.interval = interval
+        self.buffer_seconds = buffer_seconds
+        self.total = phrases
+        self.start = time.perf_counter()
+        self.emitted = 0
+        self.lost = 0
+
+    def next_phrase(self, timeout=None):
+        while self.emitted < self.total:
+            due = self.start + (self.emitted + 1) * self.interval
+            now = time.perf_counter()
+            if now < due:
+                time.sleep(due - now)
+                now = due
+            seq, self.emitted = self.emitted, self.emitted + 1
+            if now - due > self.buffer_seconds:
+                self.lost += 1
+                continue
+            return _Phrase(seq, due)
+        return None
+
+    def mark_dispatched(self, phrase):
+        return time.perf_counter() - phrase.ended
+
+
+class _Phrase:
+    def __init__(self, seq, ended):
+        self.audio = seq
+        self.ended = ended
+
+
+def benchmark(phrases: int = 20, interval: float = 0.4, recognize_seconds: float = 0.8,
+              dispatch_seconds: float = 0.3, workers: int = 3):
+    def dispatch(text):
+        time.sleep(dispatch_seconds)      # spoken acknowledgement + keypress
+        handled.append(text)
+
+    recognizer = StubRecognizer(text_for=lambda seq: f"command {seq}", delay=recognize_seconds)
+
+    handled, latencies = [], []
+    capture = _PacedCapture(phrases, interval)
+    start = time.perf_counter()
+    while True:
+        phrase = capture.next_phrase()
+        if phrase is None:
+            break
+        text = recognizer(phrase.audio)
+        latencies.append(capture.mark_dispatched(phrase))
+        dispatch(text)
+    seq_time = time.perf_counter() - start
+    latencies.sort()
+    print(f"sequential : {len(handled):>3}/{phrases} handled, {capture.lost} lost, "
+          f"{seq_time:5.2f} s, p50 latency {1000 * latencies[len(latencies) // 2]:.0f} ms")
+
+    handled = []
+    pipeline = VoicePipeline(_PacedCapture(phrases, interval), recognizer, dispatch,
+                             workers=workers, queue_size=phrases)
+    start = time.perf_counter()
+    pipeline.start()
+    pipeline.join()
+    m = pipeline.metrics.summary()
+    ordered = handled == sorted(handled, key=lambda t: int(t.split()[-1]))
+    print(f"pipelined  : {len(handled):>3}/{phrases} handled, {m['dropped']} dropped, "
+          f"{time.perf_counter() - start:5.2f} s, p50 latency {m.get('end_to_end_p50_ms', 0):.0f} ms, "
+          f"in order: {ordered}")
+    print({k: v for k, v in m.items() if k.endswith("_ms")})
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Sequential vs pipelined voice loop")
+    parser.add_argument("--phrases", type=int, default=20)
+    parser.add_argument("--interval", type=float, default=0.4, help="seconds between spoken commands")
+    parser.add_argument("--recognize", type=float, default=0.8, help="stub recognition seconds")
+    parser.add_argument("--dispatch", type=float, default=0.3, help="handler seconds")
+    parser.add_argument("--workers", type=int, default=3)
+    args = parser.parse_args()
+    benchmark(args.phrases, args.interval, args.recognize, args.dispatch, args.workers)